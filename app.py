@@ -5,33 +5,92 @@ This module provides the application factory pattern for creating Flask app inst
 Routes are organized in separate blueprint modules in the routes package.
 """
 
+import os
+
 from flask import Flask
+
+import database
 from database import init_database, add_sample_data
 from routes import register_blueprints
+from routes.fragment_cache import BookRowCache, init_fragment_cache
+from routes.compression import init_compression
+from services.report_cache import PatronReportCache
+from services.analytics import CirculationStats
 
 
-def create_app():
+def create_app(config=None):
     """
     Application factory function to create and configure Flask app.
     
+    Args:
+        config: Optional mapping of configuration values overriding the defaults
+    
     Returns:
         Flask: Configured Flask application instance
     """
     app = Flask(__name__)
     app.secret_key = "super secret key"
+    app.config.from_mapping(
+        # Seeding demo books is opt-in, e.g. SEED_SAMPLE_DATA=1 python app.py
+        SEED_SAMPLE_DATA=os.environ.get('SEED_SAMPLE_DATA', '0') == '1',
+        # Compiled-template bytecode cache shared across worker restarts
+        TEMPLATE_BYTECODE_CACHE=os.environ.get('TEMPLATE_BYTECODE_CACHE', '1') == '1',
+        TEMPLATE_CACHE_DIR=os.environ.get('TEMPLATE_CACHE_DIR'),
+        # Rendered catalog/search rows kept per worker (0 disables row caching)
+        BOOK_ROW_CACHE_SIZE=int(os.environ.get('BOOK_ROW_CACHE_SIZE', '10000')),
+        # Negotiated gzip/brotli compression for responses of at least COMPRESS_MIN_SIZE bytes
+        COMPRESS_ENABLED=os.environ.get('COMPRESS_ENABLED', '1') == '1',
+        COMPRESS_MIN_SIZE=int(os.environ.get('COMPRESS_MIN_SIZE', '1024')),
+        COMPRESS_LEVEL=int(os.environ.get('COMPRESS_LEVEL', '6')),
+        # Patron status reports cached per worker (0 disables report caching)
+        PATRON_REPORT_CACHE_SIZE=int(os.environ.get('PATRON_REPORT_CACHE_SIZE', '10000')),
+        # Seconds a circulation statistics snapshot is served before being rebuilt
+        STATS_SNAPSHOT_MAX_AGE=float(os.environ.get('STATS_SNAPSHOT_MAX_AGE', '300')),
+        # File the workers share that snapshot through (default: the database path + '.stats')
+        STATS_SNAPSHOT_FILE=os.environ.get('STATS_SNAPSHOT_FILE'),
+    )
+    if config:
+        app.config.update(config)
     
-    # Initialize the database
+    # Initialize the database (a no-op on databases already at the current schema version)
     init_database()
     
     # Add sample data for testing and demonstration
-    add_sample_data()
+    if app.config['SEED_SAMPLE_DATA']:
+        add_sample_data()
     
     # Register all route blueprints
     register_blueprints(app)
     
+    # Template bytecode and book row fragment caching
+    init_fragment_cache(app)
+    
+    # Response compression
+    init_compression(app)
+    
+    # Book row, patron report and circulation statistics caches
+    init_worker_caches(app)
+    
     return app
 
 
+def init_worker_caches(app):
+    """
+    Give the app empty per-process caches.
+
+    Called by create_app, and again by gunicorn's post_fork (gunicorn.conf.py)
+    so each worker starts with caches of its own rather than copies of the
+    preloaded master's, whose locks may have been held at fork time.
+    """
+    # Rendered catalog and search rows, validated against available_copies
+    app.extensions['book_row_cache'] = BookRowCache(app.config['BOOK_ROW_CACHE_SIZE'])
+    # Patron status reports, validated against each patron's activity version
+    app.extensions['patron_report_cache'] = PatronReportCache(app.config['PATRON_REPORT_CACHE_SIZE'])
+    # Columnar circulation snapshot behind /api/stats, shared with the other workers
+    app.extensions['circulation_stats'] = CirculationStats(
+        app.config['STATS_SNAPSHOT_MAX_AGE'], app.config['STATS_SNAPSHOT_FILE'] or f'{database.DATABASE}.stats')
+
+
 if __name__ == '__main__':
     app = create_app()
     app.run(debug=True, host='0.0.0.0', port=5000)
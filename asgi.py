@@ -0,0 +1,23 @@
+"""
+ASGI entry point for the async read API (/api/search and /api/late_fee).
+
+    uvicorn asgi:app
+
+Environment:
+    ASYNC_DB_THREADS: concurrent database reads per process (default 8)
+    ASYNC_MAX_PENDING: requests allowed to wait for a thread before 503s (default 1000)
+
+See routes/async_api.py. All other routes are served by the WSGI app (wsgi.py).
+"""
+
+import os
+
+from database import init_database
+from routes.async_api import AsyncReadAPI
+
+init_database()
+
+app = AsyncReadAPI(
+    db_threads=int(os.environ.get('ASYNC_DB_THREADS', '8')),
+    max_pending=int(os.environ.get('ASYNC_MAX_PENDING', '1000')),
+)
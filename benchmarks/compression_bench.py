@@ -0,0 +1,58 @@
+"""
+Compression benchmark - bytes on the wire and CPU cost for large catalogs.
+
+Builds a throwaway database with --books books, then fetches /catalog and
+/api/search?q=Book through the Flask test client with each supported
+Accept-Encoding, reporting response size and mean CPU time per request.
+
+Usage:
+    PYTHONPATH=. python benchmarks/compression_bench.py [--books N] [--requests N]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from app import create_app
+from routes.compression import available_encodings
+
+from render_bench import populate
+
+
+def measure(client, path: str, encoding: str, requests: int):
+    """Return (bytes on the wire, mean CPU ms per request)."""
+    size = 0
+    start = time.process_time()
+    for _ in range(requests):
+        response = client.get(path, headers={'Accept-Encoding': encoding})
+        size = len(response.get_data())
+    return size, (time.process_time() - start) / requests * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--books', type=int, default=20000, help='books in the catalog')
+    parser.add_argument('--requests', type=int, default=10, help='requests per path and encoding')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        database.DATABASE = os.path.join(tmp_dir, 'compression_bench.db')
+        populate(args.books)
+        client = create_app().test_client()
+
+        print(f"{args.books} books, {args.requests} requests per row")
+        print(f"{'path':<22} {'encoding':<9} {'bytes':>12} {'ratio':>7} {'cpu ms':>9}")
+        for path in ('/catalog', '/api/search?q=Book'):
+            identity_size, _ = measure(client, path, 'identity', 1)
+            for encoding in ['identity'] + available_encodings():
+                size, cpu_ms = measure(client, path, encoding, args.requests)
+                print(f"{path:<22} {encoding:<9} {size:>12,} {size / identity_size:>7.1%} {cpu_ms:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
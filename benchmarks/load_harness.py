@@ -0,0 +1,129 @@
+"""
+Load harness - HTTP throughput of the dev server versus the gunicorn profile.
+
+Builds a throwaway database with --books books, starts each server as a
+subprocess on a free port, then drives it with --clients concurrent clients
+for --seconds seconds over a mix of read requests (catalog pages, search
+API, late fee API). Reports requests/second and p50/p95 latency.
+
+Usage:
+    PYTHONPATH=. python benchmarks/load_harness.py [--books N] [--clients N] [--seconds N]
+                                                   [--servers dev gunicorn]
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+
+from render_bench import populate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Request mix, cycled by every client
+PATHS = [
+    '/catalog',
+    '/catalog?page=2&sort=availability',
+    '/api/search?q=Book 1&type=title',
+    '/api/late_fee/123456/1',
+]
+
+
+def server_command(server: str, port: int):
+    """Command line that serves the app on the given port."""
+    if server == 'dev':
+        return [sys.executable, '-m', 'flask', '--app', 'app:create_app', 'run', '--port', str(port)]
+    return [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}', 'wsgi:app']
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_serving(base_url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(base_url + '/catalog', timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server at {base_url} did not start")
+
+
+def drive(base_url: str, clients: int, seconds: float):
+    """Run the clients for the given time; return (requests, errors, sorted latencies)."""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def client(offset: int):
+        local = []
+        i = offset
+        while time.monotonic() < deadline:
+            path = PATHS[i % len(PATHS)].replace(' ', '%20')
+            start = time.perf_counter()
+            try:
+                urllib.request.urlopen(base_url + path, timeout=10).read()
+                local.append(time.perf_counter() - start)
+            except OSError:
+                with lock:
+                    errors[0] += 1
+            i += 1
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(latencies), errors[0], sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--books', type=int, default=2000, help='books in the catalog')
+    parser.add_argument('--clients', type=int, default=16, help='concurrent clients')
+    parser.add_argument('--seconds', type=float, default=10, help='measurement time per server')
+    parser.add_argument('--servers', nargs='+', default=['dev', 'gunicorn'], choices=['dev', 'gunicorn'])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        database.DATABASE = os.path.join(tmp_dir, 'load_harness.db')
+        populate(args.books)
+        env = dict(os.environ, DATABASE_NAME=database.DATABASE, COMPRESS_ENABLED='0')
+
+        print(f"{args.books} books, {args.clients} clients, {args.seconds:.0f}s per server, {os.cpu_count()} CPUs")
+        print(f"{'server':<10} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8}")
+        for server in args.servers:
+            port = free_port()
+            process = subprocess.Popen(server_command(server, port), cwd=ROOT, env=env,
+                                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                base_url = f'http://127.0.0.1:{port}'
+                wait_until_serving(base_url)
+                count, errors, latencies = drive(base_url, args.clients, args.seconds)
+            finally:
+                process.terminate()
+                process.wait()
+
+            p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0
+            p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0
+            print(f"{server:<10} {count:>9} {errors:>7} {count / args.seconds:>8.1f} {p50:>8.1f} {p95:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Render benchmark - measures /catalog render time with and without row caching.
+
+Builds a throwaway database with --books books, then times repeated GET
+/catalog requests through the Flask test client: once with the book row
+fragment cache disabled, once with it enabled (first request fills it).
+
+Usage:
+    PYTHONPATH=. python benchmarks/render_bench.py [--books N] [--requests N]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from app import create_app
+
+
+def populate(books: int):
+    """Insert a synthetic catalog, a third of it unavailable."""
+    database.init_database()
+    conn = database.get_db_connection()
+    conn.executemany('''
+        INSERT INTO books (title, author, isbn, total_copies, available_copies)
+        VALUES (?, ?, ?, ?, ?)
+    ''', ((f"Book {i:07d}", f"Author {i % 997}", f"{i:013d}", 3, i % 3) for i in range(books)))
+    conn.commit()
+    conn.close()
+
+
+def time_catalog(row_cache_size: int, requests: int):
+    """Return (first request ms, mean of the remaining requests ms)."""
+    app = create_app({'BOOK_ROW_CACHE_SIZE': row_cache_size})
+    client = app.test_client()
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = client.get('/catalog')
+        response.get_data()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings[0], sum(timings[1:]) / max(len(timings) - 1, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--books', type=int, default=5000, help='books in the catalog')
+    parser.add_argument('--requests', type=int, default=20, help='GET /catalog requests per scenario')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        database.DATABASE = os.path.join(tmp_dir, 'render_bench.db')
+        populate(args.books)
+
+        uncached = time_catalog(0, args.requests)
+        cached = time_catalog(args.books * 2, args.requests)
+
+    print(f"GET /catalog with {args.books} books, {args.requests} requests per scenario")
+    print(f"  row cache off: first {uncached[0]:8.1f} ms, steady {uncached[1]:8.1f} ms")
+    print(f"  row cache on:  first {cached[0]:8.1f} ms, steady {cached[1]:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
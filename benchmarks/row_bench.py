@@ -0,0 +1,60 @@
+"""
+Row representation benchmark - dict rows vs compact BookRecord tuples.
+
+Builds a throwaway database with --rows books and loads the full listing
+with get_all_books() and get_all_books(compact=True), reporting wall time
+and peak traced memory for each.
+
+Usage:
+    PYTHONPATH=. python benchmarks/row_bench.py [--rows N]
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+
+from render_bench import populate
+
+
+def measure(compact: bool):
+    """Return (seconds, peak MiB) for one full listing."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    books = database.get_all_books(compact=compact)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del books
+    return elapsed, peak / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000, help='books in the catalog')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        database.DATABASE = os.path.join(tmp_dir, 'row_bench.db')
+        populate(args.rows)
+
+        # Untraced warm-up so both runs read from the OS page cache
+        database.get_all_books(compact=True)
+
+        results = {'dict': measure(compact=False), 'compact': measure(compact=True)}
+
+    print(f"get_all_books() over {args.rows:,} rows (timings include tracemalloc overhead)")
+    for name, (elapsed, peak) in results.items():
+        print(f"  {name:<8} {elapsed:8.2f} s   peak {peak:9.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
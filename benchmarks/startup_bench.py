@@ -0,0 +1,54 @@
+"""
+Startup benchmark - measures create_app() cost on cold and warm databases.
+
+A cold start runs against a fresh database file, so init_database has to
+create the schema. A warm start reuses a database already stamped with the
+current schema version, so init_database only reads PRAGMA user_version.
+
+Usage:
+    PYTHONPATH=. python benchmarks/startup_bench.py [--runs N] [--seed]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from app import create_app
+
+
+def time_create_app(runs: int, fresh_db: bool, seed: bool) -> float:
+    """Return the mean create_app() time in milliseconds."""
+    timings = []
+    for _ in range(runs):
+        if fresh_db and os.path.exists(database.DATABASE):
+            os.remove(database.DATABASE)
+        start = time.perf_counter()
+        create_app({'SEED_SAMPLE_DATA': seed})
+        timings.append(time.perf_counter() - start)
+    return sum(timings) / len(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=50, help='create_app() calls per scenario')
+    parser.add_argument('--seed', action='store_true', help='enable SEED_SAMPLE_DATA')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        database.DATABASE = os.path.join(tmp_dir, 'startup_bench.db')
+
+        cold = time_create_app(args.runs, fresh_db=True, seed=args.seed)
+        warm = time_create_app(args.runs, fresh_db=False, seed=args.seed)
+
+    print(f"create_app() over {args.runs} runs (seed sample data: {args.seed})")
+    print(f"  cold start: {cold:8.3f} ms")
+    print(f"  warm start: {warm:8.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
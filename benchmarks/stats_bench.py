@@ -0,0 +1,74 @@
+"""
+Circulation statistics benchmark - NumPy vs pure-Python aggregation.
+
+Builds a CirculationSnapshot from --loans synthetic loans over --books
+books (no database involved) with each available engine, timing the build
+and one full set of /api/stats queries against it.
+
+Usage:
+    PYTHONPATH=. python benchmarks/stats_bench.py [--loans N] [--books N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from array import array
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import services.analytics as analytics
+from database import SECONDS_PER_DAY
+
+
+def synthetic_columns(loans: int, books: int, now: int):
+    """Loans spread over the last two years; a tenth still open."""
+    rng = random.Random(42)
+    columns = {name: array('q') for name in ('book_id', 'borrow_ts', 'due_ts', 'return_ts')}
+    for _ in range(loans):
+        borrow_ts = now - rng.randrange(730 * SECONDS_PER_DAY)
+        columns['book_id'].append(rng.randrange(1, books + 1))
+        columns['borrow_ts'].append(borrow_ts)
+        columns['due_ts'].append(borrow_ts + 14 * SECONDS_PER_DAY)
+        open_loan = rng.random() < 0.1
+        columns['return_ts'].append(-1 if open_loan else borrow_ts + rng.randrange(30 * SECONDS_PER_DAY))
+    return columns
+
+
+def measure(snapshot, now: int) -> float:
+    """Seconds for one full set of statistics."""
+    start = time.perf_counter()
+    snapshot.daily_circulation(30, now)
+    snapshot.top_books(10)
+    snapshot.top_authors(10)
+    snapshot.overdue_rates(now)
+    snapshot.average_loan_days()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--loans', type=int, default=1_000_000)
+    parser.add_argument('--books', type=int, default=50_000)
+    args = parser.parse_args()
+
+    now = int(time.time())
+    columns = synthetic_columns(args.loans, args.books, now)
+    books = [(i, f"Book {i}", f"Author {i % 5000}") for i in range(1, args.books + 1)]
+
+    numpy = analytics.np
+    engines = [('numpy', numpy)] if numpy is not None else []
+    engines.append(('python', None))
+    print(f"{args.loans:,} loans, {args.books:,} books")
+    for name, module in engines:
+        analytics.np = module
+        start = time.perf_counter()
+        snapshot = analytics.CirculationSnapshot(columns, books, time.time())
+        build = time.perf_counter() - start
+        print(f"{name:>7}: build {build * 1000:9.1f} ms, query {measure(snapshot, now) * 1000:7.2f} ms")
+    analytics.np = numpy
+
+
+if __name__ == '__main__':
+    main()
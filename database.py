@@ -3,24 +3,324 @@ Database module for Library Management System
 Handles all database operations and connections
 """
 
+import calendar
+import heapq
+import json
 import sqlite3
 import os
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+import threading
+import time
+import zlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from array import array
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlencode
 
 # Database configuration - can be overridden by environment variable
 DATABASE = os.environ.get('DATABASE_NAME', 'library.db')
 
-def get_db_connection():
-    """Get a database connection."""
-    conn = sqlite3.connect(DATABASE)
+# Seconds a connection waits for another process's write lock before failing
+# (several server workers share one database file)
+DATABASE_TIMEOUT = float(os.environ.get('DATABASE_TIMEOUT', '5'))
+
+# Attempts for short write statements that lose a lock race with another
+# connection (each retry backs off exponentially from WRITE_RETRY_DELAY seconds)
+WRITE_RETRIES = int(os.environ.get('DATABASE_WRITE_RETRIES', '5'))
+WRITE_RETRY_DELAY = 0.01
+
+# Seconds per day, for epoch-second date arithmetic
+SECONDS_PER_DAY = 86400
+
+# Rows touched per transaction by batched (online) migration steps
+MIGRATION_BATCH_SIZE = int(os.environ.get('MIGRATION_BATCH_SIZE', '5000'))
+
+# Returned loans older than this many days are moved to borrow_records_archive
+# by the archival job, in transactions of ARCHIVE_BATCH_SIZE rows
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', '365'))
+ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', '1000'))
+
+# Days of overdue rollups written per transaction by roll_up_overdue
+ROLLUP_BATCH_DAYS = int(os.environ.get('ROLLUP_BATCH_DAYS', '30'))
+
+# Where read-only helpers (listings, search, history) read from; see get_read_connection
+DATABASE_READ_MODE = os.environ.get('DATABASE_READ_MODE', 'primary')
+READ_MODES = ('primary', 'readonly', 'snapshot')
+
+# Snapshot replica file (default: DATABASE + '.replica') and the maximum age,
+# in seconds, of the data read from it
+DATABASE_REPLICA = os.environ.get('DATABASE_REPLICA')
+REPLICA_MAX_AGE = float(os.environ.get('DATABASE_REPLICA_MAX_AGE', '5'))
+
+# Held while the replica is being copied; _replica_refresher is the latest
+# background copy started by get_read_connection
+_replica_lock = threading.Lock()
+_replica_refresher = None
+
+# Number of shard databases borrow_records are partitioned across by patron_id
+# (0 keeps them in DATABASE); see get_loans_connection
+BORROW_SHARDS = int(os.environ.get('DATABASE_BORROW_SHARDS', '0'))
+
+# Each shard allocates borrow record ids from its own range, so ids stay
+# globally unique and cross-shard reports can page on (due_ts, id)
+SHARD_ID_SPACE = 10 ** 12
+
+def get_db_connection(path: Optional[str] = None):
+    """
+    Get a database connection.
+
+    Connections are opened per operation and closed again, so none are ever
+    shared between threads or inherited across a server worker fork.
+
+    Args:
+        path: Database file to open (defaults to DATABASE)
+    """
+    conn = sqlite3.connect(path or DATABASE, timeout=DATABASE_TIMEOUT)
     conn.row_factory = sqlite3.Row  # This enables column access by name
     return conn
 
-def init_database():
-    """Initialize the database with required tables."""
-    conn = get_db_connection()
-    
+def _sqlite_uri(path: str, **params) -> str:
+    """file: URI for a database path with the given query parameters."""
+    return f'{Path(path).absolute().as_uri()}?{urlencode(params)}'
+
+def get_replica_path() -> str:
+    """Path of the snapshot replica file."""
+    return DATABASE_REPLICA or f'{DATABASE}.replica'
+
+def _replica_age(path: str) -> Optional[float]:
+    """Seconds since the replica file was written (None if there is none yet)."""
+    try:
+        return time.time() - os.path.getmtime(path)
+    except OSError:
+        return None
+
+def _copy_to_replica(path: str):
+    """Back the primary up to a temporary file and rename it over the replica."""
+    temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    source = get_db_connection()
+    target = sqlite3.connect(temp_path)
+    source.backup(target)
+    # The replica is opened immutable, so it must not depend on a WAL file
+    target.execute('PRAGMA journal_mode = DELETE')
+    target.close()
+    source.close()
+    os.replace(temp_path, path)
+
+def refresh_replica(force: bool = False) -> bool:
+    """
+    Copy the primary database to the snapshot replica with SQLite's backup API.
+
+    The copy is written to a temporary file and renamed into place, so readers
+    holding the previous replica open keep a consistent view. Staleness is
+    judged from the replica file's modification time, so every worker process
+    sees the same age; it is checked before taking the lock, so calls on a
+    fresh replica never wait for a refresh in progress.
+
+    Args:
+        force: Refresh even if the replica is younger than REPLICA_MAX_AGE
+
+    Returns:
+        bool: True if the replica was refreshed
+    """
+    path = get_replica_path()
+    age = _replica_age(path)
+    if not force and age is not None and age <= REPLICA_MAX_AGE:
+        return False
+
+    with _replica_lock:
+        # Another thread may have refreshed it while this one waited for the lock
+        age = _replica_age(path)
+        if not force and age is not None and age <= REPLICA_MAX_AGE:
+            return False
+        _copy_to_replica(path)
+        return True
+
+def _refresh_replica_in_background():
+    """Start refreshing the replica in a thread, unless a refresh is already running."""
+    global _replica_refresher
+    if not _replica_lock.acquire(blocking=False):
+        return
+
+    def refresh():
+        try:
+            _copy_to_replica(get_replica_path())
+        finally:
+            _replica_lock.release()
+
+    _replica_refresher = threading.Thread(target=refresh, name='replica-refresh', daemon=True)
+    _replica_refresher.start()
+
+def get_read_connection():
+    """
+    Get a connection for read-only helpers, routed by DATABASE_READ_MODE.
+
+    - 'primary': the read/write connection from get_db_connection (default)
+    - 'readonly': the primary file opened with mode=ro, so readers can never
+      take a write lock; in WAL mode they still see every committed write
+    - 'snapshot': a replica copied with the backup API and opened immutable,
+      so reads skip locking entirely. Once the replica is older than
+      REPLICA_MAX_AGE a background thread copies a new one while reads keep
+      using the old one, so data is at most REPLICA_MAX_AGE seconds plus one
+      copy old (or refresh it with `manage.py refresh-replica`). Only the
+      first read, with no replica yet, waits for a copy.
+    """
+    if DATABASE_READ_MODE == 'primary':
+        return get_db_connection()
+    if DATABASE_READ_MODE == 'readonly':
+        conn = sqlite3.connect(_sqlite_uri(DATABASE, mode='ro'), uri=True, timeout=DATABASE_TIMEOUT)
+    elif DATABASE_READ_MODE == 'snapshot':
+        age = _replica_age(get_replica_path())
+        if age is None:
+            refresh_replica()
+        elif age > REPLICA_MAX_AGE:
+            _refresh_replica_in_background()
+        conn = sqlite3.connect(_sqlite_uri(get_replica_path(), mode='ro', immutable=1), uri=True)
+    else:
+        raise ValueError(f"DATABASE_READ_MODE must be one of {', '.join(READ_MODES)}")
+    conn.row_factory = sqlite3.Row
+    return conn
+
+# Borrow Record Sharding
+#
+# With BORROW_SHARDS > 0, borrow_records (and the fee ledger rows that hang
+# off them) live in shard databases next to DATABASE, chosen by a stable hash
+# of patron_id, while books stay in DATABASE. Every shard carries the full
+# schema; shard connections attach the catalog and shadow the shard's own
+# (empty) books table with a temporary view of it, so the same SQL works on
+# either layout.
+
+def get_shard_path(shard: int) -> str:
+    """Path of a borrow record shard database, e.g. library.borrows0.db."""
+    root, ext = os.path.splitext(DATABASE)
+    return f'{root}.borrows{shard}{ext}'
+
+def shard_for_patron(patron_id: str) -> int:
+    """Shard holding a patron's borrow records (crc32, so stable across processes)."""
+    return zlib.crc32(patron_id.encode()) % BORROW_SHARDS
+
+def get_shard_connection(shard: int):
+    """Get a connection to a borrow record shard with the catalog attached."""
+    conn = get_db_connection(get_shard_path(shard))
+    conn.execute('ATTACH DATABASE ? AS catalog', (DATABASE,))
+    conn.execute('CREATE TEMP VIEW books AS SELECT * FROM catalog.books')
+    return conn
+
+def _count_shard_borrow(conn: sqlite3.Connection, book_id: int, change: int):
+    """
+    Adjust a book's borrow_count in the attached catalog from a shard connection.
+
+    Triggers cannot write to another database, so sharded writers call this
+    inside the transaction that inserts or cancels the borrow record.
+    """
+    if BORROW_SHARDS:
+        conn.execute('UPDATE catalog.books SET borrow_count = borrow_count + ? WHERE id = ?', (change, book_id))
+
+def loans_catalog_schema() -> str:
+    """
+    Schema holding books and holds on a get_loans_connection connection.
+
+    Shard connections read books through a temporary view of the attached
+    catalog, so writes to books (and any use of holds) there must name it.
+    """
+    return 'catalog' if BORROW_SHARDS else 'main'
+
+def get_loans_connection(patron_id: str, read_only: bool = False):
+    """
+    Get a connection holding a patron's borrow records.
+
+    Args:
+        patron_id: Patron whose records will be read or written
+        read_only: The caller only reads, so an unsharded database may use
+            get_read_connection
+
+    Returns:
+        The patron's shard connection when sharding is on, else a connection to DATABASE
+    """
+    if BORROW_SHARDS:
+        return get_shard_connection(shard_for_patron(patron_id))
+    return get_read_connection() if read_only else get_db_connection()
+
+def fan_out_shards(query, read_only: bool = False) -> List:
+    """
+    Run query(conn) against every shard in parallel and return the results in shard order.
+
+    Without sharding, query runs once against DATABASE (through
+    get_read_connection when read_only is set).
+    """
+    if not BORROW_SHARDS:
+        conn = get_read_connection() if read_only else get_db_connection()
+        try:
+            return [query(conn)]
+        finally:
+            conn.close()
+
+    def run(shard: int):
+        conn = get_shard_connection(shard)
+        try:
+            return query(conn)
+        finally:
+            conn.close()
+
+    with ThreadPoolExecutor(max_workers=BORROW_SHARDS, thread_name_prefix='shard') as executor:
+        return list(executor.map(run, range(BORROW_SHARDS)))
+
+def to_epoch(value: datetime) -> int:
+    """
+    Convert a naive datetime to epoch seconds, matching SQLite's strftime('%s').
+
+    Dates are stored as naive local wall-clock time, so the conversion
+    treats them as UTC rather than applying the local timezone offset.
+    """
+    return calendar.timegm(value.timetuple())
+
+def epoch_now() -> int:
+    """Current wall-clock time in the epoch seconds used by the *_ts columns."""
+    return to_epoch(datetime.now())
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Get the schema version stamped into the database."""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+# Schema Migrations
+#
+# The schema is built by an ordered list of migrations. PRAGMA user_version
+# records the last migration applied, so each one runs exactly once per
+# database. Migrations must be idempotent (IF NOT EXISTS, batched updates that
+# skip finished rows) so an interrupted upgrade can simply be re-run.
+
+def run_in_batches(conn: sqlite3.Connection, table: str, sql: str,
+                   batch_size: Optional[int] = None) -> int:
+    """
+    Run a statement over a table in rowid ranges, committing after each batch.
+
+    Used by migrations that rewrite or backfill large tables: every batch is
+    its own short write transaction, so borrow/return traffic can interleave
+    with the upgrade instead of waiting for one long table lock.
+
+    Args:
+        conn: Open database connection
+        table: Table whose rowid range is walked
+        sql: Statement with two placeholders for the inclusive rowid range
+        batch_size: Rows per batch (defaults to MIGRATION_BATCH_SIZE)
+
+    Returns:
+        int: Number of rows changed
+    """
+    batch_size = batch_size or MIGRATION_BATCH_SIZE
+    bounds = conn.execute(f'SELECT MIN(rowid), MAX(rowid) FROM {table}').fetchone()
+    if bounds[0] is None:
+        return 0
+
+    changed = 0
+    for low in range(bounds[0], bounds[1] + 1, batch_size):
+        changed += conn.execute(sql, (low, low + batch_size - 1)).rowcount
+        conn.commit()
+    return changed
+
+def _migrate_initial_schema(conn: sqlite3.Connection):
+    """Create the books and borrow_records tables."""
     # Create books table
     conn.execute('''
         CREATE TABLE IF NOT EXISTS books (
@@ -45,16 +345,593 @@ def init_database():
             FOREIGN KEY (book_id) REFERENCES books (id)
         )
     ''')
+
+def _migrate_availability_indexes(conn: sqlite3.Connection):
+    """Add the indexes behind the availability filter and sort."""
+    # Partial index backing "available now" listings: only books with a copy
+    # on the shelf are indexed, so filtered catalog pages never scan the table
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_books_available_title
+        ON books (title) WHERE available_copies > 0
+    ''')
     
+    # Index backing the availability sort order
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_books_availability
+        ON books (available_copies DESC, title)
+    ''')
+
+def _migrate_catalog_version(conn: sqlite3.Connection):
+    """Track a catalog version that triggers bump on every books write."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS catalog_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL,
+            updated_at INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('''
+        INSERT OR IGNORE INTO catalog_version (id, version, updated_at)
+        VALUES (1, 1, CAST(strftime('%s', 'now') AS INTEGER))
+    ''')
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_books_{event.lower()}_catalog_version
+            AFTER {event} ON books
+            BEGIN
+                UPDATE catalog_version
+                SET version = version + 1, updated_at = CAST(strftime('%s', 'now') AS INTEGER)
+                WHERE id = 1;
+            END
+        ''')
+
+def _migrate_epoch_timestamps(conn: sqlite3.Connection):
+    """
+    Add integer epoch-second copies of the borrow_records dates.
+
+    The ISO TEXT columns stay the source of truth for API and template
+    output; the *_ts columns let overdue and fee queries run as indexed
+    integer range scans. Existing rows are backfilled in batches.
+    """
+    columns = {row['name'] for row in conn.execute('PRAGMA table_info(borrow_records)')}
+    for column in ('borrow_ts', 'due_ts', 'return_ts'):
+        if column not in columns:
+            conn.execute(f'ALTER TABLE borrow_records ADD COLUMN {column} INTEGER')
+
+    run_in_batches(conn, 'borrow_records', '''
+        UPDATE borrow_records
+        SET borrow_ts = CAST(strftime('%s', borrow_date) AS INTEGER),
+            due_ts = CAST(strftime('%s', due_date) AS INTEGER),
+            return_ts = CAST(strftime('%s', return_date) AS INTEGER)
+        WHERE rowid BETWEEN ? AND ? AND due_ts IS NULL
+    ''')
+
+    # Keep the epoch columns filled for writers that only set the TEXT dates
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_borrow_records_insert_ts
+        AFTER INSERT ON borrow_records
+        WHEN NEW.borrow_ts IS NULL OR NEW.due_ts IS NULL
+        BEGIN
+            UPDATE borrow_records
+            SET borrow_ts = CAST(strftime('%s', NEW.borrow_date) AS INTEGER),
+                due_ts = CAST(strftime('%s', NEW.due_date) AS INTEGER),
+                return_ts = CAST(strftime('%s', NEW.return_date) AS INTEGER)
+            WHERE id = NEW.id;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_borrow_records_return_ts
+        AFTER UPDATE OF return_date ON borrow_records
+        WHEN NEW.return_ts IS NOT CAST(strftime('%s', NEW.return_date) AS INTEGER)
+        BEGIN
+            UPDATE borrow_records
+            SET return_ts = CAST(strftime('%s', NEW.return_date) AS INTEGER)
+            WHERE id = NEW.id;
+        END
+    ''')
+
+    # Open loans by due date, for overdue range scans
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_borrow_records_open_due
+        ON borrow_records (due_ts) WHERE return_ts IS NULL
+    ''')
+    # Returned loans by return time
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_borrow_records_return_ts
+        ON borrow_records (return_ts) WHERE return_ts IS NOT NULL
+    ''')
+
+def _migrate_fee_ledger(conn: sqlite3.Connection):
+    """Add the late fee ledger, its payment log and the accrual job state."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS fee_ledger (
+            borrow_record_id INTEGER PRIMARY KEY,
+            patron_id TEXT NOT NULL,
+            book_id INTEGER NOT NULL,
+            due_ts INTEGER NOT NULL,
+            days_overdue INTEGER NOT NULL DEFAULT 0,
+            accrued_fee REAL NOT NULL DEFAULT 0,
+            paid_amount REAL NOT NULL DEFAULT 0,
+            accrued_through INTEGER,
+            closed INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY (borrow_record_id) REFERENCES borrow_records (id)
+        )
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_fee_ledger_patron_book
+        ON fee_ledger (patron_id, book_id, borrow_record_id)
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS fee_payments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            borrow_record_id INTEGER NOT NULL,
+            patron_id TEXT NOT NULL,
+            book_id INTEGER NOT NULL,
+            amount REAL NOT NULL,
+            transaction_id TEXT,
+            paid_at TEXT NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS fee_ledger_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            last_run_ts INTEGER
+        )
+    ''')
+    conn.execute('INSERT OR IGNORE INTO fee_ledger_state (id, last_run_ts) VALUES (1, NULL)')
+
+    # Ledger rows belong to their borrow record
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_borrow_records_delete_fee_ledger
+        AFTER DELETE ON borrow_records
+        BEGIN
+            DELETE FROM fee_ledger WHERE borrow_record_id = OLD.id;
+        END
+    ''')
+
+def _migrate_open_loan_lookup_index(conn: sqlite3.Connection):
+    """Index open loans by (patron_id, book_id) for borrow record lookups."""
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_borrow_records_open_patron_book
+        ON borrow_records (patron_id, book_id) WHERE return_date IS NULL
+    ''')
+
+def _migrate_borrow_records_archive(conn: sqlite3.Connection):
+    """Add the archive table that old returned loans are moved to."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS borrow_records_archive (
+            id INTEGER PRIMARY KEY,
+            patron_id TEXT NOT NULL,
+            book_id INTEGER NOT NULL,
+            borrow_date TEXT NOT NULL,
+            due_date TEXT NOT NULL,
+            return_date TEXT NOT NULL,
+            borrow_ts INTEGER,
+            due_ts INTEGER,
+            return_ts INTEGER,
+            late_fee REAL NOT NULL DEFAULT 0,
+            fee_paid REAL NOT NULL DEFAULT 0,
+            archived_ts INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_borrow_records_archive_patron
+        ON borrow_records_archive (patron_id, borrow_date)
+    ''')
+
+def _migrate_patron_activity(conn: sqlite3.Connection):
+    """Track a per-patron version that triggers bump on every loan or payment change."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS patron_activity (
+            patron_id TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        ) WITHOUT ROWID
+    ''')
+    events = [
+        ('borrow_records_insert', 'INSERT ON borrow_records', 'NEW'),
+        ('borrow_records_return', 'UPDATE OF return_date ON borrow_records', 'NEW'),
+        ('borrow_records_delete', 'DELETE ON borrow_records', 'OLD'),
+        ('fee_payments_insert', 'INSERT ON fee_payments', 'NEW'),
+    ]
+    for name, event, row in events:
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{name}_patron_activity
+            AFTER {event}
+            BEGIN
+                INSERT INTO patron_activity (patron_id, version) VALUES ({row}.patron_id, 1)
+                ON CONFLICT (patron_id) DO UPDATE SET version = version + 1;
+            END
+        ''')
+
+def _migrate_holds(conn: sqlite3.Connection):
+    """Add the hold queue, with each book's holds indexed in queue order."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS holds (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            patron_id TEXT NOT NULL,
+            book_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'waiting',
+            placed_ts INTEGER NOT NULL,
+            ready_ts INTEGER,
+            FOREIGN KEY (book_id) REFERENCES books (id)
+        )
+    ''')
+    conn.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_holds_book_position
+        ON holds (book_id, position)
+    ''')
+    conn.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_holds_patron_book
+        ON holds (patron_id, book_id)
+    ''')
+
+def _migrate_change_events(conn: sqlite3.Connection):
+    """
+    Add an append-only log of catalog and loan changes.
+
+    Triggers write each event in the same transaction as the change itself,
+    so every writer (single and cart borrows, returns, holds) is captured and
+    an event is only visible once its change has committed.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS change_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ts INTEGER NOT NULL,
+            event_type TEXT NOT NULL,
+            book_id INTEGER,
+            patron_id TEXT,
+            borrow_record_id INTEGER,
+            data TEXT NOT NULL
+        )
+    ''')
+    now = "CAST(strftime('%s', 'now') AS INTEGER)"
+    events = [
+        ('books_insert', 'INSERT ON books', '', 'book_added',
+         "NEW.id, NULL, NULL, json_object('title', NEW.title, 'author', NEW.author, 'isbn', NEW.isbn, "
+         "'total_copies', NEW.total_copies, 'available_copies', NEW.available_copies)"),
+        ('books_availability', 'UPDATE OF available_copies ON books',
+         'WHEN NEW.available_copies IS NOT OLD.available_copies', 'availability_changed',
+         "NEW.id, NULL, NULL, json_object('old_available_copies', OLD.available_copies, "
+         "'available_copies', NEW.available_copies)"),
+        ('borrow_records_insert', 'INSERT ON borrow_records', '', 'borrowed',
+         "NEW.book_id, NEW.patron_id, NEW.id, json_object('borrow_date', NEW.borrow_date, "
+         "'due_date', NEW.due_date)"),
+        ('borrow_records_return', 'UPDATE OF return_date ON borrow_records',
+         'WHEN NEW.return_date IS NOT NULL AND OLD.return_date IS NULL', 'returned',
+         "NEW.book_id, NEW.patron_id, NEW.id, json_object('return_date', NEW.return_date)"),
+        # Archival deletes returned loans; only deleting an open loan undoes a borrow
+        ('borrow_records_delete', 'DELETE ON borrow_records', 'WHEN OLD.return_date IS NULL', 'borrow_cancelled',
+         "OLD.book_id, OLD.patron_id, OLD.id, json_object()"),
+    ]
+    for name, event, condition, event_type, values in events:
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{name}_change_events
+            AFTER {event} {condition}
+            BEGIN
+                INSERT INTO change_events (ts, event_type, book_id, patron_id, borrow_record_id, data)
+                VALUES ({now}, '{event_type}', {values});
+            END
+        ''')
+
+def _migrate_daily_circulation(conn: sqlite3.Connection):
+    """
+    Add per-day, per-book circulation rollups.
+
+    Triggers count loans and returns in the same transaction as the borrow
+    or return. Overdue counts and fee accruals depend on the clock rather
+    than on a write, so the rollup job fills them (see roll_up_overdue).
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS daily_circulation (
+            day INTEGER NOT NULL,
+            book_id INTEGER NOT NULL,
+            loans INTEGER NOT NULL DEFAULT 0,
+            returns INTEGER NOT NULL DEFAULT 0,
+            overdue INTEGER NOT NULL DEFAULT 0,
+            fees_accrued REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, book_id)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS daily_circulation_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            rolled_up_ts INTEGER
+        )
+    ''')
+    conn.execute('INSERT OR IGNORE INTO daily_circulation_state (id, rolled_up_ts) VALUES (1, NULL)')
+    counters = [
+        ('borrow_records_insert', 'INSERT ON borrow_records', 'NEW.borrow_ts IS NOT NULL',
+         'loans', 'NEW.borrow_ts', 'NEW.book_id', 1),
+        ('borrow_records_return', 'UPDATE OF return_date ON borrow_records',
+         'NEW.return_ts IS NOT NULL AND OLD.return_date IS NULL', 'returns', 'NEW.return_ts', 'NEW.book_id', 1),
+        # Cancelling an open loan undoes its borrow; archiving a returned one keeps its history
+        ('borrow_records_delete', 'DELETE ON borrow_records',
+         'OLD.return_date IS NULL AND OLD.borrow_ts IS NOT NULL', 'loans', 'OLD.borrow_ts', 'OLD.book_id', -1),
+    ]
+    for name, event, condition, column, ts, book_id, change in counters:
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{name}_daily_circulation
+            AFTER {event}
+            WHEN {condition}
+            BEGIN
+                INSERT INTO daily_circulation (day, book_id, {column})
+                VALUES ({ts} / {SECONDS_PER_DAY}, {book_id}, {change})
+                ON CONFLICT (day, book_id) DO UPDATE SET {column} = {column} + {change};
+            END
+        ''')
+
+def _migrate_book_borrow_count(conn: sqlite3.Connection):
+    """
+    Add a per-book borrow counter for popularity ordering.
+
+    Triggers count each loan in the same transaction as its borrow record
+    (cancelling an open loan takes it back off), so ranking by popularity
+    reads one indexed column instead of counting borrow_records.
+    """
+    columns = {row['name'] for row in conn.execute('PRAGMA table_info(books)')}
+    if 'borrow_count' not in columns:
+        conn.execute('ALTER TABLE books ADD COLUMN borrow_count INTEGER NOT NULL DEFAULT 0')
+
+    # Backfill from the hot and archived loans in one grouped pass
+    conn.execute('''
+        UPDATE books SET borrow_count = loans.count
+        FROM (
+            SELECT book_id, COUNT(*) AS count FROM (
+                SELECT book_id FROM borrow_records
+                UNION ALL
+                SELECT book_id FROM borrow_records_archive
+            )
+            GROUP BY book_id
+        ) AS loans
+        WHERE loans.book_id = books.id
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_books_popularity
+        ON books (borrow_count DESC, title)
+    ''')
+    # On shards these update the shard's own (unused) books table; sharded
+    # writers count against the catalog themselves (see _count_shard_borrow)
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_borrow_records_insert_borrow_count
+        AFTER INSERT ON borrow_records
+        BEGIN
+            UPDATE books SET borrow_count = borrow_count + 1 WHERE id = NEW.book_id;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_borrow_records_delete_borrow_count
+        AFTER DELETE ON borrow_records
+        WHEN OLD.return_date IS NULL
+        BEGIN
+            UPDATE books SET borrow_count = borrow_count - 1 WHERE id = OLD.book_id;
+        END
+    ''')
+
+def _migrate_history_index(conn: sqlite3.Connection):
+    """
+    Index returned loans by (patron_id, borrow_date, id) for borrowing history.
+
+    The history query reads a patron's returned loans newest first and pages
+    on (borrow_date, id); this partial index serves it in order instead of
+    scanning borrow_records and sorting.
+    """
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_borrow_records_returned_patron
+        ON borrow_records (patron_id, borrow_date, id) WHERE return_date IS NOT NULL
+    ''')
+
+def _migrate_daily_circulation_text_dates(conn: sqlite3.Connection):
+    """
+    Count loans and returns written with only the TEXT dates in the daily rollups.
+
+    trg_borrow_records_insert_ts fills the *_ts columns after the row is
+    written, so the migration 11 counters saw NULL epoch columns for such
+    writers (add_sample_data, older scripts) and skipped them. The counters
+    now fall back to the TEXT dates, and the loan and return counts are
+    recomputed once to pick up the loans missed so far.
+    """
+    borrow_ts = f"COALESCE({{row}}.borrow_ts, CAST(strftime('%s', {{row}}.borrow_date) AS INTEGER))"
+    return_ts = "COALESCE(NEW.return_ts, CAST(strftime('%s', NEW.return_date) AS INTEGER))"
+    counters = [
+        ('borrow_records_insert', 'INSERT ON borrow_records', f"{borrow_ts.format(row='NEW')} IS NOT NULL",
+         'loans', borrow_ts.format(row='NEW'), 'NEW.book_id', 1),
+        ('borrow_records_return', 'UPDATE OF return_date ON borrow_records',
+         f'{return_ts} IS NOT NULL AND OLD.return_date IS NULL', 'returns', return_ts, 'NEW.book_id', 1),
+        ('borrow_records_delete', 'DELETE ON borrow_records',
+         f"OLD.return_date IS NULL AND {borrow_ts.format(row='OLD')} IS NOT NULL",
+         'loans', borrow_ts.format(row='OLD'), 'OLD.book_id', -1),
+    ]
+    for name, event, condition, column, ts, book_id, change in counters:
+        conn.execute(f'DROP TRIGGER IF EXISTS trg_{name}_daily_circulation')
+        conn.execute(f'''
+            CREATE TRIGGER trg_{name}_daily_circulation
+            AFTER {event}
+            WHEN {condition}
+            BEGIN
+                INSERT INTO daily_circulation (day, book_id, {column})
+                VALUES ({ts} / {SECONDS_PER_DAY}, {book_id}, {change})
+                ON CONFLICT (day, book_id) DO UPDATE SET {column} = {column} + {change};
+            END
+        ''')
+
+    conn.execute('UPDATE daily_circulation SET loans = 0, returns = 0')
+    conn.execute(f'''
+        INSERT INTO daily_circulation (day, book_id, loans, returns) {_ROLLUP_LOAN_COUNTS_QUERY}
+        ON CONFLICT (day, book_id) DO UPDATE SET loans = excluded.loans, returns = excluded.returns
+    ''')
+
+# Ordered (version, description, migration) entries. Append new migrations
+# to the end; never renumber or edit one that has shipped.
+MIGRATIONS = [
+    (1, 'Create books and borrow_records tables', _migrate_initial_schema),
+    (2, 'Add availability filter and sort indexes', _migrate_availability_indexes),
+    (3, 'Add catalog version tracking', _migrate_catalog_version),
+    (4, 'Add integer epoch timestamps to borrow_records', _migrate_epoch_timestamps),
+    (5, 'Add late fee ledger', _migrate_fee_ledger),
+    (6, 'Add open loan (patron, book) lookup index', _migrate_open_loan_lookup_index),
+    (7, 'Add borrow records archive', _migrate_borrow_records_archive),
+    (8, 'Add patron activity version tracking', _migrate_patron_activity),
+    (9, 'Add book hold queue', _migrate_holds),
+    (10, 'Add change event log', _migrate_change_events),
+    (11, 'Add daily circulation rollups', _migrate_daily_circulation),
+    (12, 'Add book borrow counts', _migrate_book_borrow_count),
+    (13, 'Add returned loan history index', _migrate_history_index),
+    (14, 'Count TEXT-dated loans in daily circulation rollups', _migrate_daily_circulation_text_dates),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def run_migrations(dry_run: bool = False, target: Optional[int] = None,
+                   path: Optional[str] = None) -> List[Dict]:
+    """
+    Apply pending schema migrations in order.
+
+    Before applying anything the database is switched to WAL journaling, so
+    readers keep working while migrations write.
+
+    Args:
+        dry_run: Only report the pending migrations, do not apply them
+        target: Highest version to migrate to (defaults to SCHEMA_VERSION)
+        path: Database file to migrate (defaults to DATABASE)
+
+    Returns:
+        List of dicts with version, description and seconds (None on dry runs)
+        for every migration that was pending
+    """
+    target = SCHEMA_VERSION if target is None else target
+    conn = get_db_connection(path)
+    current = get_schema_version(conn)
+    pending = [m for m in MIGRATIONS if current < m[0] <= target]
+
+    results = []
+    if pending and not dry_run:
+        conn.execute('PRAGMA journal_mode = WAL')
+
+    for version, description, migrate in pending:
+        seconds = None
+        if not dry_run:
+            start = time.perf_counter()
+            migrate(conn)
+            conn.execute(f'PRAGMA user_version = {version}')
+            conn.commit()
+            seconds = time.perf_counter() - start
+        results.append({'version': version, 'description': description, 'seconds': seconds})
+
+    conn.close()
+    return results
+
+def migrate_databases(dry_run: bool = False, target: Optional[int] = None) -> List[Dict]:
+    """
+    Apply pending schema migrations to DATABASE and every borrow record shard.
+
+    Args:
+        dry_run: Only report the pending migrations, do not apply them
+        target: Highest version to migrate to (defaults to SCHEMA_VERSION)
+
+    Returns:
+        One dict per database with path, version (before migrating) and
+        results (as returned by run_migrations)
+    """
+    if BORROW_SHARDS:
+        _check_no_unsharded_loans()
+
+    databases = []
+    for shard in [None] + list(range(BORROW_SHARDS)):
+        path = DATABASE if shard is None else get_shard_path(shard)
+        conn = get_db_connection(path)
+        current = get_schema_version(conn)
+        conn.close()
+
+        results = run_migrations(dry_run=dry_run, target=target, path=path)
+        if shard is not None and results and not dry_run:
+            # Start this shard's borrow record ids at its own range (shard 0's
+            # starts at 0), and its change event ids past DATABASE's range
+            conn = get_db_connection(path)
+            conn.executemany('''
+                INSERT INTO sqlite_sequence (name, seq)
+                SELECT ?, ? WHERE NOT EXISTS
+                    (SELECT 1 FROM sqlite_sequence WHERE name = ?)
+            ''', [('borrow_records', shard * SHARD_ID_SPACE, 'borrow_records'),
+                  ('change_events', (shard + 1) * SHARD_ID_SPACE, 'change_events')])
+            conn.commit()
+            conn.close()
+        databases.append({'path': path, 'version': current, 'results': results})
+
+    if BORROW_SHARDS and not dry_run and any(m['version'] == 12 for m in databases[0]['results']):
+        _backfill_shard_borrow_counts()
+    return databases
+
+def _check_no_unsharded_loans():
+    """
+    Refuse to run sharded while DATABASE still holds open loans.
+
+    Once DATABASE_BORROW_SHARDS is set every loan read and write goes to the
+    shards, so open loans left in DATABASE's borrow_records could no longer
+    be returned, charged late fees or counted against the borrowing limit.
+
+    Raises:
+        ValueError: If DATABASE has open borrow records
+    """
+    conn = get_db_connection()
+    try:
+        has_table = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'borrow_records'").fetchone()
+        open_loans = has_table and conn.execute(
+            'SELECT COUNT(*) FROM borrow_records WHERE return_date IS NULL').fetchone()[0]
+    finally:
+        conn.close()
+    if open_loans:
+        raise ValueError(f"DATABASE_BORROW_SHARDS is set but {DATABASE} still has {open_loans} open loans; "
+                         "return them (or unset DATABASE_BORROW_SHARDS) before enabling sharding")
+
+def _backfill_shard_borrow_counts():
+    """
+    Add the loans already recorded on the shards to the catalog's borrow_count.
+
+    Migration 12 backfills each database from its own borrow records, which
+    on the catalog misses every sharded loan. Called once, when the catalog
+    is upgraded to version 12; the shard counts are summed first and applied
+    in one catalog transaction.
+    """
+    counts = Counter()
+    for shard in range(BORROW_SHARDS):
+        conn = get_db_connection(get_shard_path(shard))
+        counts.update(dict(conn.execute('''
+            SELECT book_id, COUNT(*) FROM (
+                SELECT book_id FROM borrow_records
+                UNION ALL
+                SELECT book_id FROM borrow_records_archive
+            )
+            GROUP BY book_id
+        ''').fetchall()))
+        conn.close()
+
+    conn = get_db_connection()
+    conn.executemany('UPDATE books SET borrow_count = borrow_count + ? WHERE id = ?',
+                     [(count, book_id) for book_id, count in counts.items()])
     conn.commit()
     conn.close()
 
+def init_database() -> bool:
+    """
+    Initialize the database with required tables.
+
+    Runs any pending migrations on DATABASE and, with sharding on, on every
+    borrow record shard. Databases already stamped with the current
+    SCHEMA_VERSION are left untouched, so warm starts skip all DDL.
+
+    Returns:
+        bool: True if any schema was created or upgraded, False if all were up to date
+    """
+    return any(migrated['results'] for migrated in migrate_databases())
+
 def add_sample_data():
     """Add sample data to the database if it's empty."""
     conn = get_db_connection()
-    book_count = conn.execute('SELECT COUNT(*) as count FROM books').fetchone()['count']
+    has_books = conn.execute('SELECT 1 FROM books LIMIT 1').fetchone() is not None
     
-    if book_count == 0:
+    if not has_books:
         # Add sample books
         sample_books = [
             ('The Great Gatsby', 'F. Scott Fitzgerald', '9780743273565', 3),
@@ -68,14 +945,6 @@ def add_sample_data():
                 VALUES (?, ?, ?, ?, ?)
             ''', (title, author, isbn, copies, copies))
         
-        # Make 1984 unavailable by adding a borrow record
-        conn.execute('''
-            INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date)
-            VALUES (?, ?, ?, ?)
-        ''', ('123456', 3, 
-              (datetime.now() - timedelta(days=5)).isoformat(),
-              (datetime.now() + timedelta(days=9)).isoformat()))
-        
         # Update available copies for 1984
         conn.execute('UPDATE books SET available_copies = 0 WHERE id = 3')
         
@@ -83,14 +952,116 @@ def add_sample_data():
     
     conn.close()
 
+    if not has_books:
+        # Make 1984 unavailable by adding a borrow record (on the patron's shard when sharded)
+        borrow_date = datetime.now() - timedelta(days=5)
+        insert_borrow_record('123456', 3, borrow_date, borrow_date + timedelta(days=14))
+
+# Compact Row Types
+#
+# Listing helpers can return these tuples instead of one dict per row
+# (pass compact=True). They are immutable, slot-free namedtuples, so a
+# 1M-row listing costs a fraction of the memory of dicts. Templates can use
+# attribute access (book.title) and code written for dicts can keep using
+# book['title']; as_dict() gives the regular dict form for JSON.
+
+class _CompactRecord(tuple):
+    """Mixin for namedtuple records that also accept string keys."""
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return getattr(self, key)
+        return tuple.__getitem__(self, key)
+
+class BookRecord(_CompactRecord, NamedTuple('BookRecord', [
+        ('id', int), ('title', str), ('author', str), ('isbn', str),
+        ('total_copies', int), ('available_copies', int), ('borrow_count', int)])):
+    """A row of the books table."""
+    __slots__ = ()
+
+    def as_dict(self) -> Dict:
+        """Return the row as the dict the non-compact helpers produce."""
+        return dict(zip(self._fields, self))
+
+class LoanRecord(_CompactRecord, NamedTuple('LoanRecord', [
+        ('book_id', int), ('title', str), ('author', str), ('borrow_date', str),
+        ('due_date', str), ('is_overdue', bool)])):
+    """A currently borrowed book, with dates kept as ISO strings."""
+    __slots__ = ()
+
+    def as_dict(self) -> Dict:
+        """Return the loan as get_patron_borrowed_books builds it, with parsed dates."""
+        return {
+            'book_id': self.book_id,
+            'title': self.title,
+            'author': self.author,
+            'borrow_date': datetime.fromisoformat(self.borrow_date),
+            'due_date': datetime.fromisoformat(self.due_date),
+            'is_overdue': bool(self.is_overdue)
+        }
+
+BOOK_COLUMNS = ', '.join(BookRecord._fields)
+
+def _book_record_factory(cursor, row) -> BookRecord:
+    return BookRecord._make(row)
+
 # Helper Functions for Database Operations
 
-def get_all_books() -> List[Dict]:
-    """Get all books from the database."""
-    conn = get_db_connection()
-    books = conn.execute('SELECT * FROM books ORDER BY title').fetchall()
+# Supported sort orders for book listings, keyed by the public sort name
+BOOK_SORT_ORDERS = {
+    'title': 'title',
+    'availability': 'available_copies DESC, title',
+    'popularity': 'borrow_count DESC, title',
+}
+
+def _book_listing_clauses(available_only: bool, sort: str) -> Tuple[str, str]:
+    """Build the availability filter and ORDER BY clause for book listings."""
+    availability_filter = 'available_copies > 0' if available_only else '1'
+    order_by = BOOK_SORT_ORDERS.get(sort, BOOK_SORT_ORDERS['title'])
+    return availability_filter, order_by
+
+def get_all_books(available_only: bool = False, sort: str = 'title',
+                  limit: Optional[int] = None, offset: int = 0, compact: bool = False) -> List[Dict]:
+    """
+    Get all books from the database.
+
+    Args:
+        available_only: Only return books with at least one available copy
+        sort: Sort order ('title', 'availability' or 'popularity')
+        limit: Maximum number of books to return (None for all)
+        offset: Number of books to skip, used with limit for paging
+        compact: Return BookRecord tuples instead of dicts
+
+    Returns:
+        List of books
+    """
+    availability_filter, order_by = _book_listing_clauses(available_only, sort)
+    conn = get_read_connection()
+    if compact:
+        conn.row_factory = _book_record_factory
+    books = conn.execute(f'''
+        SELECT {BOOK_COLUMNS} FROM books WHERE {availability_filter} ORDER BY {order_by}
+        LIMIT ? OFFSET ?
+    ''', (-1 if limit is None else limit, offset)).fetchall()
     conn.close()
-    return [dict(book) for book in books]
+    return books if compact else [dict(book) for book in books]
+
+def get_catalog_version() -> Tuple[int, datetime]:
+    """
+    Get the current catalog version.
+
+    The version increases on every insert, update or delete on books, so it
+    can be used to validate cached catalog and search responses. It is read
+    through get_read_connection, like the listings it validates.
+
+    Returns:
+        tuple: (version: int, updated_at: timezone-aware UTC datetime)
+    """
+    conn = get_read_connection()
+    row = conn.execute('SELECT version, updated_at FROM catalog_version WHERE id = 1').fetchone()
+    conn.close()
+    return row['version'], datetime.fromtimestamp(row['updated_at'], timezone.utc)
 
 def get_book_by_id(book_id: int) -> Optional[Dict]:
     """Get a specific book by ID."""
@@ -106,9 +1077,33 @@ def get_book_by_isbn(isbn: str) -> Optional[Dict]:
     conn.close()
     return dict(book) if book else None
 
-def get_patron_borrowed_books(patron_id: str) -> List[Dict]:
-    """Get currently borrowed books for a patron."""
-    conn = get_db_connection()
+def get_patron_borrowed_books(patron_id: str, compact: bool = False, read_only: bool = True) -> List[Dict]:
+    """
+    Get currently borrowed books for a patron.
+
+    Args:
+        patron_id: 6-digit library card ID
+        compact: Return LoanRecord tuples (ISO date strings, overdue flag
+            computed in SQL) instead of dicts with parsed datetimes
+        read_only: Read through get_read_connection (False reads the primary)
+
+    Returns:
+        List of borrowed books
+    """
+    conn = get_loans_connection(patron_id, read_only=read_only)
+    if compact:
+        conn.row_factory = lambda cursor, row: LoanRecord._make(row)
+        records = conn.execute('''
+            SELECT br.book_id, b.title, b.author, br.borrow_date, br.due_date,
+                   br.due_ts < ? AS is_overdue
+            FROM borrow_records br
+            JOIN books b ON br.book_id = b.id
+            WHERE br.patron_id = ? AND br.return_date IS NULL
+            ORDER BY br.borrow_date
+        ''', (epoch_now(), patron_id)).fetchall()
+        conn.close()
+        return records
+
     records = conn.execute('''
         SELECT br.*, b.title, b.author 
         FROM borrow_records br 
@@ -118,22 +1113,45 @@ def get_patron_borrowed_books(patron_id: str) -> List[Dict]:
     ''', (patron_id,)).fetchall()
     conn.close()
     
+    now = datetime.now()
     borrowed_books = []
     for record in records:
+        due_date = datetime.fromisoformat(record['due_date'])
         borrowed_books.append({
             'book_id': record['book_id'],
             'title': record['title'],
             'author': record['author'],
             'borrow_date': datetime.fromisoformat(record['borrow_date']),
-            'due_date': datetime.fromisoformat(record['due_date']),
-            'is_overdue': datetime.now() > datetime.fromisoformat(record['due_date'])
+            'due_date': due_date,
+            'is_overdue': now > due_date
         })
     
     return borrowed_books
 
+def get_patron_activity_version(patron_id: str) -> int:
+    """
+    Get a patron's activity version.
+
+    The version increases whenever one of the patron's loans is created,
+    returned or removed, or a late fee payment is recorded, so it can be used
+    to validate cached patron reports (a single primary key lookup).
+
+    Returns:
+        int: The version, 0 for patrons with no recorded activity
+    """
+    conn = get_loans_connection(patron_id)
+    row = conn.execute('SELECT version FROM patron_activity WHERE patron_id = ?', (patron_id,)).fetchone()
+    conn.close()
+    return row['version'] if row else 0
+
 def get_patron_borrow_count(patron_id: str) -> int:
-    """Get the number of books currently borrowed by a patron."""
-    conn = get_db_connection()
+    """
+    Get the number of books currently borrowed by a patron.
+
+    The borrowing limit is enforced from this count, so it always reads the
+    primary (or the patron's shard), never a replica.
+    """
+    conn = get_loans_connection(patron_id)
     count = conn.execute('''
         SELECT COUNT(*) as count FROM borrow_records 
         WHERE patron_id = ? AND return_date IS NULL
@@ -151,59 +1169,447 @@ def insert_book(title: str, author: str, isbn: str, total_copies: int, available
         ''', (title, author, isbn, total_copies, available_copies))
         conn.commit()
         conn.close()
-        return True
+        return True
+    except Exception as e:
+        conn.close()
+        return False
+
+def insert_borrow_record(patron_id: str, book_id: int, borrow_date: datetime, due_date: datetime) -> bool:
+    """Insert a new borrow record into the database."""
+    conn = get_loans_connection(patron_id)
+    try:
+        conn.execute('''
+            INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date, borrow_ts, due_ts)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (patron_id, book_id, borrow_date.isoformat(), due_date.isoformat(),
+              to_epoch(borrow_date), to_epoch(due_date)))
+        _count_shard_borrow(conn, book_id, 1)
+        conn.commit()
+        conn.close()
+        return True
+    except Exception as e:
+        conn.close()
+        return False
+
+def _execute_write_with_retry(sql: str, params: Tuple) -> int:
+    """
+    Run one write statement in its own transaction, retrying if the database stays locked.
+
+    Returns:
+        int: Number of rows changed
+    """
+    for attempt in range(WRITE_RETRIES):
+        conn = get_db_connection()
+        try:
+            changed = conn.execute(sql, params).rowcount
+            conn.commit()
+            return changed
+        except sqlite3.OperationalError as e:
+            if 'locked' not in str(e) or attempt == WRITE_RETRIES - 1:
+                raise
+            time.sleep(WRITE_RETRY_DELAY * 2 ** attempt)
+        finally:
+            conn.close()
+
+def update_book_availability(book_id: int, change: int) -> bool:
+    """
+    Update the available copies of a book by a given amount (+1 for return, -1 for borrow).
+
+    The update is conditional: it never takes available_copies below zero,
+    so concurrent borrows of the last copy cannot both succeed. Check the
+    result instead of reading availability beforehand.
+
+    Returns:
+        bool: False if the book has too few copies available or the update
+            failed. Like a plain UPDATE, a missing book is not an error;
+            callers look the book up first.
+    """
+    try:
+        changed = _execute_write_with_retry('''
+            UPDATE books SET available_copies = available_copies + ?
+            WHERE id = ? AND available_copies + ? >= 0
+        ''', (change, book_id, change))
+        return changed == 1 or get_book_by_id(book_id) is None
+    except Exception as e:
+        return False
+
+def cancel_borrow_record(patron_id: str, book_id: int) -> bool:
+    """Delete a patron's most recent open borrow record for a book (undoes insert_borrow_record)."""
+    conn = get_loans_connection(patron_id)
+    try:
+        deleted = conn.execute('''
+            DELETE FROM borrow_records WHERE id = (
+                SELECT id FROM borrow_records
+                WHERE patron_id = ? AND book_id = ? AND return_date IS NULL
+                ORDER BY borrow_date DESC, id DESC
+                LIMIT 1
+            )
+        ''', (patron_id, book_id)).rowcount
+        if deleted:
+            _count_shard_borrow(conn, book_id, -1)
+        conn.commit()
+        conn.close()
+        return True
+    except Exception as e:
+        conn.close()
+        return False
+
+def update_borrow_record_return_date(patron_id: str, book_id: int, return_date: datetime) -> bool:
+    """Update the return date for a borrow record."""
+    conn = get_loans_connection(patron_id)
+    try:
+        conn.execute('''
+            UPDATE borrow_records
+            SET return_date = ?, return_ts = ?
+            WHERE patron_id = ? AND book_id = ? AND return_date IS NULL
+        ''', (return_date.isoformat(), to_epoch(return_date), patron_id, book_id))
+        conn.commit()
+        conn.close()
+        return True
+    except Exception as e:
+        conn.close()
+        return False
+
+def borrow_books_in_cart(patron_id: str, book_ids: List[int], borrow_date: datetime,
+                        due_date: datetime, max_borrowed: int) -> Dict:
+    """
+    Borrow a cart of books for one patron in a single write transaction.
+
+    The transaction takes the write lock up front (BEGIN IMMEDIATE), so the
+    patron's borrow count and each book's availability cannot change between
+    being checked and being updated. If the open loans plus the borrowable
+    books in the cart would exceed max_borrowed, nothing is borrowed.
+
+    A copy set aside for one of the patron's ready holds is borrowed even when
+    none are on the shelf, and the patron's holds on borrowed books are removed.
+
+    Args:
+        patron_id: 6-digit library card ID (already validated)
+        book_ids: Distinct IDs of the books in the cart
+        borrow_date: Borrow date for every loan
+        due_date: Due date for every loan
+        max_borrowed: Maximum open loans a patron may hold
+
+    Returns:
+        dict: current_borrowed (open loans before the cart) and items, a list of
+            {'book_id', 'outcome', 'title'} in cart order, where outcome is one of
+            'borrowed', 'not_found', 'unavailable', 'limit_exceeded' or 'error'
+    """
+    catalog = loans_catalog_schema()
+    conn = get_loans_connection(patron_id)
+    try:
+        # On a shard this also takes the attached catalog's write lock
+        conn.execute('BEGIN IMMEDIATE')
+        current_borrowed = conn.execute('''
+            SELECT COUNT(*) FROM borrow_records WHERE patron_id = ? AND return_date IS NULL
+        ''', (patron_id,)).fetchone()[0]
+
+        placeholders = ', '.join('?' * len(book_ids))
+        books = {row['id']: row for row in conn.execute(
+            f'SELECT id, title, available_copies FROM books WHERE id IN ({placeholders})', book_ids)}
+        holds = {row['book_id']: row for row in conn.execute(f'''
+            SELECT id, book_id, status FROM {catalog}.holds
+            WHERE patron_id = ? AND book_id IN ({placeholders})
+        ''', [patron_id, *book_ids])}
+        reserved = {book_id for book_id, hold in holds.items() if hold['status'] == 'ready'}
+
+        items = []
+        for book_id in book_ids:
+            book = books.get(book_id)
+            if book is None:
+                outcome = 'not_found'
+            elif book['available_copies'] <= 0 and book_id not in reserved:
+                outcome = 'unavailable'
+            else:
+                outcome = 'borrowed'
+            items.append({'book_id': book_id, 'outcome': outcome, 'title': book['title'] if book else None})
+
+        to_borrow = [item for item in items if item['outcome'] == 'borrowed']
+        if current_borrowed + len(to_borrow) > max_borrowed:
+            for item in to_borrow:
+                item['outcome'] = 'limit_exceeded'
+            to_borrow = []
+
+        conn.executemany('''
+            INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date, borrow_ts, due_ts)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [(patron_id, item['book_id'], borrow_date.isoformat(), due_date.isoformat(),
+               to_epoch(borrow_date), to_epoch(due_date)) for item in to_borrow])
+        # Reserved copies already left the shelf when their hold became ready
+        conn.executemany(f'''
+            UPDATE {catalog}.books SET available_copies = available_copies - 1 WHERE id = ?
+        ''', [(item['book_id'],) for item in to_borrow if item['book_id'] not in reserved])
+        conn.executemany(f'DELETE FROM {catalog}.holds WHERE id = ?',
+                         [(holds[item['book_id']]['id'],) for item in to_borrow if item['book_id'] in holds])
+        for item in to_borrow:
+            _count_shard_borrow(conn, item['book_id'], 1)
+        conn.commit()
+        conn.close()
+        return {'current_borrowed': current_borrowed, 'items': items}
+    except Exception as e:
+        conn.rollback()
+        conn.close()
+        return {
+            'current_borrowed': None,
+            'items': [{'book_id': book_id, 'outcome': 'error', 'title': None} for book_id in book_ids]
+        }
+
+def return_books_in_cart(patron_id: str, book_ids: List[int], return_date: datetime) -> List[Dict]:
+    """
+    Return a cart of books for one patron in a single write transaction.
+
+    Each returned copy is set aside for the next waiting hold on its book in
+    the same transaction, so no other patron can borrow it in between.
+
+    Args:
+        patron_id: 6-digit library card ID (already validated)
+        book_ids: Distinct IDs of the books in the cart
+        return_date: Return date for every loan
+
+    Returns:
+        list: {'book_id', 'outcome', 'title', 'record', 'hold'} in cart order,
+            where outcome is one of 'returned', 'not_found', 'not_borrowed' or
+            'error', record is the borrow record as it was before being closed
+            and hold is the hold the returned copy was set aside for (or None)
+    """
+    catalog = loans_catalog_schema()
+    conn = get_loans_connection(patron_id)
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        placeholders = ', '.join('?' * len(book_ids))
+        titles = {row['id']: row['title'] for row in conn.execute(
+            f'SELECT id, title FROM books WHERE id IN ({placeholders})', book_ids)}
+        # Ordered by borrow date so the most recent open loan of each book wins
+        records = {row['book_id']: dict(row) for row in conn.execute(f'''
+            SELECT * FROM borrow_records
+            WHERE patron_id = ? AND book_id IN ({placeholders}) AND return_date IS NULL
+            ORDER BY borrow_date
+        ''', [patron_id, *book_ids])}
+
+        items = []
+        for book_id in book_ids:
+            record = records.get(book_id)
+            if book_id not in titles:
+                outcome = 'not_found'
+            elif record is None:
+                outcome = 'not_borrowed'
+            else:
+                outcome = 'returned'
+            items.append({'book_id': book_id, 'outcome': outcome,
+                          'title': titles.get(book_id), 'record': record, 'hold': None})
+
+        returned = [item for item in items if item['outcome'] == 'returned']
+        conn.executemany('''
+            UPDATE borrow_records SET return_date = ?, return_ts = ? WHERE id = ?
+        ''', [(return_date.isoformat(), to_epoch(return_date), item['record']['id']) for item in returned])
+        conn.executemany(f'''
+            UPDATE {catalog}.books SET available_copies = available_copies + 1 WHERE id = ?
+        ''', [(item['book_id'],) for item in returned])
+        for item in returned:
+            item['hold'] = _assign_next_hold(conn, item['book_id'], catalog)
+        conn.commit()
+        conn.close()
+        return items
     except Exception as e:
+        conn.rollback()
         conn.close()
-        return False
+        return [{'book_id': book_id, 'outcome': 'error', 'title': None, 'record': None, 'hold': None}
+                for book_id in book_ids]
 
-def insert_borrow_record(patron_id: str, book_id: int, borrow_date: datetime, due_date: datetime) -> bool:
-    """Insert a new borrow record into the database."""
+def get_hold(patron_id: str, book_id: int) -> Optional[Dict]:
+    """Get a patron's hold on a book, waiting or ready for pickup."""
+    conn = get_db_connection()
+    hold = conn.execute('''
+        SELECT * FROM holds WHERE patron_id = ? AND book_id = ?
+    ''', (patron_id, book_id)).fetchone()
+    conn.close()
+    return dict(hold) if hold else None
+
+def get_patron_holds(patron_id: str) -> List[Dict]:
+    """
+    Get a patron's holds with book titles, oldest first.
+
+    queue_position is the hold's place among the book's waiting holds
+    (1 is next in line), or None once a copy is ready for pickup.
+    """
+    conn = get_db_connection()
+    holds = conn.execute('''
+        SELECT h.book_id, b.title, b.author, h.status, h.placed_ts, h.ready_ts,
+               CASE WHEN h.status = 'waiting' THEN (
+                   SELECT COUNT(*) FROM holds w
+                   WHERE w.book_id = h.book_id AND w.position <= h.position AND w.status = 'waiting'
+               ) END AS queue_position
+        FROM holds h
+        JOIN books b ON h.book_id = b.id
+        WHERE h.patron_id = ?
+        ORDER BY h.placed_ts, h.id
+    ''', (patron_id,)).fetchall()
+    conn.close()
+    return [dict(hold) for hold in holds]
+
+def place_hold(patron_id: str, book_id: int) -> Dict:
+    """
+    Add a patron to the end of a book's hold queue.
+
+    Holds are only placed on books with no copies available. The new hold's
+    position is one past the book's highest, read from the (book_id,
+    position) index inside the same write transaction.
+
+    Args:
+        patron_id: 6-digit library card ID (already validated)
+        book_id: ID of the book to hold
+
+    Returns:
+        dict: outcome ('placed', 'not_found', 'available', 'duplicate' or
+            'error') and queue_position (1 is next in line) when placed
+    """
     conn = get_db_connection()
     try:
-        conn.execute('''
-            INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date)
-            VALUES (?, ?, ?, ?)
-        ''', (patron_id, book_id, borrow_date.isoformat(), due_date.isoformat()))
+        conn.execute('BEGIN IMMEDIATE')
+        book = conn.execute('SELECT available_copies FROM books WHERE id = ?', (book_id,)).fetchone()
+        if book is None:
+            outcome = 'not_found'
+        elif book['available_copies'] > 0:
+            outcome = 'available'
+        elif conn.execute('SELECT 1 FROM holds WHERE patron_id = ? AND book_id = ?',
+                          (patron_id, book_id)).fetchone():
+            outcome = 'duplicate'
+        else:
+            outcome = 'placed'
+
+        queue_position = None
+        if outcome == 'placed':
+            conn.execute('''
+                INSERT INTO holds (patron_id, book_id, position, placed_ts)
+                SELECT ?, ?, COALESCE(MAX(position), 0) + 1, ? FROM holds WHERE book_id = ?
+            ''', (patron_id, book_id, epoch_now(), book_id))
+            queue_position = conn.execute('''
+                SELECT COUNT(*) FROM holds WHERE book_id = ? AND status = 'waiting'
+            ''', (book_id,)).fetchone()[0]
         conn.commit()
         conn.close()
-        return True
+        return {'outcome': outcome, 'queue_position': queue_position}
     except Exception as e:
+        conn.rollback()
         conn.close()
-        return False
+        return {'outcome': 'error', 'queue_position': None}
 
-def update_book_availability(book_id: int, change: int) -> bool:
-    """Update the available copies of a book by a given amount (+1 for return, -1 for borrow)."""
+def _assign_next_hold(conn: sqlite3.Connection, book_id: int, catalog: str = 'main') -> Optional[Dict]:
+    """
+    Set an available copy of a book aside for the next waiting hold.
+
+    The next hold is the first waiting one in the (book_id, position) index,
+    so finding it costs one index seek however long the queue is.
+
+    Args:
+        conn: Connection inside a write transaction
+        book_id: ID of the book
+        catalog: Schema holding books and holds (see loans_catalog_schema)
+
+    Returns:
+        dict: The hold that was made ready, or None if nobody is waiting or
+            no copy is available
+    """
+    hold = conn.execute(f'''
+        SELECT id, patron_id, book_id FROM {catalog}.holds
+        WHERE book_id = ? AND status = 'waiting'
+        ORDER BY position
+        LIMIT 1
+    ''', (book_id,)).fetchone()
+    if hold is None:
+        return None
+    taken = conn.execute(f'''
+        UPDATE {catalog}.books SET available_copies = available_copies - 1
+        WHERE id = ? AND available_copies > 0
+    ''', (book_id,)).rowcount
+    if not taken:
+        return None
+    conn.execute(f'''
+        UPDATE {catalog}.holds SET status = 'ready', ready_ts = ? WHERE id = ?
+    ''', (epoch_now(), hold['id']))
+    return dict(hold)
+
+def return_book_copy(book_id: int) -> Tuple[bool, Optional[Dict]]:
+    """
+    Put a returned copy back, setting it aside for the next patron in the
+    book's hold queue if anyone is waiting.
+
+    The copy is added and the hold assigned in one write transaction, so no
+    other patron can borrow the copy in between.
+
+    Returns:
+        tuple: (success, the hold that is now ready for pickup, or None if
+            nobody is waiting and the copy went back on the shelf)
+    """
     conn = get_db_connection()
     try:
-        conn.execute('''
-            UPDATE books SET available_copies = available_copies + ? WHERE id = ?
-        ''', (change, book_id))
+        conn.execute('BEGIN IMMEDIATE')
+        changed = conn.execute('''
+            UPDATE books SET available_copies = available_copies + 1 WHERE id = ?
+        ''', (book_id,)).rowcount
+        hold = _assign_next_hold(conn, book_id) if changed else None
         conn.commit()
         conn.close()
-        return True
+        return changed == 1, hold
     except Exception as e:
+        conn.rollback()
         conn.close()
-        return False
+        return False, None
 
-def update_borrow_record_return_date(patron_id: str, book_id: int, return_date: datetime) -> bool:
-    """Update the return date for a borrow record."""
+def cancel_hold(patron_id: str, book_id: int) -> Optional[Dict]:
+    """
+    Remove a patron's hold on a book.
+
+    A copy that was set aside for a ready hold passes to the next patron in
+    line, or goes back on the shelf if nobody is waiting.
+
+    Returns:
+        dict: The cancelled hold, or None if the patron had no hold on the
+            book or the update failed
+    """
     conn = get_db_connection()
     try:
-        conn.execute('''
-            UPDATE borrow_records
-            SET return_date = ?
-            WHERE patron_id = ? AND book_id = ? AND return_date IS NULL
-        ''', (return_date.isoformat(), patron_id, book_id))
+        conn.execute('BEGIN IMMEDIATE')
+        hold = conn.execute('''
+            SELECT * FROM holds WHERE patron_id = ? AND book_id = ?
+        ''', (patron_id, book_id)).fetchone()
+        if hold is not None:
+            conn.execute('DELETE FROM holds WHERE id = ?', (hold['id'],))
+            if hold['status'] == 'ready':
+                conn.execute('''
+                    UPDATE books SET available_copies = available_copies + 1 WHERE id = ?
+                ''', (book_id,))
+                _assign_next_hold(conn, book_id)
         conn.commit()
         conn.close()
-        return True
+        return dict(hold) if hold else None
     except Exception as e:
+        conn.rollback()
         conn.close()
+        return None
+
+def remove_hold(hold_id: int, status: Optional[str] = None) -> bool:
+    """
+    Delete a hold once its patron has borrowed the book.
+
+    Args:
+        hold_id: ID of the hold
+        status: Only delete the hold if it still has this status
+
+    Returns:
+        bool: True if the hold was deleted
+    """
+    try:
+        changed = _execute_write_with_retry('''
+            DELETE FROM holds WHERE id = ? AND status = COALESCE(?, status)
+        ''', (hold_id, status))
+        return changed == 1
+    except Exception as e:
         return False
 
 def get_borrow_record(patron_id: str, book_id: int) -> Optional[Dict]:
     """Get a specific borrow record for a patron and book."""
-    conn = get_db_connection()
+    conn = get_loans_connection(patron_id)
     record = conn.execute('''
         SELECT * FROM borrow_records
         WHERE patron_id = ? AND book_id = ? AND return_date IS NULL
@@ -213,58 +1619,785 @@ def get_borrow_record(patron_id: str, book_id: int) -> Optional[Dict]:
     conn.close()
     return dict(record) if record else None
 
-def search_books(search_term: str, search_type: str) -> List[Dict]:
+def get_borrow_records_for_pairs(pairs: List[Tuple[str, int]]) -> Dict[Tuple[str, int], Dict]:
+    """
+    Get the active borrow records for many (patron_id, book_id) pairs in one query
+    (one per shard holding any of the patrons, with sharding on).
+
+    Args:
+        pairs: (patron_id, book_id) tuples
+
+    Returns:
+        dict: Maps each pair with an active loan to its most recent borrow record
+    """
+    unique_pairs = list(dict.fromkeys(pairs))
+    if not unique_pairs:
+        return {}
+
+    # One query per database holding any of the patrons (just DATABASE when unsharded)
+    groups = {}
+    for pair in unique_pairs:
+        groups.setdefault(shard_for_patron(pair[0]) if BORROW_SHARDS else None, []).append(pair)
+
+    found = {}
+    for group in groups.values():
+        placeholders = ', '.join(['(?, ?)'] * len(group))
+        params = [value for pair in group for value in pair]
+        conn = get_loans_connection(group[0][0])
+        records = conn.execute(f'''
+            WITH pairs (patron_id, book_id) AS (VALUES {placeholders})
+            SELECT br.* FROM pairs p
+            JOIN borrow_records br
+              ON br.patron_id = p.patron_id AND br.book_id = p.book_id AND br.return_date IS NULL
+            ORDER BY br.borrow_date
+        ''', params).fetchall()
+        conn.close()
+
+        # Later borrow dates overwrite earlier ones, matching get_borrow_record
+        found.update({(record['patron_id'], record['book_id']): dict(record) for record in records})
+    return found
+
+def get_overdue_loans(as_of_ts: int, limit: int = 100,
+                      after: Optional[Tuple[int, int]] = None) -> List[Dict]:
+    """
+    Get open loans that are past due, oldest due date first.
+
+    Served by a range scan on idx_borrow_records_open_due; pages are keyed
+    on (due_ts, id) so each page costs the same however deep it is. With
+    sharding on, every shard is queried in parallel and the pages are merged.
+
+    Args:
+        as_of_ts: Epoch seconds (see to_epoch) the loans are overdue at
+        limit: Maximum number of loans to return
+        after: (due_ts, id) of the last loan on the previous page
+
+    Returns:
+        List of loans with patron, book and date fields plus days_overdue
+    """
+    after_due_ts, after_id = after if after else (-1, -1)
+
+    def query(conn):
+        return [dict(record) for record in conn.execute('''
+            SELECT br.id, br.patron_id, br.book_id, b.title, b.author,
+                   br.borrow_date, br.due_date, br.due_ts,
+                   (? - br.due_ts) / ? AS days_overdue
+            FROM borrow_records br
+            JOIN books b ON br.book_id = b.id
+            WHERE br.return_ts IS NULL AND br.due_ts < ?
+              AND (br.due_ts, br.id) > (?, ?)
+            ORDER BY br.due_ts, br.id
+            LIMIT ?
+        ''', (as_of_ts, SECONDS_PER_DAY, as_of_ts, after_due_ts, after_id, limit))]
+
+    # Each shard returns its first page; merging keeps the global (due_ts, id) order
+    pages = fan_out_shards(query)
+    merged = heapq.merge(*pages, key=lambda record: (record['due_ts'], record['id']))
+    return list(merged)[:limit]
+
+# Relevance of a title or author match (exact, then prefix, then the start of
+# a later word, then anywhere), with more borrowed books first among equals
+_RELEVANCE_ORDER = '''
+    CASE WHEN LOWER({column}) = LOWER(?) THEN 0
+         WHEN LOWER({column}) LIKE LOWER(?) || '%' THEN 1
+         WHEN LOWER({column}) LIKE '% ' || LOWER(?) || '%' THEN 2
+         ELSE 3 END,
+    borrow_count DESC, title
+'''
+
+def search_books(search_term: str, search_type: str, available_only: bool = False,
+                 sort: str = 'title', compact: bool = False) -> List[Dict]:
     """
     Search for books in the database.
 
     Args:
         search_term: The term to search for
         search_type: Type of search ('title', 'author', or 'isbn')
+        available_only: Only return books with at least one available copy
+        sort: Sort order ('title', 'availability', 'popularity' or
+            'relevance'; ISBN matches are exact, so relevance sorts them by title)
+        compact: Return BookRecord tuples instead of dicts
 
     Returns:
         List of matching books
     """
-    conn = get_db_connection()
+    availability_filter, order_by = _book_listing_clauses(available_only, sort)
+    order_params = ()
+    if sort == 'relevance' and search_type in ('title', 'author'):
+        order_by = _RELEVANCE_ORDER.format(column=search_type)
+        order_params = (search_term,) * 3
+    conn = get_read_connection()
+    if compact:
+        conn.row_factory = _book_record_factory
 
     if search_type == 'isbn':
         # Exact match for ISBN
-        books = conn.execute('''
-            SELECT * FROM books WHERE isbn = ? ORDER BY title
+        books = conn.execute(f'''
+            SELECT {BOOK_COLUMNS} FROM books WHERE isbn = ? AND {availability_filter} ORDER BY {order_by}
         ''', (search_term,)).fetchall()
     elif search_type == 'author':
         # Partial, case-insensitive match for author
-        books = conn.execute('''
-            SELECT * FROM books WHERE LOWER(author) LIKE LOWER(?) ORDER BY title
-        ''', (f'%{search_term}%',)).fetchall()
+        books = conn.execute(f'''
+            SELECT {BOOK_COLUMNS} FROM books WHERE LOWER(author) LIKE LOWER(?) AND {availability_filter}
+            ORDER BY {order_by}
+        ''', (f'%{search_term}%', *order_params)).fetchall()
     else:  # Default to title
         # Partial, case-insensitive match for title
-        books = conn.execute('''
-            SELECT * FROM books WHERE LOWER(title) LIKE LOWER(?) ORDER BY title
-        ''', (f'%{search_term}%',)).fetchall()
+        books = conn.execute(f'''
+            SELECT {BOOK_COLUMNS} FROM books WHERE LOWER(title) LIKE LOWER(?) AND {availability_filter}
+            ORDER BY {order_by}
+        ''', (f'%{search_term}%', *order_params)).fetchall()
 
     conn.close()
-    return [dict(book) for book in books]
+    return books if compact else [dict(book) for book in books]
 
-def get_borrowing_history(patron_id: str) -> List[Dict]:
-    """Get the complete borrowing history for a patron."""
-    conn = get_db_connection()
-    records = conn.execute('''
-        SELECT br.*, b.title, b.author
+def load_loan_columns(batch_size: int = 50000) -> Dict[str, array]:
+    """
+    Read every loan, hot and archived, into one typed array per column.
+
+    Rows are streamed in batches of batch_size, so memory holds the packed
+    8-byte columns rather than millions of row objects. Unsharded, this reads
+    through get_read_connection, so it can run against a replica.
+
+    Returns:
+        dict: book_id, borrow_ts, due_ts and return_ts arrays (typecode 'q',
+            one entry per loan; return_ts is -1 for open loans)
+    """
+    columns = {name: array('q') for name in ('book_id', 'borrow_ts', 'due_ts', 'return_ts')}
+    lock = threading.Lock()
+
+    def query(conn):
+        cursor = conn.execute('''
+            SELECT book_id, borrow_ts, due_ts, COALESCE(return_ts, -1) FROM borrow_records
+            WHERE borrow_ts IS NOT NULL AND due_ts IS NOT NULL
+            UNION ALL
+            SELECT book_id, borrow_ts, due_ts, COALESCE(return_ts, -1) FROM borrow_records_archive
+            WHERE borrow_ts IS NOT NULL AND due_ts IS NOT NULL
+        ''')
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            with lock:
+                for column, values in zip(columns.values(), zip(*rows)):
+                    column.extend(values)
+
+    fan_out_shards(query, read_only=True)
+    return columns
+
+# Returned loans for a patron from both the hot and the archive table
+_HISTORY_QUERY = '''
+    SELECT h.*, b.title, b.author
+    FROM (
+        SELECT id, book_id, borrow_date, due_date, return_date FROM borrow_records
+        WHERE patron_id = :patron_id AND return_date IS NOT NULL
+          AND (borrow_date, id) < (:before_date, :before_id)
+        UNION ALL
+        SELECT id, book_id, borrow_date, due_date, return_date FROM borrow_records_archive
+        WHERE patron_id = :patron_id
+          AND (borrow_date, id) < (:before_date, :before_id)
+    ) h
+    JOIN books b ON h.book_id = b.id
+    ORDER BY h.borrow_date DESC, h.id DESC
+'''
+
+def _history_params(patron_id: str, before: Optional[Tuple[str, int]]) -> Dict:
+    # '~' sorts after every ISO date, so no cursor means no bound
+    before_date, before_id = before if before else ('~', 0)
+    return {'patron_id': patron_id, 'before_date': before_date, 'before_id': before_id}
+
+def _history_entry(record) -> Dict:
+    return {
+        'id': record['id'],
+        'book_id': record['book_id'],
+        'title': record['title'],
+        'author': record['author'],
+        'borrow_date': datetime.fromisoformat(record['borrow_date']),
+        'due_date': datetime.fromisoformat(record['due_date']),
+        'return_date': datetime.fromisoformat(record['return_date'])
+    }
+
+def get_borrowing_history(patron_id: str, limit: Optional[int] = None, offset: int = 0,
+                          before: Optional[Tuple[str, int]] = None, read_only: bool = True) -> List[Dict]:
+    """
+    Get the borrowing history (returned loans) for a patron, newest first.
+
+    Recent loans come from borrow_records and older ones from
+    borrow_records_archive; both are merged into one ordered list.
+
+    Args:
+        patron_id: 6-digit library card ID
+        limit: Maximum number of loans to return (None for all)
+        offset: Number of loans to skip, used with limit for paging
+        before: (borrow_date ISO string, id) of the last loan on the previous
+            page; only older loans are returned (keyset paging)
+        read_only: Read through get_read_connection (False reads the primary)
+
+    Returns:
+        List of returned loans
+    """
+    params = _history_params(patron_id, before)
+    params.update(limit=-1 if limit is None else limit, offset=offset)
+    conn = get_loans_connection(patron_id, read_only=read_only)
+    records = conn.execute(_HISTORY_QUERY + ' LIMIT :limit OFFSET :offset', params).fetchall()
+    conn.close()
+    return [_history_entry(record) for record in records]
+
+def iter_borrowing_history(patron_id: str, batch_size: int = 500):
+    """
+    Stream a patron's complete borrowing history, newest first.
+
+    Rows are fetched batch_size at a time from one open cursor, so memory
+    use stays flat however long the history is.
+
+    Yields:
+        Returned loans, as from get_borrowing_history
+    """
+    conn = get_loans_connection(patron_id, read_only=True)
+    try:
+        cursor = conn.execute(_HISTORY_QUERY, _history_params(patron_id, None))
+        while True:
+            records = cursor.fetchmany(batch_size)
+            if not records:
+                return
+            for record in records:
+                yield _history_entry(record)
+    finally:
+        conn.close()
+
+def archive_returned_loans(returned_before_ts: int, batch_size: Optional[int] = None) -> int:
+    """
+    Move returned loans into borrow_records_archive, one batch per transaction.
+
+    Loans whose fee ledger entry is still open or unpaid stay in
+    borrow_records; archived rows keep the accrued fee and amount paid.
+    With sharding on, every shard is archived in parallel.
+
+    Args:
+        returned_before_ts: Epoch seconds; loans returned before this are archived
+        batch_size: Rows moved per transaction (defaults to ARCHIVE_BATCH_SIZE)
+
+    Returns:
+        int: Number of loans archived
+    """
+    batch_size = batch_size or ARCHIVE_BATCH_SIZE
+    archived_ts = epoch_now()
+
+    def archive(conn):
+        moved = 0
+        while True:
+            ids = [row[0] for row in conn.execute('''
+                SELECT br.id FROM borrow_records br
+                WHERE br.return_ts < ?
+                  AND NOT EXISTS (
+                      SELECT 1 FROM fee_ledger fl
+                      WHERE fl.borrow_record_id = br.id
+                        AND (fl.closed = 0 OR fl.paid_amount < fl.accrued_fee)
+                  )
+                ORDER BY br.return_ts
+                LIMIT ?
+            ''', (returned_before_ts, batch_size))]
+            if not ids:
+                return moved
+
+            placeholders = ', '.join('?' * len(ids))
+            conn.execute(f'''
+                INSERT INTO borrow_records_archive
+                    (id, patron_id, book_id, borrow_date, due_date, return_date,
+                     borrow_ts, due_ts, return_ts, late_fee, fee_paid, archived_ts)
+                SELECT br.id, br.patron_id, br.book_id, br.borrow_date, br.due_date, br.return_date,
+                       br.borrow_ts, br.due_ts, br.return_ts,
+                       COALESCE(fl.accrued_fee, 0), COALESCE(fl.paid_amount, 0), ?
+                FROM borrow_records br
+                LEFT JOIN fee_ledger fl ON fl.borrow_record_id = br.id
+                WHERE br.id IN ({placeholders})
+            ''', [archived_ts, *ids])
+            # Also removes the loans' settled ledger rows (trg_borrow_records_delete_fee_ledger)
+            conn.execute(f'DELETE FROM borrow_records WHERE id IN ({placeholders})', ids)
+            conn.commit()
+            moved += len(ids)
+
+    return sum(fan_out_shards(archive))
+
+# Change Event Log
+#
+# Triggers append one change_events row per catalog or loan change, in the
+# same transaction as the change. With sharding on, loan events are logged
+# in the shard holding the loan, so readers merge DATABASE and every shard;
+# each shard's event ids start in their own range (see migrate_databases),
+# so ids stay unique across the merged log.
+
+def get_change_event_sources() -> List[str]:
+    """Database files holding change events: DATABASE, then each borrow record shard."""
+    return [DATABASE] + [get_shard_path(shard) for shard in range(BORROW_SHARDS)]
+
+def get_change_events(after_id: int = 0, limit: int = 100, path: Optional[str] = None) -> List[Dict]:
+    """
+    Get change events logged in one database after a given event, oldest first.
+
+    Event ids only grow, and SQLite commits one writer at a time, so an id
+    is never committed after a higher one; consumers can resume from the
+    last id they processed without missing events.
+
+    Args:
+        after_id: ID of the last event already read (0 for the start of the log)
+        limit: Maximum number of events to return
+        path: Database file to read (defaults to DATABASE)
+
+    Returns:
+        list: Events with id, ts, event_type, book_id, patron_id,
+            borrow_record_id and data (a dict of the changed values)
+    """
+    conn = get_db_connection(path)
+    events = conn.execute('''
+        SELECT * FROM change_events WHERE id > ? ORDER BY id LIMIT ?
+    ''', (after_id, limit)).fetchall()
+    conn.close()
+    return [{**dict(event), 'data': json.loads(event['data'])} for event in events]
+
+def get_merged_change_events(after_ids: List[int], limit: int = 100) -> List[Dict]:
+    """
+    Get the change events logged after a position in every database, merged by time.
+
+    Each database's events stay in id order, so a reader that keeps one
+    position per database (the highest id it has read from it) never misses
+    an event however the databases' clocks interleave.
+
+    Args:
+        after_ids: ID of the last event already read from each database, in
+            get_change_event_sources order
+        limit: Maximum number of events to return
+
+    Returns:
+        list: Events as from get_change_events, each with source, the index
+            of its database in get_change_event_sources
+    """
+    pages = []
+    for source, (path, after_id) in enumerate(zip(get_change_event_sources(), after_ids)):
+        pages.append([dict(event, source=source) for event in get_change_events(after_id, limit, path)])
+    merged = heapq.merge(*pages, key=lambda event: event['ts'])
+    return list(merged)[:limit]
+
+# Late Fee Ledger
+#
+# fee_ledger holds one row per overdue loan with the fee accrued so far and
+# the amount paid against it. Rows are advanced by the incremental accrual
+# job (services.library_service.accrue_late_fees) and by recorded payments.
+
+def get_fee_ledger_last_run() -> Optional[int]:
+    """
+    Get the epoch seconds the accrual job last ran at (None if never).
+
+    With sharding on, this is the earliest run recorded by any shard, so a
+    run that failed part-way is redone from where the lagging shard stopped.
+    """
+    def last_run(conn):
+        row = conn.execute('SELECT last_run_ts FROM fee_ledger_state WHERE id = 1').fetchone()
+        return row['last_run_ts'] if row else None
+
+    runs = fan_out_shards(last_run)
+    return None if None in runs else min(runs)
+
+def get_fee_accrual_candidates(as_of_ts: int, last_run_ts: Optional[int],
+                               due_since_ts: Optional[int]) -> List[Dict]:
+    """
+    Get the loans whose late fee may have changed since the last accrual run.
+
+    Both parts are range scans on the partial epoch indexes:
+    - open loans that fell due on or after due_since_ts (older open loans
+      have already reached the fee cap) and whose whole days overdue have
+      changed since last_run_ts, and
+    - loans returned late after last_run_ts, whose fee is now final.
+
+    Args:
+        as_of_ts: Epoch seconds the fees are accrued up to
+        last_run_ts: Epoch seconds of the previous run (None on the first run)
+        due_since_ts: Lower due_ts bound for open loans (None for all)
+
+    Returns:
+        List of loans with id, patron_id, book_id, due_ts and return_ts,
+        from every shard when sharding is on
+    """
+    params = {
+        'as_of': as_of_ts,
+        'last_run': last_run_ts,
+        'due_since': -1 if due_since_ts is None else due_since_ts,
+        'returned_since': -1 if last_run_ts is None else last_run_ts,
+        'day': SECONDS_PER_DAY,
+    }
+
+    def candidates(conn):
+        return conn.execute('''
+            SELECT id, patron_id, book_id, due_ts, return_ts
+            FROM borrow_records
+            WHERE return_ts IS NULL AND due_ts >= :due_since AND due_ts < :as_of
+              AND (:last_run IS NULL OR (:as_of - due_ts) / :day != (:last_run - due_ts) / :day)
+            UNION ALL
+            SELECT id, patron_id, book_id, due_ts, return_ts
+            FROM borrow_records
+            WHERE return_ts IS NOT NULL AND return_ts > :returned_since AND return_ts <= :as_of
+              AND return_ts > due_ts
+        ''', params).fetchall()
+
+    return [dict(record) for records in fan_out_shards(candidates) for record in records]
+
+def upsert_fee_ledger_entries(entries: List[Dict], as_of_ts: int) -> bool:
+    """
+    Write accrued fees to the ledger and record the run, in one transaction
+    per database (each shard stores the entries of its own patrons).
+
+    Payments already recorded against an entry are preserved.
+
+    Args:
+        entries: Dicts with borrow_record_id, patron_id, book_id, due_ts,
+            days_overdue, accrued_fee and closed
+        as_of_ts: Epoch seconds the fees were accrued up to
+
+    Returns:
+        bool: True on success
+    """
+    def upsert(conn, shard_entries):
+        conn.executemany('''
+            INSERT INTO fee_ledger (borrow_record_id, patron_id, book_id, due_ts,
+                                    days_overdue, accrued_fee, accrued_through, closed)
+            VALUES (:borrow_record_id, :patron_id, :book_id, :due_ts,
+                    :days_overdue, :accrued_fee, :accrued_through, :closed)
+            ON CONFLICT (borrow_record_id) DO UPDATE SET
+                due_ts = excluded.due_ts,
+                days_overdue = excluded.days_overdue,
+                accrued_fee = excluded.accrued_fee,
+                accrued_through = excluded.accrued_through,
+                closed = excluded.closed
+        ''', [dict(entry, accrued_through=as_of_ts) for entry in shard_entries])
+        conn.execute('UPDATE fee_ledger_state SET last_run_ts = ? WHERE id = 1', (as_of_ts,))
+        conn.commit()
+
+    if BORROW_SHARDS:
+        targets = [(get_shard_path(shard), [entry for entry in entries
+                                            if shard_for_patron(entry['patron_id']) == shard])
+                   for shard in range(BORROW_SHARDS)]
+    else:
+        targets = [(DATABASE, entries)]
+
+    for path, shard_entries in targets:
+        conn = get_db_connection(path)
+        try:
+            upsert(conn, shard_entries)
+            conn.close()
+        except Exception as e:
+            conn.close()
+            return False
+    return True
+
+def get_fee_ledger_entry(patron_id: str, book_id: int) -> Optional[Dict]:
+    """Get the ledger entry for a patron's open loan of a book (a single index lookup)."""
+    conn = get_loans_connection(patron_id)
+    entry = conn.execute('''
+        SELECT fl.* FROM fee_ledger fl
+        JOIN borrow_records br ON br.id = fl.borrow_record_id
+        WHERE fl.patron_id = ? AND fl.book_id = ? AND br.return_date IS NULL
+        ORDER BY fl.borrow_record_id DESC
+        LIMIT 1
+    ''', (patron_id, book_id)).fetchone()
+    conn.close()
+    return dict(entry) if entry else None
+
+def get_patron_fee_entries(patron_id: str, read_only: bool = True) -> Dict[int, Dict]:
+    """
+    Get the fee state of all of a patron's open loans in one query.
+
+    Each open loan is joined with its ledger entry; the ledger columns are
+    None for loans the accrual job has not reached yet.
+
+    Args:
+        patron_id: 6-digit library card ID
+        read_only: Read through get_read_connection (False reads the primary)
+
+    Returns:
+        dict: Maps book_id to the most recent open loan of the book, with
+            id, due_date, due_ts, days_overdue, accrued_fee, accrued_through
+            and paid_amount
+    """
+    conn = get_loans_connection(patron_id, read_only=read_only)
+    entries = conn.execute('''
+        SELECT br.id, br.book_id, br.due_date, br.due_ts, fl.days_overdue, fl.accrued_fee,
+               fl.accrued_through, COALESCE(fl.paid_amount, 0) AS paid_amount
         FROM borrow_records br
-        JOIN books b ON br.book_id = b.id
-        WHERE br.patron_id = ? AND br.return_date IS NOT NULL
-        ORDER BY br.borrow_date DESC
+        LEFT JOIN fee_ledger fl ON fl.borrow_record_id = br.id
+        WHERE br.patron_id = ? AND br.return_date IS NULL
+        ORDER BY br.borrow_date
     ''', (patron_id,)).fetchall()
     conn.close()
+    # Later borrow dates overwrite earlier ones, matching get_borrow_record
+    return {entry['book_id']: dict(entry) for entry in entries}
 
-    history = []
-    for record in records:
-        history.append({
-            'book_id': record['book_id'],
-            'title': record['title'],
-            'author': record['author'],
-            'borrow_date': datetime.fromisoformat(record['borrow_date']),
-            'due_date': datetime.fromisoformat(record['due_date']),
-            'return_date': datetime.fromisoformat(record['return_date'])
-        })
-    return history
\ No newline at end of file
+def record_fee_payment(patron_id: str, book_id: int, amount: float, transaction_id: Optional[str]) -> bool:
+    """
+    Record a late fee payment against a patron's open loan of a book.
+
+    The payment is logged in fee_payments and added to the loan's ledger
+    entry (created if the accrual job has not reached the loan yet).
+
+    Returns:
+        bool: True if the payment was recorded, False if there is no open loan
+    """
+    conn = get_loans_connection(patron_id)
+    try:
+        record = conn.execute('''
+            SELECT id, due_ts FROM borrow_records
+            WHERE patron_id = ? AND book_id = ? AND return_date IS NULL
+            ORDER BY borrow_date DESC
+            LIMIT 1
+        ''', (patron_id, book_id)).fetchone()
+        if not record:
+            conn.close()
+            return False
+
+        conn.execute('''
+            INSERT INTO fee_payments (borrow_record_id, patron_id, book_id, amount, transaction_id, paid_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (record['id'], patron_id, book_id, amount, transaction_id, datetime.now().isoformat()))
+        conn.execute('''
+            INSERT INTO fee_ledger (borrow_record_id, patron_id, book_id, due_ts, paid_amount)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (borrow_record_id) DO UPDATE SET paid_amount = paid_amount + excluded.paid_amount
+        ''', (record['id'], patron_id, book_id, record['due_ts'], amount))
+        conn.commit()
+        conn.close()
+        return True
+    except Exception as e:
+        conn.close()
+        return False
+
+# Daily Circulation Rollups
+#
+# daily_circulation holds one row per (day, book) with activity, where day is
+# epoch seconds // SECONDS_PER_DAY (a UTC calendar day, like the *_ts
+# columns). Triggers keep loans and returns current; overdue and
+# fees_accrued are recomputed a whole day at a time by roll_up_overdue. With
+# sharding on, each shard rolls up its own loans.
+
+_ROLLUP_LOAN_COUNTS_QUERY = f'''
+    SELECT day, book_id, SUM(loans) AS loans, SUM(returns) AS returns FROM (
+        SELECT borrow_ts / {SECONDS_PER_DAY} AS day, book_id, 1 AS loans, 0 AS returns
+        FROM borrow_records WHERE borrow_ts IS NOT NULL
+        UNION ALL
+        SELECT return_ts / {SECONDS_PER_DAY}, book_id, 0, 1
+        FROM borrow_records WHERE return_ts IS NOT NULL
+        UNION ALL
+        SELECT borrow_ts / {SECONDS_PER_DAY}, book_id, 1, 0
+        FROM borrow_records_archive WHERE borrow_ts IS NOT NULL
+        UNION ALL
+        SELECT return_ts / {SECONDS_PER_DAY}, book_id, 0, 1
+        FROM borrow_records_archive WHERE return_ts IS NOT NULL
+    )
+    GROUP BY day, book_id
+'''
+
+# Loans that are, or were, overdue at some point in [:start_ts, :end_ts)
+_ROLLUP_OVERDUE_LOANS_QUERY = '''
+    SELECT book_id, due_ts, NULL AS return_ts FROM borrow_records
+    WHERE return_ts IS NULL AND due_ts < :end_ts
+    UNION ALL
+    SELECT book_id, due_ts, return_ts FROM borrow_records
+    WHERE return_ts IS NOT NULL AND return_ts >= :start_ts AND due_ts < return_ts AND due_ts < :end_ts
+    UNION ALL
+    SELECT book_id, due_ts, return_ts FROM borrow_records_archive
+    WHERE return_ts >= :start_ts AND due_ts < return_ts AND due_ts < :end_ts
+'''
+
+def _overdue_rollups(loans, first_day: int, last_day: int, as_of_ts: int,
+                     fee_for_days: Callable[[int], float]) -> Dict[Tuple[int, int], List]:
+    """
+    Overdue loan counts and late fee accruals per (day, book_id).
+
+    A loan is overdue on a day if it is still out and past due at the end of
+    the day (or at as_of_ts, for the current day). Its accrual for the day
+    is how much its late fee, fee_for_days(whole days overdue), grew.
+
+    Returns:
+        dict: [overdue, fees_accrued] keyed by (day, book_id), only for
+            days in [first_day, last_day] with a non-zero value
+    """
+    rollups = {}
+    for book_id, due_ts, return_ts in loans:
+        end_ts = as_of_ts if return_ts is None else min(return_ts, as_of_ts)
+        for day in range(max(first_day, due_ts // SECONDS_PER_DAY), min(last_day, end_ts // SECONDS_PER_DAY) + 1):
+            day_start = day * SECONDS_PER_DAY
+            day_end = min(day_start + SECONDS_PER_DAY, as_of_ts)
+            overdue = due_ts < day_end and (return_ts is None or return_ts >= day_end)
+            fee = (fee_for_days(max((min(day_end, end_ts) - due_ts) // SECONDS_PER_DAY, 0))
+                   - fee_for_days(max((min(day_start, end_ts) - due_ts) // SECONDS_PER_DAY, 0)))
+            if overdue or fee:
+                entry = rollups.setdefault((day, book_id), [0, 0.0])
+                entry[0] += overdue
+                entry[1] += fee
+    return rollups
+
+def _write_overdue_rollups(conn: sqlite3.Connection, first_day: int, last_day: int, as_of_ts: int,
+                           fee_for_days: Callable[[int], float]) -> int:
+    """Recompute the overdue and fees_accrued columns for a range of days on one connection."""
+    loans = conn.execute(_ROLLUP_OVERDUE_LOANS_QUERY, {
+        'start_ts': first_day * SECONDS_PER_DAY, 'end_ts': (last_day + 1) * SECONDS_PER_DAY
+    }).fetchall()
+    rollups = _overdue_rollups(loans, first_day, last_day, as_of_ts, fee_for_days)
+    conn.execute('''
+        UPDATE daily_circulation SET overdue = 0, fees_accrued = 0 WHERE day BETWEEN ? AND ?
+    ''', (first_day, last_day))
+    conn.executemany('''
+        INSERT INTO daily_circulation (day, book_id, overdue, fees_accrued) VALUES (?, ?, ?, ?)
+        ON CONFLICT (day, book_id) DO UPDATE
+        SET overdue = excluded.overdue, fees_accrued = excluded.fees_accrued
+    ''', [(day, book_id, overdue, round(fees, 2)) for (day, book_id), (overdue, fees) in rollups.items()])
+    conn.execute('UPDATE daily_circulation_state SET rolled_up_ts = ? WHERE id = 1', (as_of_ts,))
+    return len(rollups)
+
+def roll_up_overdue(as_of_ts: int, fee_for_days: Callable[[int], float]) -> int:
+    """
+    Recompute overdue counts and fee accruals from the previous run's day through today.
+
+    Every day from the one the previous run reached is recomputed in full, so
+    running the job at least daily leaves each past day final, and a missed
+    run is caught up by the next one. The first run covers all history from
+    the earliest due date. Days are written ROLLUP_BATCH_DAYS at a time, each
+    batch its own write transaction that advances rolled_up_ts, so a long
+    catch-up does not hold the write lock for its whole run and an
+    interrupted one resumes where it stopped.
+
+    Args:
+        as_of_ts: Epoch seconds to roll up to
+        fee_for_days: Late fee for a number of whole days overdue
+
+    Returns:
+        int: Number of (day, book) rollups written
+    """
+    last_day = as_of_ts // SECONDS_PER_DAY
+
+    def query(conn):
+        rolled_up_ts = conn.execute('SELECT rolled_up_ts FROM daily_circulation_state').fetchone()[0]
+        if rolled_up_ts is None:
+            first_due_ts = conn.execute('''
+                SELECT MIN(due_ts) FROM (
+                    SELECT MIN(due_ts) AS due_ts FROM borrow_records
+                    UNION ALL
+                    SELECT MIN(due_ts) FROM borrow_records_archive
+                )
+            ''').fetchone()[0]
+            first_day = last_day if first_due_ts is None else first_due_ts // SECONDS_PER_DAY
+        else:
+            first_day = rolled_up_ts // SECONDS_PER_DAY
+        first_day = min(first_day, last_day)
+
+        written = 0
+        for batch_first_day in range(first_day, last_day + 1, ROLLUP_BATCH_DAYS):
+            batch_last_day = min(batch_first_day + ROLLUP_BATCH_DAYS - 1, last_day)
+            # Earlier batches are rolled up to the end of their last day
+            batch_as_of_ts = as_of_ts if batch_last_day == last_day else (batch_last_day + 1) * SECONDS_PER_DAY
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                written += _write_overdue_rollups(conn, batch_first_day, batch_last_day, batch_as_of_ts,
+                                                  fee_for_days)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        return written
+
+    return sum(fan_out_shards(query))
+
+def rebuild_circulation_rollups(as_of_ts: int, fee_for_days: Callable[[int], float]) -> int:
+    """
+    Recompute every daily rollup from the hot and archived loans.
+
+    Returns:
+        int: Number of (day, book) rollup rows afterwards
+    """
+    def query(conn):
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('DELETE FROM daily_circulation')
+            conn.execute(f'''
+                INSERT INTO daily_circulation (day, book_id, loans, returns) {_ROLLUP_LOAN_COUNTS_QUERY}
+            ''')
+            _write_overdue_rollups(conn, 0, as_of_ts // SECONDS_PER_DAY, as_of_ts, fee_for_days)
+            rows = conn.execute('SELECT COUNT(*) FROM daily_circulation').fetchone()[0]
+            conn.commit()
+            return rows
+        except Exception:
+            conn.rollback()
+            raise
+
+    return sum(fan_out_shards(query))
+
+def check_circulation_rollups(fee_for_days: Callable[[int], float]) -> List[Dict]:
+    """
+    Compare the stored rollups with values recomputed from the loans.
+
+    Overdue counts and fee accruals are checked as of the last rollup run,
+    since later days have not been rolled up yet.
+
+    Returns:
+        list: One {'day', 'book_id', 'column', 'stored', 'expected'} entry per
+            mismatch (empty if the rollups are consistent), ordered by day
+    """
+    columns = ('loans', 'returns', 'overdue', 'fees_accrued')
+
+    def query(conn):
+        # One read transaction, so the rollups and loans are compared at the same instant
+        conn.execute('BEGIN')
+        stored = {(row['day'], row['book_id']): [row[column] for column in columns]
+                  for row in conn.execute('SELECT * FROM daily_circulation')}
+        expected = {(row['day'], row['book_id']): [row['loans'], row['returns'], 0, 0.0]
+                    for row in conn.execute(_ROLLUP_LOAN_COUNTS_QUERY)}
+        rolled_up_ts = conn.execute('SELECT rolled_up_ts FROM daily_circulation_state').fetchone()[0]
+        if rolled_up_ts is not None:
+            last_day = rolled_up_ts // SECONDS_PER_DAY
+            loans = conn.execute(_ROLLUP_OVERDUE_LOANS_QUERY, {
+                'start_ts': 0, 'end_ts': (last_day + 1) * SECONDS_PER_DAY
+            }).fetchall()
+            for key, (overdue, fees) in _overdue_rollups(loans, 0, last_day, rolled_up_ts, fee_for_days).items():
+                entry = expected.setdefault(key, [0, 0, 0, 0.0])
+                entry[2:] = [overdue, round(fees, 2)]
+        conn.rollback()
+
+        mismatches = []
+        for key in sorted(stored.keys() | expected.keys()):
+            stored_values = stored.get(key, [0, 0, 0, 0.0])
+            expected_values = expected.get(key, [0, 0, 0, 0.0])
+            for column, stored_value, expected_value in zip(columns, stored_values, expected_values):
+                if abs(stored_value - expected_value) > 0.001:
+                    mismatches.append({'day': key[0], 'book_id': key[1], 'column': column,
+                                       'stored': stored_value, 'expected': expected_value})
+        return mismatches
+
+    return sorted((mismatch for shard in fan_out_shards(query) for mismatch in shard),
+                  key=lambda mismatch: (mismatch['day'], mismatch['book_id']))
+
+def get_daily_circulation(first_day: int, last_day: int, book_id: Optional[int] = None) -> List[Dict]:
+    """
+    Sum the daily rollups over a range of days, for one book or the whole catalog.
+
+    Reads only the rollup rows in the range (a primary key range scan).
+
+    Returns:
+        list: {'day', 'loans', 'returns', 'overdue', 'fees_accrued'} for
+            each day in the range with any rollup rows, oldest first
+    """
+    book_filter = '' if book_id is None else 'AND book_id = :book_id'
+
+    def query(conn):
+        return [dict(row) for row in conn.execute(f'''
+            SELECT day, SUM(loans) AS loans, SUM(returns) AS returns,
+                   SUM(overdue) AS overdue, SUM(fees_accrued) AS fees_accrued
+            FROM daily_circulation
+            WHERE day BETWEEN :first_day AND :last_day {book_filter}
+            GROUP BY day
+        ''', {'first_day': first_day, 'last_day': last_day, 'book_id': book_id})]
+
+    totals = {}
+    for shard in fan_out_shards(query, read_only=True):
+        for row in shard:
+            day = totals.setdefault(row['day'], {'day': row['day'], 'loans': 0, 'returns': 0,
+                                                 'overdue': 0, 'fees_accrued': 0.0})
+            for column in ('loans', 'returns', 'overdue', 'fees_accrued'):
+                day[column] += row[column]
+    return [totals[day] for day in sorted(totals)]
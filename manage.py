@@ -0,0 +1,143 @@
+"""
+Management commands for the Library Management System.
+
+Operational tasks that run outside the web app, e.g. from a shell or cron.
+
+Usage:
+    python manage.py migrate [--dry-run] [--target VERSION]
+    python manage.py accrue-fees
+    python manage.py refresh-replica
+    python manage.py archive-loans [--days N] [--batch-size N]
+    python manage.py rollups {update,rebuild,check}
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+
+import database
+from services.library_service import (
+    accrue_late_fees, roll_up_circulation, rebuild_circulation, check_circulation
+)
+
+
+def migrate(args):
+    """Apply (or list, with --dry-run) pending schema migrations to the database and every shard."""
+    target = database.SCHEMA_VERSION if args.target is None else args.target
+    try:
+        databases = database.migrate_databases(dry_run=args.dry_run, target=target)
+    except ValueError as e:
+        print(e)
+        return 1
+    for migrated in databases:
+        results = migrated['results']
+        print(f"Database {migrated['path']}: schema version {migrated['version']}, target {target}")
+        if not results:
+            print("Nothing to migrate.")
+            continue
+
+        for result in results:
+            if result['seconds'] is None:
+                print(f"  pending  {result['version']:>3}  {result['description']}")
+            else:
+                print(f"  applied  {result['version']:>3}  {result['description']}  ({result['seconds'] * 1000:.1f} ms)")
+
+        if not args.dry_run:
+            total = sum(result['seconds'] for result in results)
+            print(f"Migrated to version {results[-1]['version']} in {total * 1000:.1f} ms.")
+    return 0
+
+
+def accrue_fees(args):
+    """Advance the late fee ledger; schedule this (e.g. hourly from cron)."""
+    database.init_database()
+    result = accrue_late_fees()
+    if result['status'] != 'success':
+        print(result['message'])
+        return 1
+    print(f"Accrued late fees as of {result['as_of']}: {result['updated']} ledger entries updated.")
+    return 0
+
+
+def refresh_replica(args):
+    """Refresh the snapshot read replica; schedule this more often than DATABASE_REPLICA_MAX_AGE."""
+    start = time.perf_counter()
+    database.refresh_replica(force=True)
+    print(f"Refreshed {database.get_replica_path()} in {(time.perf_counter() - start) * 1000:.1f} ms.")
+    return 0
+
+
+def archive_loans(args):
+    """Move loans returned more than --days ago to the archive table; schedule this (e.g. nightly)."""
+    database.init_database()
+    cutoff = datetime.now() - timedelta(days=args.days)
+    start = time.perf_counter()
+    archived = database.archive_returned_loans(database.to_epoch(cutoff), args.batch_size)
+    print(f"Archived {archived} loans returned before {cutoff:%Y-%m-%d} in {(time.perf_counter() - start) * 1000:.1f} ms.")
+    return 0
+
+
+def rollups(args):
+    """Update (e.g. hourly from cron), rebuild or check the daily circulation rollups."""
+    database.init_database()
+    start = time.perf_counter()
+    if args.action == 'check':
+        result = check_circulation()
+        for mismatch in result['mismatches'][:20]:
+            print(f"  {mismatch['date']}  book {mismatch['book_id']}  {mismatch['column']}: "
+                  f"stored {mismatch['stored']}, expected {mismatch['expected']}")
+        if not result['consistent']:
+            print(f"{len(result['mismatches'])} mismatches; run `python manage.py rollups rebuild` to fix them.")
+            return 1
+        print(f"Daily rollups are consistent ({(time.perf_counter() - start) * 1000:.1f} ms).")
+        return 0
+
+    result = roll_up_circulation() if args.action == 'update' else rebuild_circulation()
+    if result['status'] != 'success':
+        print(result['message'])
+        return 1
+    if args.action == 'update':
+        print(f"Rolled up overdue loans and fees as of {result['as_of']}: {result['updated']} rollups written.")
+    else:
+        print(f"Rebuilt {result['rows']} daily rollups in {(time.perf_counter() - start) * 1000:.1f} ms.")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the command line parser."""
+    parser = argparse.ArgumentParser(description="Library Management System management commands")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    migrate_parser = commands.add_parser('migrate', help='apply pending schema migrations')
+    migrate_parser.add_argument('--dry-run', action='store_true', help='list pending migrations without applying them')
+    migrate_parser.add_argument('--target', type=int, help='schema version to migrate to (default: latest)')
+    migrate_parser.set_defaults(handler=migrate)
+
+    accrue_parser = commands.add_parser('accrue-fees', help='advance the late fee ledger')
+    accrue_parser.set_defaults(handler=accrue_fees)
+
+    replica_parser = commands.add_parser('refresh-replica', help='copy the database to the snapshot read replica')
+    replica_parser.set_defaults(handler=refresh_replica)
+
+    archive_parser = commands.add_parser('archive-loans', help='move old returned loans to the archive table')
+    archive_parser.add_argument('--days', type=int, default=database.ARCHIVE_AFTER_DAYS,
+                                help='archive loans returned more than this many days ago')
+    archive_parser.add_argument('--batch-size', type=int, help='loans moved per transaction')
+    archive_parser.set_defaults(handler=archive_loans)
+
+    rollups_parser = commands.add_parser('rollups', help='maintain the daily circulation rollups')
+    rollups_parser.add_argument('action', choices=['update', 'rebuild', 'check'],
+                                help='update overdue counts and fees, rebuild everything, or check against the loans')
+    rollups_parser.set_defaults(handler=rollups)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
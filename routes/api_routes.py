@@ -2,21 +2,237 @@
 API Routes - JSON API endpoints
 """
 
-from flask import Blueprint, jsonify, request
-from services.library_service import calculate_late_fee_for_book, search_books_in_catalog
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from services.library_service import (
+    get_late_fee, calculate_late_fees_for_pairs, search_books_in_catalog, get_overdue_report,
+    borrow_cart_by_patron, return_cart_by_patron, get_patron_status_report, iter_patron_history,
+    get_cached_patron_status_report, place_hold_for_patron, cancel_hold_for_patron,
+    get_patron_holds_report, get_change_feed, get_popular_books, HISTORY_PAGE_SIZE
+)
+from services.analytics import get_circulation_stats, get_daily_rollup_report
+from .conditional import catalog_conditional
+from .fragment_cache import invalidate_book_row
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
+# Maximum (patron, book) pairs accepted by one batch late fee request
+MAX_BATCH_ITEMS = 200
+
+# Maximum books accepted by one self-checkout cart request
+MAX_CART_ITEMS = 20
+
 @api_bp.route('/late_fee/<patron_id>/<int:book_id>')
-def get_late_fee(patron_id, book_id):
+def get_late_fee_api(patron_id, book_id):
     """
     Calculate late fee for a specific book borrowed by a patron.
     API endpoint for R4: Late Fee Calculation
+    Served from the fee ledger when its entry is current.
     """
-    result = calculate_late_fee_for_book(patron_id, book_id)
+    result = get_late_fee(patron_id, book_id)
     return jsonify(result), 501 if 'not implemented' in result.get('status', '') else 200
 
+@api_bp.route('/late_fees', methods=['POST'])
+def get_late_fees_batch():
+    """
+    Calculate late fees for many (patron, book) pairs in one request.
+
+    Request body: {"items": [{"patron_id": "123456", "book_id": 1}, ...]}
+    Each result has the same shape as /api/late_fee plus patron_id and book_id.
+    """
+    payload = request.get_json(silent=True)
+    items = payload.get('items') if isinstance(payload, dict) else None
+
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'A non-empty "items" list is required'}), 400
+    if len(items) > MAX_BATCH_ITEMS:
+        return jsonify({'error': f'At most {MAX_BATCH_ITEMS} items per request'}), 400
+
+    results = calculate_late_fees_for_pairs(items)
+    return jsonify({'results': results, 'count': len(results)})
+
+def _process_cart(cart_function):
+    """Validate a cart request body, run it through cart_function and invalidate changed rows."""
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'A JSON body with patron_id and book_ids is required'}), 400
+
+    patron_id = str(payload.get('patron_id', '')).strip()
+    book_ids = payload.get('book_ids')
+    if not isinstance(book_ids, list) or not book_ids:
+        return jsonify({'error': 'A non-empty "book_ids" list is required'}), 400
+    if len(book_ids) > MAX_CART_ITEMS:
+        return jsonify({'error': f'At most {MAX_CART_ITEMS} books per cart'}), 400
+
+    result = cart_function(patron_id, book_ids)
+    for item in result['results']:
+        if item['success']:
+            invalidate_book_row(item['book_id'])
+    return jsonify(result), 400 if result['status'] == 'error' and not result['results'] else 200
+
+@api_bp.route('/cart/borrow', methods=['POST'])
+def borrow_cart():
+    """
+    Borrow a self-checkout cart of books for one patron in one transaction.
+
+    Request body: {"patron_id": "123456", "book_ids": [1, 2, 3]}
+    """
+    return _process_cart(borrow_cart_by_patron)
+
+@api_bp.route('/cart/return', methods=['POST'])
+def return_cart():
+    """
+    Return a cart of books for one patron in one transaction.
+
+    Request body: {"patron_id": "123456", "book_ids": [1, 2, 3]}
+    """
+    return _process_cart(return_cart_by_patron)
+
+@api_bp.route('/holds', methods=['POST'])
+def place_hold_api():
+    """
+    Join the hold queue for a book with no copies available.
+
+    Request body: {"patron_id": "123456", "book_id": 1}
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'A JSON body with patron_id and book_id is required'}), 400
+
+    patron_id = str(payload.get('patron_id', '')).strip()
+    book_id = payload.get('book_id')
+    if not isinstance(book_id, int) or isinstance(book_id, bool):
+        return jsonify({'error': 'An integer "book_id" is required'}), 400
+
+    success, message = place_hold_for_patron(patron_id, book_id)
+    return jsonify({'success': success, 'message': message}), 201 if success else 400
+
+@api_bp.route('/holds/<patron_id>/<int:book_id>', methods=['DELETE'])
+def cancel_hold_api(patron_id, book_id):
+    """Leave a book's hold queue, passing any copy set aside to the next patron."""
+    success, message = cancel_hold_for_patron(patron_id, book_id)
+    if success:
+        # A copy set aside for the hold may be back on the shelf
+        invalidate_book_row(book_id)
+    return jsonify({'success': success, 'message': message}), 200 if success else 400
+
+@api_bp.route('/patron/<patron_id>/holds')
+def get_patron_holds_api(patron_id):
+    """List a patron's holds with their place in each queue."""
+    report = get_patron_holds_report(patron_id)
+    return jsonify(report), 400 if report['status'] == 'error' else 200
+
+@api_bp.route('/overdue')
+def get_overdue_loans_api():
+    """
+    List all overdue open loans with their late fees, one page at a time.
+
+    Query parameters:
+        limit: Loans per page (default 100, max 500)
+        cursor: next_cursor value from the previous page
+    """
+    limit = request.args.get('limit', 100, type=int)
+    cursor = request.args.get('cursor') or None
+
+    result = get_overdue_report(cursor, limit)
+    return jsonify(result), 400 if result['status'] == 'error' else 200
+
+@api_bp.route('/changes')
+def get_changes_api():
+    """
+    Read the catalog and loan change log incrementally, oldest first.
+
+    Query parameters:
+        limit: Events per page (default 100, max 1000)
+        cursor: next_cursor value from the previous page (omit to start at the beginning)
+    """
+    limit = request.args.get('limit', 100, type=int)
+    cursor = request.args.get('cursor') or None
+
+    result = get_change_feed(cursor, limit)
+    return jsonify(result), 400 if result['status'] == 'error' else 200
+
+@api_bp.route('/stats')
+def get_stats_api():
+    """
+    Circulation statistics: daily counts, top books and authors, overdue
+    rates and average loan duration, from a snapshot at most
+    STATS_SNAPSHOT_MAX_AGE seconds old.
+
+    Query parameters:
+        days: Days of daily circulation counts (default 30, max 366)
+        limit: Entries in the top books and authors lists (default 10, max 100)
+    """
+    days = request.args.get('days', 30, type=int)
+    limit = request.args.get('limit', 10, type=int)
+
+    result = get_circulation_stats(current_app.extensions['circulation_stats'], days, limit)
+    return jsonify(result), 400 if result['status'] == 'error' else 200
+
+@api_bp.route('/stats/daily')
+def get_daily_stats_api():
+    """
+    Per-day loans, returns, overdue loans and fee accruals from the daily rollups.
+
+    Query parameters:
+        start, end: First and last day, YYYY-MM-DD (default: the last 30 days)
+        book_id: Only count this book
+    """
+    start = request.args.get('start') or None
+    end = request.args.get('end') or None
+    book_id = request.args.get('book_id', type=int)
+
+    result = get_daily_rollup_report(start, end, book_id)
+    return jsonify(result), 400 if result['status'] == 'error' else 200
+
+@api_bp.route('/patron/<patron_id>/status')
+def get_patron_status_api(patron_id):
+    """
+    Patron status report with one page of borrowing history.
+    API endpoint for R7: Patron Status Report
+
+    Query parameters:
+        history_limit: Returned loans per history page (default 20, max 500)
+        history_cursor: history_next_cursor value from the previous page
+    """
+    history_limit = request.args.get('history_limit', HISTORY_PAGE_SIZE, type=int)
+    history_cursor = request.args.get('history_cursor') or None
+
+    if history_cursor is None and history_limit == HISTORY_PAGE_SIZE:
+        # The default first page is what patrons refresh; serve it from the report cache
+        report = get_cached_patron_status_report(patron_id, current_app.extensions['patron_report_cache'])
+    else:
+        report = get_patron_status_report(patron_id, history_cursor, history_limit)
+    return jsonify(report), 400 if report['status'] == 'error' else 200
+
+@api_bp.route('/patron/<patron_id>/history')
+def stream_patron_history_api(patron_id):
+    """Stream a patron's complete borrowing history as newline-delimited JSON, newest first."""
+    history = iter_patron_history(patron_id)
+    if history is None:
+        return jsonify({'error': 'Invalid patron ID. Must be exactly 6 digits.'}), 400
+
+    dumps = current_app.json.dumps
+    lines = (dumps(loan) + '\n' for loan in history)
+    return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+
+@api_bp.route('/popular')
+@catalog_conditional
+def get_popular_books_api():
+    """
+    Most borrowed books, ranked by their maintained borrow counts.
+
+    Query parameters:
+        limit: Books per page (default 10, max 100)
+        offset: Books to skip (default 0)
+    """
+    limit = request.args.get('limit', 10, type=int)
+    offset = request.args.get('offset', 0, type=int)
+
+    result = get_popular_books(limit, offset)
+    return jsonify(result), 400 if result['status'] == 'error' else 200
+
 @api_bp.route('/search')
+@catalog_conditional
 def search_books_api():
     """
     Search for books via API endpoint.
@@ -24,16 +240,20 @@ def search_books_api():
     """
     search_term = request.args.get('q', '').strip()
     search_type = request.args.get('type', 'title')
+    available_only = request.args.get('available', '') in ('1', 'true', 'on')
+    sort = request.args.get('sort', 'title')
     
     if not search_term:
         return jsonify({'error': 'Search term is required'}), 400
     
     # Use business logic function
-    books = search_books_in_catalog(search_term, search_type)
+    books = search_books_in_catalog(search_term, search_type, available_only, sort)
     
     return jsonify({
         'search_term': search_term,
         'search_type': search_type,
+        'available_only': available_only,
+        'sort': sort,
         'results': books,
         'count': len(books)
     })
@@ -0,0 +1,158 @@
+"""
+Async Read API - ASGI serving path for the read-only JSON endpoints
+
+Serves /api/search and /api/late_fee/<patron_id>/<book_id> with the same
+responses as the Flask api blueprint, but as a plain ASGI application, so
+one process can hold many requests in flight while they wait on SQLite.
+
+The service functions are synchronous, so each request's database work is
+offloaded to a bounded thread pool. A semaphore caps how many requests use
+the pool at once; requests beyond that wait as cheap coroutines rather
+than as blocked threads. Once max_pending requests are waiting (not
+counting the db_threads already running), new ones are turned away with
+503 instead of queueing without bound. HEAD requests get the headers of
+the GET response and an empty body. /api/search carries the same catalog
+ETag/Last-Modified validators (and 304s) as the Flask view, and bodies are
+serialized the way Flask's jsonify does, so clients get the same bytes.
+
+    uvicorn asgi:app          (or any other ASGI server)
+"""
+
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import parse_qs
+
+from services.library_service import get_late_fee, search_books_in_catalog
+from .conditional import check_catalog_conditional
+
+
+def _dumps(body) -> bytes:
+    """Serialize like Flask's jsonify (sorted keys, compact, trailing newline)."""
+    return (json.dumps(body, sort_keys=True, separators=(',', ':')) + '\n').encode()
+
+
+class AsyncReadAPI:
+    """ASGI application for the read API endpoints."""
+
+    def __init__(self, db_threads: int, max_pending: int):
+        """
+        Args:
+            db_threads: Threads (and so concurrent database reads) per process
+            max_pending: Requests allowed to wait for a thread before 503s
+        """
+        self.db_threads = db_threads
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(db_threads, thread_name_prefix='read-api')
+        self._semaphore = None
+        # Requests waiting for the semaphore (those running on a thread are not counted)
+        self._waiting = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        if scope['method'] not in ('GET', 'HEAD'):
+            await self._send_json(send, 405, {'error': 'Method not allowed'})
+            return
+        # HEAD gets the GET response's status and headers, without the body
+        send_json = partial(self._send_json, send, include_body=scope['method'] == 'GET')
+
+        headers = {name.decode('latin-1').lower(): value.decode('latin-1')
+                   for name, value in scope.get('headers', [])}
+        handler = self._route(scope['path'], parse_qs(scope['query_string'].decode()), headers)
+        if handler is None:
+            await send_json(404, {'error': 'Not found'})
+            return
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.db_threads)
+        if self._semaphore.locked() and self._waiting >= self.max_pending:
+            await send_json(503, {'error': 'Server busy, try again'})
+            return
+
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+        try:
+            status, body, extra_headers = await asyncio.get_running_loop().run_in_executor(self._executor, handler)
+        finally:
+            self._semaphore.release()
+        await send_json(status, body, extra_headers)
+
+    def _route(self, path: str, query: dict, headers: dict):
+        """
+        Return a no-argument callable producing (status, body, extra headers),
+        or None if the path is unknown.
+        """
+        if path == '/api/search':
+            return partial(self._search, query, headers)
+
+        parts = path.strip('/').split('/')
+        if len(parts) == 4 and parts[:2] == ['api', 'late_fee'] and parts[3].isdigit():
+            return partial(self._late_fee, parts[2], int(parts[3]))
+        return None
+
+    @staticmethod
+    def _search(query: dict, headers: dict):
+        """Mirror of the /api/search view, including its catalog_conditional validation."""
+        modified, validators = check_catalog_conditional(headers.get('if-none-match'),
+                                                         headers.get('if-modified-since'))
+        if not modified:
+            return 304, None, validators
+
+        search_term = query.get('q', [''])[0].strip()
+        search_type = query.get('type', ['title'])[0]
+        available_only = query.get('available', [''])[0] in ('1', 'true', 'on')
+        sort = query.get('sort', ['title'])[0]
+
+        if not search_term:
+            return 400, {'error': 'Search term is required'}, []
+
+        books = search_books_in_catalog(search_term, search_type, available_only, sort)
+        return 200, {
+            'search_term': search_term,
+            'search_type': search_type,
+            'available_only': available_only,
+            'sort': sort,
+            'results': books,
+            'count': len(books)
+        }, validators
+
+    @staticmethod
+    def _late_fee(patron_id: str, book_id: int):
+        """Mirror of the /api/late_fee view."""
+        result = get_late_fee(patron_id, book_id)
+        return 501 if 'not implemented' in result.get('status', '') else 200, result, []
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self._executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    @staticmethod
+    async def _send_json(send, status: int, body, extra_headers=(), include_body: bool = True):
+        """Send a JSON response; a None body (a 304) is sent without content headers."""
+        payload = b'' if body is None else _dumps(body)
+        headers = [] if body is None else [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(payload)).encode()),
+        ]
+        headers += [(name.lower().encode(), value.encode()) for name, value in extra_headers]
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': headers,
+        })
+        await send({'type': 'http.response.body', 'body': payload if include_body else b''})
@@ -4,6 +4,7 @@ Borrowing Routes - Book borrowing and returning endpoints
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from services.library_service import borrow_book_by_patron, return_book_by_patron
+from .fragment_cache import invalidate_book_row
 
 borrowing_bp = Blueprint('borrowing', __name__)
 
@@ -23,6 +24,8 @@ def borrow_book():
     
     # Use business logic function
     success, message = borrow_book_by_patron(patron_id, book_id)
+    if success:
+        invalidate_book_row(book_id)
     
     flash(message, 'success' if success else 'error')
     return redirect(url_for('catalog.catalog'))
@@ -46,6 +49,8 @@ def return_book():
     
     # Use business logic function
     success, message = return_book_by_patron(patron_id, book_id)
+    if success:
+        invalidate_book_row(book_id)
     
     flash(message, 'success' if success else 'error')
     return render_template('return_book.html')
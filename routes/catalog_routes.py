@@ -3,24 +3,53 @@ Catalog Routes - Book catalog related endpoints
 """
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash
-from database import get_all_books
+from database import get_all_books, BOOK_SORT_ORDERS
 from services.library_service import add_book_to_catalog
+from .conditional import catalog_conditional
 
 catalog_bp = Blueprint('catalog', __name__)
 
+# Number of books per catalog page when paging is requested
+CATALOG_PAGE_SIZE = 50
+
 @catalog_bp.route('/')
 def index():
     """Home page redirects to catalog."""
     return redirect(url_for('catalog.catalog'))
 
 @catalog_bp.route('/catalog')
+@catalog_conditional
 def catalog():
     """
     Display all books in the catalog.
     Implements R2: Book Catalog Display
+
+    Optional query parameters:
+        available: '1' to show only books with available copies
+        sort: 'title' (default), 'availability' or 'popularity'
+        page: 1-based page number; pages hold CATALOG_PAGE_SIZE books. The
+            available-only listing is always paged (page 1 by default), so it
+            stays one bounded index range scan however large the catalog is
     """
-    books = get_all_books()
-    return render_template('catalog.html', books=books)
+    available_only = request.args.get('available', '') in ('1', 'true', 'on')
+    sort = request.args.get('sort', 'title')
+    if sort not in BOOK_SORT_ORDERS:
+        sort = 'title'
+    page = request.args.get('page', type=int)
+    if available_only and not (page and page > 0):
+        page = 1
+
+    if page and page > 0:
+        books = get_all_books(available_only, sort, limit=CATALOG_PAGE_SIZE,
+                              offset=(page - 1) * CATALOG_PAGE_SIZE, compact=True)
+    else:
+        page = None
+        books = get_all_books(available_only, sort, compact=True)
+    # An empty page may just mean the filter matched nothing or the page is past the end
+    catalog_empty = not books and not get_all_books(limit=1)
+
+    return render_template('catalog.html', books=books, available_only=available_only,
+                           sort=sort, page=page, page_size=CATALOG_PAGE_SIZE, catalog_empty=catalog_empty)
 
 @catalog_bp.route('/add_book', methods=['GET', 'POST'])
 def add_book():
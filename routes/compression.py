@@ -0,0 +1,108 @@
+"""
+Response Compression - Negotiated gzip/brotli encoding for large responses
+
+Registered as an after_request hook by init_compression. Only text-like
+responses at least COMPRESS_MIN_SIZE bytes long are compressed, so small
+payloads go out untouched. Streamed responses are compressed chunk by chunk
+and flushed as they go, so clients still receive data progressively.
+
+Brotli is used when the optional `brotli` package is installed and the
+client accepts it; gzip (standard library) is the fallback.
+"""
+
+import gzip
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Content types worth compressing
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/xml',
+    'application/json', 'application/x-ndjson', 'application/javascript', 'application/xml',
+}
+
+
+def available_encodings():
+    """Content encodings this server can produce, in order of preference."""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def compress_bytes(data: bytes, encoding: str, level: int) -> bytes:
+    """Compress a complete payload with the given content encoding."""
+    if encoding == 'br':
+        return brotli.compress(data, quality=min(level, 11))
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def compress_stream(chunks, encoding: str, level: int):
+    """Compress an iterable of chunks, flushing after each so streaming is preserved."""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=min(level, 11))
+        for chunk in chunks:
+            data = compressor.process(chunk.encode() if isinstance(chunk, str) else chunk)
+            data += compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+    else:
+        # wbits=31 selects the gzip container
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            data = compressor.compress(chunk.encode() if isinstance(chunk, str) else chunk)
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+
+
+def _is_compressible(response) -> bool:
+    """Check whether a response is eligible for compression at all."""
+    return (
+        200 <= response.status_code < 300
+        and response.status_code != 204
+        and not response.direct_passthrough
+        and 'Content-Encoding' not in response.headers
+        and response.mimetype in COMPRESSIBLE_MIMETYPES
+    )
+
+
+def _weaken_etag(response):
+    """An encoded body is no longer byte-identical to the original, so its ETag becomes weak."""
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+
+def init_compression(app):
+    """Register negotiated response compression on the app."""
+
+    @app.after_request
+    def compress_response(response):
+        if not app.config['COMPRESS_ENABLED'] or not _is_compressible(response):
+            return response
+
+        encoding = request.accept_encodings.best_match(available_encodings())
+        if encoding is None:
+            return response
+
+        level = app.config['COMPRESS_LEVEL']
+        if response.is_streamed:
+            response.response = compress_stream(response.response, encoding, level)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < app.config['COMPRESS_MIN_SIZE']:
+                return response
+            response.set_data(compress_bytes(data, encoding, level))
+
+        response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        _weaken_etag(response)
+        return response
+
+    return app
@@ -0,0 +1,81 @@
+"""
+Conditional Responses - ETag / Last-Modified validation for catalog reads
+
+Views decorated with catalog_conditional are validated against the catalog
+version kept by database triggers. A request whose If-None-Match (or
+If-Modified-Since) still matches gets a 304 before the view queries the
+books table or renders anything.
+"""
+
+from datetime import datetime
+from functools import wraps
+from typing import List, Optional, Tuple
+
+from flask import make_response, request, session
+from werkzeug.http import http_date, is_resource_modified, quote_etag
+from werkzeug.sansio import http as sansio_http
+
+from database import get_catalog_version
+
+
+def _catalog_etag(version: int) -> str:
+    """ETag for responses built from the given catalog version."""
+    return f'catalog-{version}'
+
+
+def catalog_validators() -> Tuple[str, datetime]:
+    """ETag and Last-Modified for responses built from the current catalog version."""
+    version, updated_at = get_catalog_version()
+    return _catalog_etag(version), updated_at
+
+
+def check_catalog_conditional(if_none_match: Optional[str],
+                              if_modified_since: Optional[str]) -> Tuple[bool, List[Tuple[str, str]]]:
+    """
+    Validate conditional request headers outside Flask (see routes.async_api).
+
+    Args:
+        if_none_match: The request's If-None-Match header, if any
+        if_modified_since: The request's If-Modified-Since header, if any
+
+    Returns:
+        tuple: (modified: bool, headers: the validator headers catalog_conditional
+            sets, as (name, value) pairs)
+    """
+    etag, updated_at = catalog_validators()
+    modified = sansio_http.is_resource_modified(http_if_none_match=if_none_match,
+                                                http_if_modified_since=if_modified_since,
+                                                etag=etag, last_modified=updated_at)
+    return modified, [('ETag', quote_etag(etag)), ('Last-Modified', http_date(updated_at)),
+                      ('Cache-Control', 'no-cache')]
+
+
+def _set_validators(response, etag: str, last_modified):
+    """Attach the validators and require clients to revalidate before reuse."""
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    return response
+
+
+def catalog_conditional(view):
+    """
+    Decorate a view whose output depends only on the books table and the query string.
+
+    Responses carrying flashed messages are never validated, because their
+    body depends on the session rather than on the catalog.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if '_flashes' in session:
+            return view(*args, **kwargs)
+
+        etag, updated_at = catalog_validators()
+        if not is_resource_modified(request.environ, etag=etag, last_modified=updated_at):
+            return _set_validators(make_response('', 304), etag, updated_at)
+
+        response = make_response(view(*args, **kwargs))
+        if response.status_code == 200:
+            _set_validators(response, etag, updated_at)
+        return response
+    return wrapper
@@ -0,0 +1,79 @@
+"""
+Fragment Cache - Cached rendering of catalog and search table rows
+
+Each book row is rendered once from templates/_book_row.html and reused
+until the book's available_copies changes. Entries are keyed by
+(book id, template variant) and store the available_copies they were
+rendered with, so a row is re-rendered as soon as availability moves, even
+when the change was made by another worker process.
+"""
+
+from flask import current_app
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
+
+from services.lru_cache import VersionedLRUCache
+
+# Template variants rendered by render_book_row (one per page that lists books)
+BOOK_ROW_VARIANTS = ('catalog', 'search')
+
+
+class BookRowCache(VersionedLRUCache):
+    """Thread-safe, bounded LRU cache of rendered book rows."""
+
+    def get(self, book_id: int, variant: str, available_copies: int):
+        """Return the cached row, or None if missing or rendered for other availability."""
+        return super().get((book_id, variant), available_copies)
+
+    def set(self, book_id: int, variant: str, available_copies: int, html: Markup):
+        """Store a rendered row, evicting the least recently used rows if full."""
+        super().set((book_id, variant), available_copies, html)
+
+    def invalidate(self, book_id: int):
+        """Drop every cached row for a book (called when its availability changes)."""
+        super().invalidate(*[(book_id, variant) for variant in BOOK_ROW_VARIANTS])
+
+
+def render_book_row(book, variant: str = 'catalog') -> Markup:
+    """
+    Render one book table row, served from the fragment cache when possible.
+    Registered as a template global by init_fragment_cache.
+
+    Args:
+        book: Book with id, title, author, isbn, total_copies and available_copies
+        variant: 'catalog' or 'search' (the pages differ slightly in their borrow form)
+
+    Returns:
+        Markup: The rendered <tr> element
+    """
+    cache = current_app.extensions['book_row_cache']
+    html = cache.get(book['id'], variant, book['available_copies'])
+    if html is None:
+        template = current_app.jinja_env.get_template('_book_row.html')
+        html = Markup(template.render(book=book, variant=variant))
+        cache.set(book['id'], variant, book['available_copies'], html)
+    return html
+
+
+def invalidate_book_row(book_id: int):
+    """Evict the cached rows of a book whose availability has changed."""
+    current_app.extensions['book_row_cache'].invalidate(book_id)
+
+
+def init_fragment_cache(app):
+    """
+    Set up template caching for the app.
+
+    - Compiled templates are cached as bytecode on disk (TEMPLATE_CACHE_DIR,
+      or Jinja's per-user temp directory), so restarted workers skip parsing
+    - The hot listing templates are compiled up front
+    - Book rows are cached per app in app.extensions['book_row_cache']
+      (created by app.init_worker_caches)
+    """
+    if app.config['TEMPLATE_BYTECODE_CACHE']:
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config['TEMPLATE_CACHE_DIR'])
+
+    app.add_template_global(render_book_row)
+
+    for template_name in ('catalog.html', 'search.html', '_book_row.html'):
+        app.jinja_env.get_template(template_name)
@@ -0,0 +1,359 @@
+"""
+Analytics - Circulation statistics over columnar loan snapshots
+
+Every loan (hot and archived) is read once with database.load_loan_columns
+as packed integer columns, and a CirculationSnapshot aggregates them into
+per-book, per-author and per-day counts when it is built. Answering a stats
+request reads only those aggregates, never the live database, and costs the
+same however many loans there are.
+
+The build is vectorized with NumPy (listed in requirements.txt); where it
+is not installed the same aggregates are computed in pure Python. Worker
+processes share one snapshot through a file, so the loans are read once per
+rebuild rather than once per worker.
+"""
+
+import bisect
+import heapq
+import os
+import pickle
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; the pure-Python aggregations give the same answers
+    np = None
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; each worker process then keeps its own snapshot
+    fcntl = None
+
+from database import load_loan_columns, get_all_books, get_daily_circulation, to_epoch, SECONDS_PER_DAY
+
+# Largest day window and top-N list the stats endpoints accept
+MAX_STATS_DAYS = 366
+MAX_STATS_LIMIT = 100
+
+
+def _day_label(day: int) -> str:
+    """ISO date of a day number (epoch seconds // SECONDS_PER_DAY)."""
+    return datetime.fromtimestamp(day * SECONDS_PER_DAY, timezone.utc).strftime('%Y-%m-%d')
+
+
+class CirculationSnapshot:
+    """
+    Circulation aggregates over every loan, as of one build time.
+
+    Everything that does not depend on the request time (loans per book,
+    author and day, late returns, loan durations) is aggregated in one pass
+    over the loan columns when the snapshot is built. The open loans' due
+    dates are kept sorted, so counting the overdue ones at request time is a
+    binary search. Queries never look at individual loans again.
+    """
+
+    def __init__(self, columns: Dict, books: List, built_at: float):
+        """
+        Args:
+            columns: book_id, borrow_ts, due_ts and return_ts sequences, one
+                entry per loan (return_ts is -1 for open loans)
+            books: (id, title, author, ...) rows for the catalog
+            built_at: time.time() the columns were read at
+        """
+        self.built_at = built_at
+        self.loan_count = len(columns['book_id'])
+        self.titles = {book[0]: (book[1], book[2]) for book in books}
+        # Authors are numbered in name order, so ties in counts rank by name
+        self.authors = sorted({book[2] for book in books})
+        author_codes = {author: code for code, author in enumerate(self.authors)}
+        author_of_book = {book[0]: author_codes[book[2]] for book in books}
+
+        if np is not None:
+            self._aggregate_vectorized(columns, author_of_book)
+        else:
+            self._aggregate(columns, author_of_book)
+
+    def _aggregate_vectorized(self, columns: Dict, author_of_book: Dict):
+        """Build the aggregates with NumPy array operations."""
+        # frombuffer shares the arrays' memory instead of copying it
+        book_id, borrow_ts, due_ts, return_ts = (
+            np.frombuffer(columns[name], dtype=np.int64) if len(columns[name]) else np.zeros(0, dtype=np.int64)
+            for name in ('book_id', 'borrow_ts', 'due_ts', 'return_ts'))
+
+        book_loans = np.bincount(book_id)
+        self.book_ranking = self._ranking_vectorized(book_loans)
+        # Map each book with loans to its author code (-1 if not in the catalog)
+        book_author = np.full(len(book_loans), -1, dtype=np.int64)
+        for book, code in author_of_book.items():
+            if book < len(book_author):
+                book_author[book] = code
+        known = book_author >= 0
+        author_loans = np.bincount(book_author[known], weights=book_loans[known],
+                                   minlength=len(self.authors)).astype(np.int64)
+        self.author_ranking = self._ranking_vectorized(author_loans)
+
+        is_open = return_ts < 0
+        returned = ~is_open
+        self.open_due_ts = np.sort(due_ts[is_open])
+        self.returned_loans = int(returned.sum())
+        self.returned_late = int((return_ts[returned] > due_ts[returned]).sum())
+        self.loan_seconds = int((return_ts[returned] - borrow_ts[returned]).sum())
+
+        borrow_days = borrow_ts // SECONDS_PER_DAY
+        return_days = return_ts[returned] // SECONDS_PER_DAY
+        self.first_day = int(borrow_days.min()) if self.loan_count else 0
+        self.borrows_per_day = np.bincount(borrow_days - self.first_day).tolist()
+        self.returns_per_day = np.bincount(return_days - self.first_day).tolist()
+
+    def _ranking_vectorized(self, counts) -> List:
+        """(code, count) pairs for the MAX_STATS_LIMIT highest counts, ties by lowest code."""
+        # Stable sort keeps equal counts in code order
+        top = np.argsort(-counts, kind='stable')[:MAX_STATS_LIMIT]
+        return [(int(code), int(counts[code])) for code in top if counts[code] > 0]
+
+    def _aggregate(self, columns: Dict, author_of_book: Dict):
+        """Build the aggregates in pure Python, in one pass over the loans."""
+        book_loans, borrows, returns = Counter(), Counter(), Counter()
+        open_due_ts = []
+        self.returned_loans = self.returned_late = self.loan_seconds = 0
+        for book_id, borrow_ts, due_ts, return_ts in zip(
+                columns['book_id'], columns['borrow_ts'], columns['due_ts'], columns['return_ts']):
+            book_loans[book_id] += 1
+            borrows[borrow_ts // SECONDS_PER_DAY] += 1
+            if return_ts < 0:
+                open_due_ts.append(due_ts)
+                continue
+            returns[return_ts // SECONDS_PER_DAY] += 1
+            self.returned_loans += 1
+            self.returned_late += return_ts > due_ts
+            self.loan_seconds += return_ts - borrow_ts
+
+        author_loans = Counter()
+        for book_id, count in book_loans.items():
+            if book_id in author_of_book:
+                author_loans[author_of_book[book_id]] += count
+        self.book_ranking = self._ranking(book_loans)
+        self.author_ranking = self._ranking(author_loans)
+
+        self.open_due_ts = sorted(open_due_ts)
+        self.first_day = min(borrows, default=0)
+        last_day = max(list(borrows) + list(returns), default=self.first_day)
+        self.borrows_per_day = [borrows[day] for day in range(self.first_day, last_day + 1)]
+        self.returns_per_day = [returns[day] for day in range(self.first_day, last_day + 1)]
+
+    def _ranking(self, counts: Counter) -> List:
+        """(code, count) pairs for the MAX_STATS_LIMIT highest counts, ties by lowest code."""
+        return heapq.nsmallest(MAX_STATS_LIMIT, counts.items(), key=lambda item: (-item[1], item[0]))
+
+    @classmethod
+    def build(cls) -> 'CirculationSnapshot':
+        """Read a new snapshot of every loan and book."""
+        built_at = time.time()
+        return cls(load_loan_columns(), get_all_books(compact=True), built_at)
+
+    def daily_circulation(self, days: int, as_of_ts: int) -> List[Dict]:
+        """
+        Borrows and returns per day for the last days days, oldest first.
+
+        Days are UTC calendar days, the same as the stored epoch timestamps.
+        """
+        def count(per_day: List[int], day: int) -> int:
+            offset = day - self.first_day
+            return per_day[offset] if 0 <= offset < len(per_day) else 0
+
+        first_day = as_of_ts // SECONDS_PER_DAY - days + 1
+        return [{'date': _day_label(day), 'borrows': count(self.borrows_per_day, day),
+                 'returns': count(self.returns_per_day, day)}
+                for day in range(first_day, first_day + days)]
+
+    def top_books(self, limit: int) -> List[Dict]:
+        """Most borrowed books, most loans first."""
+        return [{'book_id': book_id, 'title': self.titles.get(book_id, (None, None))[0],
+                 'author': self.titles.get(book_id, (None, None))[1], 'loans': count}
+                for book_id, count in self.book_ranking[:limit]]
+
+    def top_authors(self, limit: int) -> List[Dict]:
+        """Most borrowed authors, most loans first."""
+        return [{'author': self.authors[code], 'loans': count} for code, count in self.author_ranking[:limit]]
+
+    def overdue_rates(self, as_of_ts: int) -> Dict:
+        """Share of open loans past due, and of returned loans returned after their due date."""
+        open_loans = len(self.open_due_ts)
+        overdue = bisect.bisect_left(self.open_due_ts, as_of_ts)
+        return {
+            'open_loans': open_loans,
+            'overdue_loans': overdue,
+            'overdue_rate': round(overdue / open_loans, 4) if open_loans else 0.0,
+            'returned_loans': self.returned_loans,
+            'returned_late': self.returned_late,
+            'late_return_rate': round(self.returned_late / self.returned_loans, 4) if self.returned_loans else 0.0,
+        }
+
+    def average_loan_days(self) -> Optional[float]:
+        """Mean days from borrow to return over returned loans (None if there are none)."""
+        if not self.returned_loans:
+            return None
+        return round(self.loan_seconds / self.returned_loans / SECONDS_PER_DAY, 2)
+
+
+class CirculationStats:
+    """
+    Thread-safe holder of the current snapshot.
+
+    The first request builds a snapshot. Once it is max_age seconds old, the
+    next request starts a rebuild in a background thread and is answered
+    from the old snapshot, so reading the loans never holds up a request
+    after the first.
+
+    With a shared path, worker processes share one snapshot: whichever
+    worker finds it stale first rebuilds it under a file lock and saves it
+    to path, and the others load that file instead of reading the loans.
+    Where fcntl is unavailable (Windows) the path is ignored and each process
+    builds its own snapshot.
+    """
+
+    def __init__(self, max_age: float, path: Optional[str] = None):
+        """
+        Args:
+            max_age: Seconds a snapshot is served before it is rebuilt
+            path: File the snapshot is shared through (None keeps it per process)
+        """
+        self.max_age = max_age
+        self.path = path
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._refresher = None
+
+    def snapshot(self) -> CirculationSnapshot:
+        """Return the current snapshot, building it first if there is none yet."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = self._fresh_snapshot()
+                return self._snapshot
+
+        if time.time() - snapshot.built_at >= self.max_age and self._lock.acquire(blocking=False):
+            self._refresher = threading.Thread(target=self._rebuild, name='circulation-stats', daemon=True)
+            self._refresher.start()
+        return snapshot
+
+    def _rebuild(self):
+        """Replace the snapshot (runs in the refresher thread, holding the lock)."""
+        try:
+            self._snapshot = self._fresh_snapshot()
+        finally:
+            self._lock.release()
+
+    def _fresh_snapshot(self) -> CirculationSnapshot:
+        """Load a current shared snapshot, or build one (and share it)."""
+        if self.path is None or fcntl is None:
+            return CirculationSnapshot.build()
+
+        shared = self._load_shared()
+        if shared is not None:
+            return shared
+        with open(f'{self.path}.lock', 'a') as lock:
+            # Blocks while another worker builds, then uses what it saved
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            shared = self._load_shared()
+            if shared is not None:
+                return shared
+            snapshot = CirculationSnapshot.build()
+            temp_path = f'{self.path}.{os.getpid()}.tmp'
+            with open(temp_path, 'wb') as file:
+                pickle.dump(snapshot, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self.path)
+            return snapshot
+
+    def _load_shared(self) -> Optional[CirculationSnapshot]:
+        """The shared snapshot, or None if there is none or it is max_age old."""
+        try:
+            if time.time() - os.path.getmtime(self.path) >= self.max_age:
+                return None
+            with open(self.path, 'rb') as file:
+                snapshot = pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return None
+        return snapshot if time.time() - snapshot.built_at < self.max_age else None
+
+    def clear(self):
+        """Drop this process's snapshot so the next request loads or builds a new one."""
+        with self._lock:
+            self._snapshot = None
+
+
+def get_circulation_stats(stats: CirculationStats, days: int = 30, limit: int = 10) -> Dict:
+    """
+    Get circulation statistics from the current snapshot.
+
+    Args:
+        stats: The app's CirculationStats
+        days: Days of daily circulation counts (1-366)
+        limit: Entries in the top books and top authors lists (1-100)
+
+    Returns:
+        dict: Contains status, as_of (when the snapshot was read), loans,
+        engine ('numpy' or 'python'), daily_circulation, top_books,
+        top_authors, overdue and average_loan_days
+    """
+    if not isinstance(days, int) or not 1 <= days <= MAX_STATS_DAYS:
+        return {'status': 'error', 'message': f'Days must be between 1 and {MAX_STATS_DAYS}.'}
+    if not isinstance(limit, int) or not 1 <= limit <= MAX_STATS_LIMIT:
+        return {'status': 'error', 'message': f'Limit must be between 1 and {MAX_STATS_LIMIT}.'}
+
+    snapshot = stats.snapshot()
+    as_of_ts = to_epoch(datetime.now())
+    return {
+        'status': 'success',
+        'as_of': datetime.fromtimestamp(snapshot.built_at).isoformat(timespec='seconds'),
+        'loans': snapshot.loan_count,
+        'engine': 'numpy' if np is not None else 'python',
+        'daily_circulation': snapshot.daily_circulation(days, as_of_ts),
+        'top_books': snapshot.top_books(limit),
+        'top_authors': snapshot.top_authors(limit),
+        'overdue': snapshot.overdue_rates(as_of_ts),
+        'average_loan_days': snapshot.average_loan_days(),
+    }
+
+
+def get_daily_rollup_report(start: Optional[str] = None, end: Optional[str] = None,
+                            book_id: Optional[int] = None) -> Dict:
+    """
+    Get per-day circulation totals from the daily rollup tables.
+
+    Unlike get_circulation_stats this reads the database, but only the
+    rollup rows for the requested days, so it is always current for loans
+    and returns, and current to the last rollup job for overdue counts and
+    fee accruals.
+
+    Args:
+        start: First day, YYYY-MM-DD (defaults to 29 days before end)
+        end: Last day, YYYY-MM-DD (defaults to today)
+        book_id: Only count this book (None for the whole catalog)
+
+    Returns:
+        dict: Contains status, book_id and days, one {'date', 'loans',
+        'returns', 'overdue', 'fees_accrued'} per day, oldest first
+    """
+    try:
+        last_day = (to_epoch(datetime.strptime(end, '%Y-%m-%d')) if end else
+                    to_epoch(datetime.now())) // SECONDS_PER_DAY
+        first_day = (to_epoch(datetime.strptime(start, '%Y-%m-%d')) // SECONDS_PER_DAY if start else
+                     last_day - 29)
+    except ValueError:
+        return {'status': 'error', 'message': 'Dates must be in YYYY-MM-DD format.'}
+    if not 1 <= last_day - first_day + 1 <= MAX_STATS_DAYS:
+        return {'status': 'error', 'message': f'The date range must cover 1 to {MAX_STATS_DAYS} days.'}
+
+    totals = {row['day']: row for row in get_daily_circulation(first_day, last_day, book_id)}
+    days = []
+    for day in range(first_day, last_day + 1):
+        row = totals.get(day, {'loans': 0, 'returns': 0, 'overdue': 0, 'fees_accrued': 0.0})
+        days.append({'date': _day_label(day), 'loans': row['loans'], 'returns': row['returns'],
+                     'overdue': row['overdue'], 'fees_accrued': round(row['fees_accrued'], 2)})
+    return {'status': 'success', 'book_id': book_id, 'days': days}
@@ -7,11 +7,51 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 from database import (
     get_book_by_id, get_book_by_isbn, get_patron_borrow_count,
-    insert_book, insert_borrow_record, update_book_availability,
+    insert_book, insert_borrow_record, update_book_availability, cancel_borrow_record,
     update_borrow_record_return_date, get_all_books, get_patron_borrowed_books,
-    get_borrow_record, search_books, get_borrowing_history
+    get_borrow_record, search_books, get_borrowing_history, get_overdue_loans,
+    get_fee_ledger_last_run, get_fee_accrual_candidates, upsert_fee_ledger_entries,
+    get_fee_ledger_entry, get_patron_fee_entries, record_fee_payment, get_borrow_records_for_pairs,
+    borrow_books_in_cart, return_books_in_cart, iter_borrowing_history, get_patron_activity_version,
+    get_hold, get_patron_holds, place_hold, cancel_hold, remove_hold, return_book_copy,
+    get_change_event_sources, get_merged_change_events, roll_up_overdue, rebuild_circulation_rollups, check_circulation_rollups,
+    to_epoch, SECONDS_PER_DAY
 )
 from .payment_services import PaymentGateway
+from .report_cache import PatronReportCache
+
+# Days overdue at which a loan reaches the $15.00 late fee cap
+LATE_FEE_CAP_DAYS = 19
+
+# Returned loans per page of the patron status report's borrowing history
+HISTORY_PAGE_SIZE = 20
+
+# Maximum books a patron may have on loan at once, for single and cart borrows
+MAX_BORROWED_BOOKS = 5
+
+def _days_overdue(record: Dict, as_of: datetime) -> int:
+    """
+    Whole days a borrow record is past its due date at the given time.
+
+    Uses the integer due_ts column when the record has one, and falls back
+    to parsing the ISO due_date for records that predate it.
+    """
+    if record.get('due_ts') is not None:
+        return (to_epoch(as_of) - record['due_ts']) // SECONDS_PER_DAY
+    return (as_of - datetime.fromisoformat(record['due_date'])).days
+
+def _late_fee_for_days(days_overdue: int) -> float:
+    """Late fee for a number of days overdue (see calculate_late_fee_for_book)."""
+    if days_overdue <= 0:
+        return 0.00
+    if days_overdue <= 7:
+        # First 7 days: $0.50 per day
+        fee_amount = days_overdue * 0.50
+    else:
+        # First 7 days at $0.50, remaining days at $1.00
+        fee_amount = (7 * 0.50) + ((days_overdue - 7) * 1.00)
+    # Cap at maximum of $15.00
+    return round(min(fee_amount, 15.00), 2)
 
 def add_book_to_catalog(title: str, author: str, isbn: str, total_copies: int) -> Tuple[bool, str]:
     """
@@ -82,14 +122,17 @@ def borrow_book_by_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
     if not book:
         return False, "Book not found."
     
-    if book['available_copies'] <= 0:
+    # A copy set aside for this patron's hold can be borrowed even when none are on the shelf
+    hold = get_hold(patron_id, book_id)
+    reserved = hold is not None and hold['status'] == 'ready'
+    if book['available_copies'] <= 0 and not reserved:
         return False, "This book is currently not available."
     
     # Check patron's current borrowed books count
     current_borrowed = get_patron_borrow_count(patron_id)
     
-    if current_borrowed > 5:
-        return False, "You have reached the maximum borrowing limit of 5 books."
+    if current_borrowed >= MAX_BORROWED_BOOKS:
+        return False, f"You have reached the maximum borrowing limit of {MAX_BORROWED_BOOKS} books."
     
     # Create borrow record
     borrow_date = datetime.now()
@@ -100,8 +143,21 @@ def borrow_book_by_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
     if not borrow_success:
         return False, "Database error occurred while creating borrow record."
     
-    availability_success = update_book_availability(book_id, -1)
+    # Claim a copy. The decrement only succeeds while a copy is left, so when
+    # several patrons race for the last copy exactly one of them gets it.
+    if reserved:
+        # The copy already left the shelf when the hold became ready
+        availability_success = remove_hold(hold['id'], status='ready')
+    else:
+        availability_success = update_book_availability(book_id, -1)
+        if availability_success and hold:
+            remove_hold(hold['id'])
     if not availability_success:
+        # Undo the borrow record created above
+        cancel_borrow_record(patron_id, book_id)
+        book = get_book_by_id(book_id)
+        if book and book['available_copies'] <= 0:
+            return False, "This book is currently not available."
         return False, "Database error occurred while updating book availability."
     
     return True, f'Successfully borrowed "{book["title"]}". Due date: {due_date.strftime("%Y-%m-%d")}.'
@@ -132,8 +188,8 @@ def return_book_by_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
     if not record:
         return False, "No active borrow record found. This patron did not borrow this book."
 
-    # Update available copies
-    update_copies = update_book_availability(book_id, 1)
+    # Put the copy back, or set it aside for the next patron in the hold queue
+    update_copies, hold = return_book_copy(book_id)
     if not update_copies:
         return False, "Database error occurred while updating book availability."
 
@@ -148,20 +204,214 @@ def return_book_by_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
 
     # Note: Since we just updated the return date, we need to check the record before it was updated
     # So we'll recalculate based on the stored due_date
-    due_date = datetime.fromisoformat(record['due_date'])
-    days_overdue = (return_date - due_date).days
+    days_overdue = _days_overdue(record, return_date)
+
+    hold_note = _hold_note(hold)
 
     if days_overdue > 0:
         # Calculate fee
-        if days_overdue <= 7:
-            fee_amount = days_overdue * 0.50
-        else:
-            fee_amount = (7 * 0.50) + ((days_overdue - 7) * 1.00)
-        fee_amount = min(fee_amount, 15.00)
+        fee_amount = _late_fee_for_days(days_overdue)
 
-        return True, f'Book "{book["title"]}" returned successfully. Late fee: ${fee_amount:.2f} ({days_overdue} days overdue).'
+        return True, f'Book "{book["title"]}" returned successfully. Late fee: ${fee_amount:.2f} ({days_overdue} days overdue).{hold_note}'
     else:
-        return True, f'Book "{book["title"]}" returned successfully. No late fees.'
+        return True, f'Book "{book["title"]}" returned successfully. No late fees.{hold_note}'
+
+def _hold_note(hold: Optional[Dict]) -> str:
+    """Message suffix telling the desk a returned copy is reserved for a hold."""
+    if hold is None:
+        return ""
+    return f" Please set this copy aside for patron {hold['patron_id']}, who is next on hold."
+
+def _cart_book_ids(book_ids) -> Tuple[List[int], List[Optional[str]]]:
+    """
+    Split a cart into the distinct, well-formed book IDs to process and a
+    per-item error (None for items to process) in cart order.
+    """
+    seen = set()
+    errors = []
+    for book_id in book_ids:
+        if not isinstance(book_id, int) or isinstance(book_id, bool):
+            errors.append("Invalid book ID.")
+        elif book_id in seen:
+            errors.append("Book is already in this cart.")
+        else:
+            seen.add(book_id)
+            errors.append(None)
+    valid_ids = [book_id for book_id, error in zip(book_ids, errors) if error is None]
+    return valid_ids, errors
+
+def _cart_result(book_ids, errors: List[Optional[str]], outcomes: Dict[int, Tuple[bool, str]]) -> Dict:
+    """Assemble per-item cart results in cart order."""
+    results = []
+    for book_id, error in zip(book_ids, errors):
+        success, message = (False, error) if error else outcomes[book_id]
+        results.append({'book_id': book_id, 'success': success, 'message': message})
+    processed = sum(result['success'] for result in results)
+    return {
+        'status': 'success' if processed else 'error',
+        'processed': processed,
+        'results': results
+    }
+
+def borrow_cart_by_patron(patron_id: str, book_ids: List[int]) -> Dict:
+    """
+    Borrow a self-checkout cart of books for one patron.
+
+    The patron is validated once, and the borrowing limit is checked against
+    the whole cart: if the patron's open loans plus the available books in
+    the cart exceed MAX_BORROWED_BOOKS, none of them are borrowed. All books
+    are checked and updated in one database transaction.
+
+    Args:
+        patron_id: 6-digit library card ID
+        book_ids: IDs of the books in the cart
+
+    Returns:
+        dict: Contains status, message, processed (books borrowed) and
+            results, a {book_id, success, message} entry per cart item
+    """
+    if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
+        return {'status': 'error', 'message': "Invalid patron ID. Must be exactly 6 digits.",
+                'processed': 0, 'results': []}
+
+    valid_ids, errors = _cart_book_ids(book_ids)
+    borrow_date = datetime.now()
+    due_date = borrow_date + timedelta(days=14)
+    outcome = borrow_books_in_cart(patron_id, valid_ids, borrow_date, due_date,
+                                   MAX_BORROWED_BOOKS) if valid_ids else {'items': []}
+
+    messages = {
+        'not_found': "Book not found.",
+        'unavailable': "This book is currently not available.",
+        'limit_exceeded': f"This cart would exceed the maximum borrowing limit of {MAX_BORROWED_BOOKS} books.",
+        'error': "Database error occurred while creating borrow record.",
+    }
+    outcomes = {}
+    for item in outcome['items']:
+        if item['outcome'] == 'borrowed':
+            outcomes[item['book_id']] = (
+                True, f'Successfully borrowed "{item["title"]}". Due date: {due_date.strftime("%Y-%m-%d")}.')
+        else:
+            outcomes[item['book_id']] = (False, messages[item['outcome']])
+
+    result = _cart_result(book_ids, errors, outcomes)
+    result['message'] = f"Borrowed {result['processed']} of {len(book_ids)} book(s)."
+    return result
+
+def return_cart_by_patron(patron_id: str, book_ids: List[int]) -> Dict:
+    """
+    Return a self-checkout cart of books for one patron.
+
+    The patron is validated once and every book is returned in one database
+    transaction. Each item's message includes its late fee, as for
+    return_book_by_patron.
+
+    Args:
+        patron_id: 6-digit library card ID
+        book_ids: IDs of the books in the cart
+
+    Returns:
+        dict: Contains status, message, processed (books returned) and
+            results, a {book_id, success, message} entry per cart item
+    """
+    if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
+        return {'status': 'error', 'message': "Invalid patron ID. Must be exactly 6 digits.",
+                'processed': 0, 'results': []}
+
+    valid_ids, errors = _cart_book_ids(book_ids)
+    return_date = datetime.now()
+    items = return_books_in_cart(patron_id, valid_ids, return_date) if valid_ids else []
+
+    messages = {
+        'not_found': "Book not found.",
+        'not_borrowed': "No active borrow record found. This patron did not borrow this book.",
+        'error': "Database error occurred while updating borrow record return date.",
+    }
+    outcomes = {}
+    for item in items:
+        if item['outcome'] != 'returned':
+            outcomes[item['book_id']] = (False, messages[item['outcome']])
+            continue
+        days_overdue = _days_overdue(item['record'], return_date)
+        if days_overdue > 0:
+            fee_amount = _late_fee_for_days(days_overdue)
+            message = (f'Book "{item["title"]}" returned successfully. '
+                       f'Late fee: ${fee_amount:.2f} ({days_overdue} days overdue).')
+        else:
+            message = f'Book "{item["title"]}" returned successfully. No late fees.'
+        message += _hold_note(item['hold'])
+        outcomes[item['book_id']] = (True, message)
+
+    result = _cart_result(book_ids, errors, outcomes)
+    result['message'] = f"Returned {result['processed']} of {len(book_ids)} book(s)."
+    return result
+
+def place_hold_for_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
+    """
+    Put a patron in the hold queue for a book with no copies available.
+
+    When a copy is returned it is set aside for the first patron in the
+    queue, who can then borrow it as usual.
+
+    Args:
+        patron_id: 6-digit library card ID
+        book_id: ID of the book to hold
+
+    Returns:
+        tuple: (success: bool, message: str)
+    """
+    if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
+        return False, "Invalid patron ID. Must be exactly 6 digits."
+
+    if get_borrow_record(patron_id, book_id):
+        return False, "You already have this book on loan."
+
+    result = place_hold(patron_id, book_id)
+    messages = {
+        'not_found': "Book not found.",
+        'available': "This book is available. Borrow it instead of placing a hold.",
+        'duplicate': "You already have a hold on this book.",
+        'error': "Database error occurred while placing the hold.",
+    }
+    if result['outcome'] != 'placed':
+        return False, messages[result['outcome']]
+    return True, f"Hold placed. You are number {result['queue_position']} in line."
+
+def cancel_hold_for_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
+    """
+    Remove a patron from a book's hold queue.
+
+    A copy already set aside for the patron passes to the next patron in line.
+
+    Args:
+        patron_id: 6-digit library card ID
+        book_id: ID of the held book
+
+    Returns:
+        tuple: (success: bool, message: str)
+    """
+    if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
+        return False, "Invalid patron ID. Must be exactly 6 digits."
+
+    if cancel_hold(patron_id, book_id) is None:
+        return False, "No hold found for this patron and book."
+    return True, "Hold cancelled."
+
+def get_patron_holds_report(patron_id: str) -> Dict:
+    """
+    List a patron's holds and their place in each queue.
+
+    Args:
+        patron_id: 6-digit library card ID
+
+    Returns:
+        dict: Contains status and holds, each with book_id, title, author,
+            status ('waiting' or 'ready'), placed_ts, ready_ts and
+            queue_position (None once ready for pickup)
+    """
+    if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
+        return {'status': 'error', 'message': "Invalid patron ID. Must be exactly 6 digits.", 'holds': []}
+    return {'status': 'success', 'holds': get_patron_holds(patron_id)}
 
 def calculate_late_fee_for_book(patron_id: str, book_id: int) -> Dict:
     """
@@ -183,29 +433,28 @@ def calculate_late_fee_for_book(patron_id: str, book_id: int) -> Dict:
     """
     # Validate patron ID
     if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
-        return {
-            'fee_amount': 0.00,
-            'days_overdue': 0,
-            'status': 'error',
-            'message': 'Invalid patron ID. Must be exactly 6 digits.'
-        }
+        return _late_fee_error('Invalid patron ID. Must be exactly 6 digits.')
 
     # Get borrow record
     record = get_borrow_record(patron_id, book_id)
-    if not record:
-        return {
-            'fee_amount': 0.00,
-            'days_overdue': 0,
-            'status': 'error',
-            'message': 'No active borrow record found for this patron and book.'
-        }
+    return _late_fee_result(record, datetime.now())
 
-    # Parse dates
-    due_date = datetime.fromisoformat(record['due_date'])
-    current_date = datetime.now()
+def _late_fee_error(message: str) -> Dict:
+    """Late fee result for a request that could not be resolved."""
+    return {
+        'fee_amount': 0.00,
+        'days_overdue': 0,
+        'status': 'error',
+        'message': message
+    }
+
+def _late_fee_result(record: Optional[Dict], as_of: datetime) -> Dict:
+    """Late fee result for an active borrow record (or None if there is none)."""
+    if not record:
+        return _late_fee_error('No active borrow record found for this patron and book.')
 
     # Calculate days overdue
-    days_overdue = (current_date - due_date).days
+    days_overdue = _days_overdue(record, as_of)
 
     # If not overdue, return zero fee
     if days_overdue <= 0:
@@ -217,26 +466,287 @@ def calculate_late_fee_for_book(patron_id: str, book_id: int) -> Dict:
         }
 
     # Calculate fee based on days overdue
-    fee_amount = 0.00
-
-    if days_overdue <= 7:
-        # First 7 days: $0.50 per day
-        fee_amount = days_overdue * 0.50
-    else:
-        # First 7 days at $0.50, remaining days at $1.00
-        fee_amount = (7 * 0.50) + ((days_overdue - 7) * 1.00)
-
-    # Cap at maximum of $15.00
-    fee_amount = min(fee_amount, 15.00)
+    fee_amount = _late_fee_for_days(days_overdue)
 
     return {
-        'fee_amount': round(fee_amount, 2),
+        'fee_amount': fee_amount,
         'days_overdue': days_overdue,
         'status': 'success',
         'message': f'Late fee calculated for {days_overdue} day(s) overdue.'
     }
 
-def search_books_in_catalog(q: str, search_type: str) -> List[Dict]:
+def calculate_late_fees_for_pairs(items: List[Dict]) -> List[Dict]:
+    """
+    Calculate late fees for many (patron, book) pairs at once.
+
+    All borrow records are resolved with a single query and fees are
+    computed in one pass. Each result has the same shape as
+    calculate_late_fee_for_book, plus the patron_id and book_id it is for,
+    and results are returned in request order.
+
+    Args:
+        items: Dicts with patron_id and book_id
+
+    Returns:
+        List of late fee results, one per item
+    """
+    results = []
+    pairs = []
+    for item in items:
+        patron_id = item.get('patron_id') if isinstance(item, dict) else None
+        book_id = item.get('book_id') if isinstance(item, dict) else None
+        if not isinstance(patron_id, str) or not patron_id.isdigit() or len(patron_id) != 6:
+            result = _late_fee_error('Invalid patron ID. Must be exactly 6 digits.')
+        elif not isinstance(book_id, int) or isinstance(book_id, bool):
+            result = _late_fee_error('Invalid book ID.')
+        else:
+            result = None
+            pairs.append((patron_id, book_id))
+        results.append((patron_id, book_id, result))
+
+    records = get_borrow_records_for_pairs(pairs) if pairs else {}
+    now = datetime.now()
+
+    return [
+        dict(result or _late_fee_result(records.get((patron_id, book_id)), now),
+             patron_id=patron_id, book_id=book_id)
+        for patron_id, book_id, result in results
+    ]
+
+def get_overdue_report(cursor: Optional[str] = None, limit: int = 100) -> Dict:
+    """
+    Get one page of all overdue open loans with their late fees.
+
+    Args:
+        cursor: Opaque cursor from the previous page's next_cursor (None for the first page)
+        limit: Loans per page (1-500)
+
+    Returns:
+        dict: Contains status, loans (each with days_overdue and fee_amount),
+        count and next_cursor (None on the last page)
+    """
+    if not isinstance(limit, int) or not 1 <= limit <= 500:
+        return {'status': 'error', 'message': 'Limit must be between 1 and 500.'}
+
+    after = None
+    if cursor:
+        try:
+            due_ts, record_id = cursor.split(':')
+            after = (int(due_ts), int(record_id))
+        except ValueError:
+            return {'status': 'error', 'message': 'Invalid cursor.'}
+
+    loans = get_overdue_loans(to_epoch(datetime.now()), limit, after)
+
+    # Fees for the whole page in one pass over the SQL-computed day counts
+    for loan in loans:
+        loan['fee_amount'] = _late_fee_for_days(loan['days_overdue'])
+
+    next_cursor = None
+    if len(loans) == limit:
+        next_cursor = f"{loans[-1]['due_ts']}:{loans[-1]['id']}"
+
+    return {
+        'status': 'success',
+        'loans': loans,
+        'count': len(loans),
+        'next_cursor': next_cursor
+    }
+
+def get_change_feed(cursor: Optional[str] = None, limit: int = 100) -> Dict:
+    """
+    Get the next page of catalog and loan change events.
+
+    Consumers store next_cursor and pass it back on their next poll, so
+    each poll reads only what changed since the last one. The cursor holds
+    the last event id read from each database ("12" unsharded, "12.40.7"
+    with two borrow record shards), so loan events logged on the shards
+    are merged into the feed.
+
+    Args:
+        cursor: next_cursor from the previous page (None to read from the start)
+        limit: Events per page (1-1000)
+
+    Returns:
+        dict: Contains status, changes, count, next_cursor (pass it back even
+        when changes is empty) and has_more (True if another page is ready now)
+    """
+    if not isinstance(limit, int) or not 1 <= limit <= 1000:
+        return {'status': 'error', 'message': 'Limit must be between 1 and 1000.'}
+
+    sources = len(get_change_event_sources())
+    after_ids = [0] * sources
+    if cursor:
+        try:
+            after_ids = [int(part) for part in cursor.split('.')]
+        except ValueError:
+            return {'status': 'error', 'message': 'Invalid cursor.'}
+        if len(after_ids) != sources or min(after_ids) < 0:
+            return {'status': 'error', 'message': 'Invalid cursor.'}
+
+    changes = get_merged_change_events(after_ids, limit + 1)
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    for change in changes:
+        after_ids[change.pop('source')] = change['id']
+
+    return {
+        'status': 'success',
+        'changes': changes,
+        'count': len(changes),
+        'next_cursor': '.'.join(str(after_id) for after_id in after_ids),
+        'has_more': has_more
+    }
+
+def accrue_late_fees(as_of: Optional[datetime] = None) -> Dict:
+    """
+    Advance the late fee ledger (scheduled job, see `manage.py accrue-fees`).
+
+    Only loans whose fee can have changed since the previous run are
+    touched: open loans that gained a whole day overdue without yet reaching
+    the fee cap, and loans returned late since then (their fee becomes final).
+
+    Args:
+        as_of: Time to accrue fees up to (defaults to now)
+
+    Returns:
+        dict: Contains status, updated (number of ledger entries written) and as_of
+    """
+    as_of = as_of or datetime.now()
+    as_of_ts = to_epoch(as_of)
+    last_run_ts = get_fee_ledger_last_run()
+
+    due_since_ts = None
+    if last_run_ts is not None:
+        due_since_ts = min(last_run_ts, as_of_ts) - (LATE_FEE_CAP_DAYS + 1) * SECONDS_PER_DAY
+
+    entries = []
+    for loan in get_fee_accrual_candidates(as_of_ts, last_run_ts, due_since_ts):
+        closed = loan['return_ts'] is not None
+        end_ts = loan['return_ts'] if closed else as_of_ts
+        days_overdue = max((end_ts - loan['due_ts']) // SECONDS_PER_DAY, 0)
+        entries.append({
+            'borrow_record_id': loan['id'],
+            'patron_id': loan['patron_id'],
+            'book_id': loan['book_id'],
+            'due_ts': loan['due_ts'],
+            'days_overdue': days_overdue,
+            'accrued_fee': _late_fee_for_days(days_overdue),
+            'closed': int(closed)
+        })
+
+    if not upsert_fee_ledger_entries(entries, as_of_ts):
+        return {'status': 'error', 'message': 'Database error occurred while updating the fee ledger.'}
+
+    return {'status': 'success', 'updated': len(entries), 'as_of': as_of.isoformat()}
+
+def roll_up_circulation(as_of: Optional[datetime] = None) -> Dict:
+    """
+    Bring the daily overdue counts and fee accruals up to date (scheduled job,
+    see `manage.py rollups update`). Loan and return counts are kept current
+    by the borrow and return paths themselves.
+
+    Args:
+        as_of: Time to roll up to (defaults to now)
+
+    Returns:
+        dict: Contains status, updated (number of (day, book) rollups written) and as_of
+    """
+    as_of = as_of or datetime.now()
+    try:
+        updated = roll_up_overdue(to_epoch(as_of), _late_fee_for_days)
+    except Exception as e:
+        return {'status': 'error', 'message': 'Database error occurred while updating the daily rollups.'}
+    return {'status': 'success', 'updated': updated, 'as_of': as_of.isoformat()}
+
+def rebuild_circulation(as_of: Optional[datetime] = None) -> Dict:
+    """
+    Recompute all daily rollups from the loans (see `manage.py rollups rebuild`).
+
+    Args:
+        as_of: Time to roll overdue counts and fee accruals up to (defaults to now)
+
+    Returns:
+        dict: Contains status, rows (rollup rows afterwards) and as_of
+    """
+    as_of = as_of or datetime.now()
+    try:
+        rows = rebuild_circulation_rollups(to_epoch(as_of), _late_fee_for_days)
+    except Exception as e:
+        return {'status': 'error', 'message': 'Database error occurred while rebuilding the daily rollups.'}
+    return {'status': 'success', 'rows': rows, 'as_of': as_of.isoformat()}
+
+def check_circulation() -> Dict:
+    """
+    Check the daily rollups against the loans (see `manage.py rollups check`).
+
+    Returns:
+        dict: Contains status, consistent and mismatches, each with date,
+            book_id, column, stored and expected
+    """
+    mismatches = check_circulation_rollups(_late_fee_for_days)
+    for mismatch in mismatches:
+        mismatch['date'] = (datetime(1970, 1, 1) + timedelta(days=mismatch.pop('day'))).strftime('%Y-%m-%d')
+    return {'status': 'success', 'consistent': not mismatches, 'mismatches': mismatches}
+
+def _ledger_fee(entry: Dict, as_of: datetime) -> Optional[float]:
+    """
+    Late fee from a fee ledger entry, or None if the entry is not current.
+
+    An entry is current when the accrual job has reached it and no whole
+    day has passed since (or the fee is already capped).
+    """
+    if entry['accrued_through'] is None:
+        return None
+    days_overdue = _days_overdue(entry, as_of)
+    if days_overdue == entry['days_overdue'] or entry['days_overdue'] >= LATE_FEE_CAP_DAYS:
+        return entry['accrued_fee']
+    return None
+
+def get_late_fee(patron_id: str, book_id: int) -> Dict:
+    """
+    Get the late fee for a borrowed book, read from the fee ledger.
+
+    The ledger entry is used when it is still current (no whole day has
+    passed since it was accrued, or the fee is capped); otherwise the fee is
+    computed with calculate_late_fee_for_book. Successful results also carry
+    amount_paid and balance_due from payments recorded in the ledger.
+
+    Args:
+        patron_id: 6-digit library card ID
+        book_id: ID of the borrowed book
+
+    Returns:
+        dict: Same shape as calculate_late_fee_for_book, plus amount_paid and balance_due
+    """
+    if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
+        return calculate_late_fee_for_book(patron_id, book_id)
+
+    entry = get_fee_ledger_entry(patron_id, book_id)
+    now = datetime.now()
+    fee_amount = _ledger_fee(entry, now) if entry else None
+    result = None
+    if fee_amount is not None:
+        days_overdue = _days_overdue(entry, now)
+        result = {
+            'fee_amount': fee_amount,
+            'days_overdue': max(days_overdue, 0),
+            'status': 'success',
+            'message': f'Late fee calculated for {days_overdue} day(s) overdue.'
+        }
+
+    if result is None:
+        result = calculate_late_fee_for_book(patron_id, book_id)
+
+    if result['status'] == 'success':
+        amount_paid = entry['paid_amount'] if entry else 0.00
+        result['amount_paid'] = amount_paid
+        result['balance_due'] = round(max(result['fee_amount'] - amount_paid, 0.00), 2)
+    return result
+
+def search_books_in_catalog(q: str, search_type: str, available_only: bool = False,
+                            sort: str = 'title') -> List[Dict]:
     """
     Search for books in the catalog.
     Implements R6: Book Search Functionality
@@ -244,6 +754,9 @@ def search_books_in_catalog(q: str, search_type: str) -> List[Dict]:
     Args:
         search_term: The search query
         search_type: Type of search ('title', 'author', or 'isbn')
+        available_only: Only return books with at least one available copy
+        sort: Sort order ('title', 'availability', 'popularity' or 'relevance',
+            the best title or author matches first and then the most borrowed)
 
     Returns:
         List of matching books
@@ -263,49 +776,129 @@ def search_books_in_catalog(q: str, search_type: str) -> List[Dict]:
         if not q.isdigit() or len(q) != 13:
             return []  # Invalid ISBN format, return no results
 
+    # Only pass listing options that differ from the defaults
+    options = {}
+    if available_only:
+        options['available_only'] = True
+    if sort != 'title':
+        options['sort'] = sort
+
     # Perform search
-    results = search_books(q.strip(), search_type)
+    results = search_books(q.strip(), search_type, **options)
 
     return results
 
-def get_patron_status_report(patron_id: str) -> Dict:
+def get_popular_books(limit: int = 10, offset: int = 0) -> Dict:
+    """
+    Get one page of the catalog ranked by how often each book has been borrowed.
+
+    Read from the maintained borrow_count column through its index, so the
+    cost does not grow with the number of loans.
+
+    Args:
+        limit: Books per page (1-100)
+        offset: Books to skip (for later pages)
+
+    Returns:
+        dict: Contains status and books, each a book dict with its borrow_count and rank
+    """
+    if not isinstance(limit, int) or not 1 <= limit <= 100:
+        return {'status': 'error', 'message': 'Limit must be between 1 and 100.'}
+    if not isinstance(offset, int) or offset < 0:
+        return {'status': 'error', 'message': 'Offset must not be negative.'}
+
+    books = get_all_books(sort='popularity', limit=limit, offset=offset)
+    for rank, book in enumerate(books, start=offset + 1):
+        book['rank'] = rank
+    return {'status': 'success', 'books': books, 'count': len(books)}
+
+def _parse_history_cursor(cursor: Optional[str]) -> Optional[Tuple[str, int]]:
+    """Parse a "borrow_date:id" history cursor; raises ValueError if malformed."""
+    if not cursor:
+        return None
+    borrow_date, _, record_id = cursor.rpartition(':')
+    datetime.fromisoformat(borrow_date)
+    return borrow_date, int(record_id)
+
+def get_patron_status_report(patron_id: str, history_cursor: Optional[str] = None,
+                             history_limit: int = HISTORY_PAGE_SIZE, read_only: bool = True) -> Dict:
     """
     Get status report for a patron.
     Implements R7: Patron Status Report
 
+    Only one page of the borrowing history is loaded: the most recent
+    loans, or those before history_cursor. Pass history_next_cursor back
+    to get the next page, or use iter_patron_history for all of it.
+
     Args:
         patron_id: 6-digit library card ID
+        history_cursor: history_next_cursor from the previous report (None for the first page)
+        history_limit: Returned loans per history page (1-500)
+        read_only: Read through the configured read connection (False reads
+            the primary, e.g. for reports cached under the primary's version)
 
     Returns:
-        dict: Contains patron status information including borrowed books, late fees, and history
+        dict: Contains patron status information including borrowed books, late fees,
+            one page of history and history_next_cursor (None on the last page)
     """
+    error = None
     # Validate patron ID
     if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
+        error = 'Invalid patron ID. Must be exactly 6 digits.'
+    elif not isinstance(history_limit, int) or not 1 <= history_limit <= 500:
+        error = 'History limit must be between 1 and 500.'
+    else:
+        try:
+            before = _parse_history_cursor(history_cursor)
+        except ValueError:
+            error = 'Invalid history cursor.'
+
+    if error:
         return {
             'status': 'error',
-            'message': 'Invalid patron ID. Must be exactly 6 digits.',
+            'message': error,
             'patron_id': patron_id,
             'currently_borrowed_books': [],
             'total_late_fees': 0.00,
             'num_books_borrowed': 0,
-            'borrowing_history': []
+            'borrowing_history': [],
+            'history_next_cursor': None
         }
 
     # Get currently borrowed books
-    borrowed_books = get_patron_borrowed_books(patron_id)
+    borrowed_books = get_patron_borrowed_books(patron_id, read_only=read_only)
 
-    # Calculate total late fees across all borrowed books
+    # Calculate total late fees across all borrowed books, from one read of
+    # the patron's open loans and their ledger entries
+    fee_entries = get_patron_fee_entries(patron_id, read_only=read_only)
+    now = datetime.now()
     total_late_fees = 0.00
     for book in borrowed_books:
-        fee_result = calculate_late_fee_for_book(patron_id, book['book_id'])
-        if fee_result['status'] == 'success':
-            total_late_fees += fee_result['fee_amount']
+        entry = fee_entries.get(book['book_id'])
+        if entry is not None:
+            fee_amount = _ledger_fee(entry, now)
+            if fee_amount is None:
+                fee_amount = _late_fee_for_days(_days_overdue(entry, now))
+            total_late_fees += fee_amount
+        else:
+            # Not seen by the fee read (e.g. returned in between); look it up on its own
+            fee_result = calculate_late_fee_for_book(patron_id, book['book_id'])
+            if fee_result['status'] == 'success':
+                total_late_fees += fee_result['fee_amount']
 
     # Get number of books currently borrowed
     num_books_borrowed = len(borrowed_books)
 
-    # Get borrowing history (returned books)
-    borrowing_history = get_borrowing_history(patron_id)
+    # Get one page of borrowing history (returned books); one extra row tells whether more follow
+    options = {'limit': history_limit + 1}
+    if before:
+        options['before'] = before
+    borrowing_history = get_borrowing_history(patron_id, read_only=read_only, **options)
+    next_cursor = None
+    if len(borrowing_history) > history_limit:
+        borrowing_history = borrowing_history[:history_limit]
+        last = borrowing_history[-1]
+        next_cursor = f"{last['borrow_date'].isoformat()}:{last['id']}"
 
     return {
         'status': 'success',
@@ -313,9 +906,88 @@ def get_patron_status_report(patron_id: str) -> Dict:
         'currently_borrowed_books': borrowed_books,
         'total_late_fees': round(total_late_fees, 2),
         'num_books_borrowed': num_books_borrowed,
-        'borrowing_history': borrowing_history
+        'borrowing_history': borrowing_history,
+        'history_next_cursor': next_cursor
     }
 
+def _fees_valid_until(report: Dict, as_of: datetime) -> Optional[int]:
+    """Epoch seconds at which a borrowed book's overdue flag or late fee next changes."""
+    now_ts = to_epoch(as_of)
+    boundaries = []
+    for book in report['currently_borrowed_books']:
+        due_ts = to_epoch(book['due_date'])
+        if now_ts <= due_ts:
+            # Becomes overdue
+            boundaries.append(due_ts + 1)
+        else:
+            days_overdue = (now_ts - due_ts) // SECONDS_PER_DAY
+            if days_overdue < LATE_FEE_CAP_DAYS:
+                boundaries.append(due_ts + (days_overdue + 1) * SECONDS_PER_DAY)
+    return min(boundaries) if boundaries else None
+
+def _with_current_fees(report: Dict, as_of: datetime) -> Dict:
+    """Copy of a report with overdue flags and late fees recomputed for the given time."""
+    borrowed_books = []
+    total_late_fees = 0.00
+    for book in report['currently_borrowed_books']:
+        borrowed_books.append(dict(book, is_overdue=as_of > book['due_date']))
+        total_late_fees += _late_fee_for_days(_days_overdue({'due_ts': to_epoch(book['due_date'])}, as_of))
+    return dict(report, currently_borrowed_books=borrowed_books, total_late_fees=round(total_late_fees, 2))
+
+def get_cached_patron_status_report(patron_id: str, cache: PatronReportCache) -> Dict:
+    """
+    Get the patron status report (first history page), served from cache when current.
+
+    A cached report is reused until the patron's activity version changes
+    (a borrow, return or payment for that patron). Overdue flags and late
+    fees change with time alone, so when a loan crosses a day boundary they
+    are recomputed from the cached due dates without touching the database.
+
+    The version is read from the primary (or the patron's shard), so reports
+    are built from there too: a lagging read replica could otherwise cache
+    a stale report under the new version.
+
+    Args:
+        patron_id: 6-digit library card ID
+        cache: Cache holding the reports
+
+    Returns:
+        dict: As get_patron_status_report
+    """
+    if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
+        return get_patron_status_report(patron_id)
+
+    version = get_patron_activity_version(patron_id)
+    now = datetime.now()
+    entry = cache.get(patron_id, version)
+
+    if entry is None:
+        report = get_patron_status_report(patron_id, read_only=False)
+        if report['status'] == 'success':
+            cache.set(patron_id, version, report, _fees_valid_until(report, now))
+        return report
+
+    if entry['fees_valid_until'] is not None and to_epoch(now) >= entry['fees_valid_until']:
+        report = _with_current_fees(entry['report'], now)
+        cache.set(patron_id, version, report, _fees_valid_until(report, now))
+        return report
+
+    return entry['report']
+
+def iter_patron_history(patron_id: str):
+    """
+    Stream a patron's complete borrowing history, newest first.
+
+    Args:
+        patron_id: 6-digit library card ID
+
+    Returns:
+        Iterator of returned loans, or None if the patron ID is invalid
+    """
+    if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
+        return None
+    return iter_borrowing_history(patron_id)
+
 def pay_late_fees(patron_id: str, book_id: int, payment_gateway: PaymentGateway = None) -> Tuple[bool, str, Optional[str]]:
     """
     Process payment for late fees using external payment gateway.
@@ -350,6 +1022,11 @@ def pay_late_fees(patron_id: str, book_id: int, payment_gateway: PaymentGateway
     
     fee_amount = fee_info.get('fee_amount', 0.0)
     
+    # Reconcile against payments already recorded in the fee ledger
+    ledger_entry = get_fee_ledger_entry(patron_id, book_id)
+    if ledger_entry:
+        fee_amount = round(fee_amount - ledger_entry['paid_amount'], 2)
+    
     if fee_amount <= 0:
         return False, "No late fees to pay for this book.", None
     
@@ -371,14 +1048,36 @@ def pay_late_fees(patron_id: str, book_id: int, payment_gateway: PaymentGateway
             description=f"Late fees for '{book['title']}'"
         )
         
-        if success:
-            return True, f"Payment successful! {message}", transaction_id
-        else:
+        if not success:
             return False, f"Payment failed: {message}", None
             
     except Exception as e:
         # Handle payment gateway errors
         return False, f"Payment processing error: {str(e)}", None
+    
+    # The patron has been charged; if the ledger cannot record it, the next
+    # call would charge them again, so give the money back instead
+    if not record_fee_payment(patron_id, book_id, fee_amount, transaction_id):
+        return _refund_unrecorded_payment(payment_gateway, transaction_id, fee_amount)
+    return True, f"Payment successful! {message}", transaction_id
+
+def _refund_unrecorded_payment(payment_gateway: PaymentGateway, transaction_id: str,
+                               amount: float) -> Tuple[bool, str, Optional[str]]:
+    """
+    Refund a charge that could not be recorded in the fee ledger.
+
+    Returns:
+        tuple: pay_late_fees' failure result; the transaction_id is kept
+            when the refund also fails, so staff can reconcile the charge
+    """
+    try:
+        refunded, _ = payment_gateway.refund_payment(transaction_id, amount)
+    except Exception as e:
+        refunded = False
+    if refunded:
+        return False, "Payment could not be recorded and has been refunded. Please try again.", None
+    return (False, f"Payment {transaction_id} could not be recorded or refunded. "
+                   "Please contact the library to reconcile it.", transaction_id)
 
 
 def refund_late_fee_payment(transaction_id: str, amount: float, payment_gateway: PaymentGateway = None) -> Tuple[bool, str]:
@@ -0,0 +1,62 @@
+"""
+LRU Cache - Bounded, versioned cache shared by the per-process caches
+
+Each entry stores the version it was built at (a patron activity version,
+a book's available_copies, ...). A lookup with any other version misses, so
+callers read the current version from the database and stale entries are
+never served, even when the change was made by another worker process.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class VersionedLRUCache:
+    """Thread-safe, bounded LRU cache of values tagged with a version."""
+
+    def __init__(self, max_entries: int):
+        """
+        Args:
+            max_entries: Maximum number of cached entries (0 disables caching)
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, version: Any) -> Optional[Any]:
+        """Return the cached value, or None if missing or stored at another version."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, version: Any, value: Any):
+        """Store a value, evicting the least recently used entries if full."""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *keys: Hashable):
+        """Drop the entries stored under the given keys."""
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        """Drop all entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
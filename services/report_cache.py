@@ -0,0 +1,34 @@
+"""
+Report Cache - Per-patron cache of status reports
+
+Entries are keyed by patron ID and store the patron activity version they
+were built at (see database.get_patron_activity_version). Borrows, returns
+and payments bump that version in the database, so a cached report is
+dropped as soon as the patron's loans change, even when the change was made
+by another worker process.
+"""
+
+from typing import Dict, Optional
+
+from .lru_cache import VersionedLRUCache
+
+
+class PatronReportCache(VersionedLRUCache):
+    """Thread-safe, bounded LRU cache of patron status reports."""
+
+    def get(self, patron_id: str, version: int) -> Optional[Dict]:
+        """Return the cached report and fees_valid_until, or None if missing or built at another version."""
+        return super().get(patron_id, version)
+
+    def set(self, patron_id: str, version: int, report: Dict, fees_valid_until: Optional[int]):
+        """
+        Store a report, evicting the least recently used reports if full.
+
+        Args:
+            patron_id: 6-digit library card ID
+            version: Patron activity version the report was built at
+            report: The status report
+            fees_valid_until: Epoch seconds at which a loan's late fee or
+                overdue flag next changes (None if none can change)
+        """
+        super().set(patron_id, version, {'report': report, 'fees_valid_until': fees_valid_until})
@@ -0,0 +1,164 @@
+import pytest
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import services.analytics as analytics
+from app import create_app
+from services.analytics import CirculationStats, get_circulation_stats
+from database import (
+    insert_book, insert_borrow_record, update_borrow_record_return_date,
+    archive_returned_loans, load_loan_columns, to_epoch
+)
+
+# Engines to check; the pure-Python fallback is always available
+ENGINES = ['python'] + (['numpy'] if analytics.np is not None else [])
+
+class TestCirculationAnalytics:
+    """Test cases for the columnar circulation statistics"""
+
+    @pytest.fixture(autouse=True)
+    def loan_history(self, isolated_database, monkeypatch):
+        """Seed three books and a known loan history"""
+        self.monkeypatch = monkeypatch
+        insert_book("Book A", "Author Two", "1234567890121", 5, 5)
+        insert_book("Book B", "Author One", "1234567890122", 5, 5)
+        insert_book("Book C", "Author One", "1234567890123", 5, 5)
+
+        self.now = datetime.now()
+        # (book_id, borrowed days ago, days until returned or None while open)
+        loans = [(1, 40, 10), (1, 20, 16), (1, 2, None), (2, 30, 14), (2, 25, None), (3, 1, None)]
+        for patron, (book_id, days_ago, kept) in enumerate(loans):
+            patron_id = f"{100000 + patron}"
+            borrow_date = self.now - timedelta(days=days_ago)
+            insert_borrow_record(patron_id, book_id, borrow_date, borrow_date + timedelta(days=14))
+            if kept is not None:
+                update_borrow_record_return_date(patron_id, book_id, borrow_date + timedelta(days=kept))
+
+    def stats(self, engine, **kwargs):
+        if engine == 'python':
+            self.monkeypatch.setattr(analytics, 'np', None)
+        return get_circulation_stats(CirculationStats(300), **kwargs)
+
+    @pytest.mark.parametrize('engine', ENGINES)
+    def test_top_books_and_authors(self, engine):
+        """Test loans are counted per book and per author, ties broken by ID and name"""
+        result = self.stats(engine, limit=2)
+
+        assert result['engine'] == engine
+        assert [(book['title'], book['loans']) for book in result['top_books']] == [("Book A", 3), ("Book B", 2)]
+        assert result['top_authors'] == [
+            {'author': "Author One", 'loans': 3}, {'author': "Author Two", 'loans': 3}
+        ]
+
+    @pytest.mark.parametrize('engine', ENGINES)
+    def test_overdue_rates_and_loan_duration(self, engine):
+        """Test overdue shares and the mean loan length"""
+        result = self.stats(engine)
+
+        assert result['loans'] == 6
+        assert result['overdue'] == {
+            'open_loans': 3, 'overdue_loans': 1, 'overdue_rate': 0.3333,
+            'returned_loans': 3, 'returned_late': 1, 'late_return_rate': 0.3333,
+        }
+        assert result['average_loan_days'] == 13.33
+
+    @pytest.mark.parametrize('engine', ENGINES)
+    def test_daily_circulation(self, engine):
+        """Test borrows and returns are counted on their UTC day"""
+        result = self.stats(engine, days=3)
+        daily = result['daily_circulation']
+
+        assert len(daily) == 3
+        assert daily[-1]['date'] == (datetime(1970, 1, 1) + timedelta(
+            days=to_epoch(self.now) // database.SECONDS_PER_DAY)).strftime('%Y-%m-%d')
+        assert sum(day['borrows'] for day in daily) == 2
+        assert sum(day['returns'] for day in daily) == 0
+
+    def test_engines_agree(self):
+        """Test the NumPy and pure-Python aggregations give identical answers"""
+        if analytics.np is None:
+            pytest.skip("numpy is not installed")
+        vectorized = self.stats('numpy', days=60)
+        fallback = self.stats('python', days=60)
+
+        vectorized.pop('engine'), fallback.pop('engine')
+        vectorized.pop('as_of'), fallback.pop('as_of')
+        assert vectorized == fallback
+
+    def test_snapshot_includes_archived_loans(self):
+        """Test archived loans are still counted"""
+        archive_returned_loans(to_epoch(self.now))
+
+        columns = load_loan_columns(batch_size=2)
+
+        assert len(columns['book_id']) == 6
+        assert sorted(columns['return_ts']).count(-1) == 3
+
+    def test_stale_snapshot_is_rebuilt_in_background(self):
+        """Test a stale snapshot is still served while its replacement is built"""
+        stats = CirculationStats(300)
+        first = stats.snapshot()
+        assert stats.snapshot() is first
+        assert stats._refresher is None
+
+        stats.max_age = 0
+        assert stats.snapshot() is first
+        stats._refresher.join()
+        stats.max_age = 300
+        assert stats.snapshot() is not first
+
+    def test_workers_share_one_snapshot(self, tmp_path):
+        """Test a second process loads the shared snapshot instead of reading the loans"""
+        path = str(tmp_path / 'analytics.db.stats')
+        builds = []
+        self.monkeypatch.setattr(analytics, 'load_loan_columns',
+                                 lambda: builds.append(1) or load_loan_columns())
+
+        first = CirculationStats(300, path).snapshot()
+        second = CirculationStats(300, path).snapshot()
+
+        assert len(builds) == 1
+        assert second.loan_count == first.loan_count == 6
+        assert second.top_books(1) == first.top_books(1)
+
+        stale = CirculationStats(0, path)
+        stale.snapshot()
+        assert len(builds) == 2
+
+    def test_snapshot_is_per_process_without_fcntl(self, tmp_path):
+        """Test platforms without fcntl build a snapshot per process and share no file"""
+        path = str(tmp_path / 'analytics.db.stats')
+        builds = []
+        self.monkeypatch.setattr(analytics, 'fcntl', None)
+        self.monkeypatch.setattr(analytics, 'load_loan_columns',
+                                 lambda: builds.append(1) or load_loan_columns())
+
+        first = CirculationStats(300, path).snapshot()
+        second = CirculationStats(300, path).snapshot()
+
+        assert len(builds) == 2
+        assert second.loan_count == first.loan_count == 6
+        assert not os.path.exists(path)
+
+    def test_invalid_parameters(self):
+        """Test out-of-range days and limits are rejected"""
+        stats = CirculationStats(300)
+
+        assert get_circulation_stats(stats, days=0)['status'] == 'error'
+        assert get_circulation_stats(stats, limit=101)['status'] == 'error'
+
+    def test_stats_endpoint(self):
+        """Test /api/stats serves the statistics"""
+        client = create_app().test_client()
+
+        response = client.get('/api/stats?days=7&limit=1')
+
+        assert response.status_code == 200
+        assert len(response.get_json()['daily_circulation']) == 7
+        assert response.get_json()['top_books'][0]['book_id'] == 1
+        assert client.get('/api/stats?days=1000').status_code == 400
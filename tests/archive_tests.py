@@ -0,0 +1,96 @@
+import pytest
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import (
+    get_db_connection, insert_book, insert_borrow_record,
+    update_borrow_record_return_date, archive_returned_loans, get_borrowing_history, to_epoch
+)
+
+class TestLoanArchival:
+    """Test cases for archiving old returned loans"""
+
+    @pytest.fixture(autouse=True)
+    def books(self, isolated_database):
+        """Seed six books"""
+        for i in range(1, 7):
+            insert_book(f"Book {i}", "Test Author", f"{1234567890120 + i}", 3, 3)
+        self.now = datetime.now()
+
+    def loan(self, book_id, returned_days_ago=None, patron_id="123456", overdue_days=0):
+        """Create a loan returned the given number of days ago (None leaves it open)."""
+        end = self.now - timedelta(days=returned_days_ago or 0)
+        borrow_date = end - timedelta(days=14 + overdue_days)
+        insert_borrow_record(patron_id, book_id, borrow_date, borrow_date + timedelta(days=14))
+        if returned_days_ago is not None:
+            update_borrow_record_return_date(patron_id, book_id, end)
+
+    def table_count(self, table):
+        conn = get_db_connection()
+        count = conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+        conn.close()
+        return count
+
+    def test_only_old_returned_loans_are_archived(self):
+        """Test open and recently returned loans stay in borrow_records"""
+        self.loan(1, returned_days_ago=400)
+        self.loan(2, returned_days_ago=10)
+        self.loan(3)
+
+        archived = archive_returned_loans(to_epoch(self.now - timedelta(days=365)))
+
+        assert archived == 1
+        assert self.table_count('borrow_records') == 2
+        assert self.table_count('borrow_records_archive') == 1
+
+    def test_archival_runs_in_batches(self):
+        """Test every eligible loan is moved when the batch size is smaller than the backlog"""
+        for book_id in range(1, 6):
+            self.loan(book_id, returned_days_ago=400 + book_id)
+
+        archived = archive_returned_loans(to_epoch(self.now), batch_size=2)
+
+        assert archived == 5
+        assert self.table_count('borrow_records') == 0
+
+    def test_history_unions_hot_and_archived_loans(self):
+        """Test history pages across both tables in borrow date order"""
+        for book_id in range(1, 6):
+            self.loan(book_id, returned_days_ago=100 * book_id)
+        archive_returned_loans(to_epoch(self.now - timedelta(days=250)))
+
+        history = get_borrowing_history("123456")
+        first_page = get_borrowing_history("123456", limit=2)
+        second_page = get_borrowing_history("123456", limit=2, offset=2)
+
+        assert self.table_count('borrow_records_archive') == 3
+        assert [loan['book_id'] for loan in history] == [1, 2, 3, 4, 5]
+        assert [loan['book_id'] for loan in first_page + second_page] == [1, 2, 3, 4]
+        assert history[4]['title'] == "Book 5"
+
+    def test_unpaid_late_fees_stay_hot(self):
+        """Test loans with unpaid ledger fees are not archived, settled ones carry their fee"""
+        self.loan(1, returned_days_ago=400, overdue_days=5)
+        self.loan(2, returned_days_ago=400, overdue_days=5)
+        conn = get_db_connection()
+        conn.executemany('''
+            INSERT INTO fee_ledger (borrow_record_id, patron_id, book_id, due_ts, days_overdue,
+                                    accrued_fee, paid_amount, closed)
+            VALUES (?, '123456', ?, 0, 5, 2.50, ?, 1)
+        ''', [(1, 1, 2.50), (2, 2, 0.00)])
+        conn.commit()
+        conn.close()
+
+        archived = archive_returned_loans(to_epoch(self.now))
+
+        conn = get_db_connection()
+        row = conn.execute('SELECT book_id, late_fee, fee_paid FROM borrow_records_archive').fetchone()
+        ledger_ids = [r[0] for r in conn.execute('SELECT borrow_record_id FROM fee_ledger')]
+        conn.close()
+        assert archived == 1
+        assert (row['book_id'], row['late_fee'], row['fee_paid']) == (1, 2.50, 2.50)
+        assert ledger_ids == [2]
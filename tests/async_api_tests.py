@@ -0,0 +1,156 @@
+import pytest
+import asyncio
+import json
+import threading
+import time
+from unittest.mock import patch
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from routes.async_api import AsyncReadAPI
+from database import init_database, get_db_connection, insert_book, insert_borrow_record
+
+
+async def send_request(app, path, query=b'', method='GET', headers=()):
+    """Send one HTTP request through the ASGI app; return the messages it sent."""
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query,
+             'headers': [(name.lower().encode(), value.encode()) for name, value in headers]}
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return messages
+
+
+async def call(app, path, query=b'', method='GET'):
+    """Send one HTTP request through the ASGI app; return (status, decoded JSON body)."""
+    messages = await send_request(app, path, query, method)
+    return messages[0]['status'], json.loads(messages[1]['body'])
+
+
+class TestAsyncReadAPI:
+    """Test cases for the ASGI read API"""
+
+    def setup_method(self):
+        """Setup test database before each test"""
+        init_database()
+        # Clear existing data and reset auto-increment
+        conn = get_db_connection()
+        conn.execute('DELETE FROM borrow_records')
+        conn.execute('DELETE FROM books')
+        conn.execute('DELETE FROM sqlite_sequence WHERE name="books"')
+        conn.execute('DELETE FROM sqlite_sequence WHERE name="borrow_records"')
+        conn.commit()
+        conn.close()
+
+        insert_book("Test Book", "Test Author", "1234567890123", 3, 3)
+        insert_book("Another Book", "Other Author", "1234567890124", 1, 0)
+        now = datetime.now()
+        insert_borrow_record("123456", 1, now - timedelta(days=24), now - timedelta(days=10))
+        self.app = AsyncReadAPI(db_threads=4, max_pending=100)
+
+    def test_search_matches_flask_endpoint(self):
+        """Test /api/search returns the same body as the Flask blueprint"""
+        status, body = asyncio.run(call(self.app, '/api/search', b'q=Book&available=1&sort=availability'))
+        flask_body = create_app().test_client().get('/api/search?q=Book&available=1&sort=availability').get_json()
+
+        assert status == 200
+        assert body == flask_body
+        assert body['count'] == 1
+
+    def test_search_bytes_and_validators_match_flask_endpoint(self):
+        """Test /api/search sends Flask's bytes and catalog validators, and revalidates with 304"""
+        flask_response = create_app().test_client().get('/api/search?q=Book')
+        start, body = asyncio.run(send_request(self.app, '/api/search', b'q=Book'))
+        headers = {name.decode(): value.decode() for name, value in start['headers']}
+
+        assert body['body'] == flask_response.data
+        for name in ('ETag', 'Last-Modified', 'Cache-Control'):
+            assert headers[name.lower()] == flask_response.headers[name]
+
+        for validator in (('If-None-Match', flask_response.headers['ETag']),
+                          ('If-Modified-Since', flask_response.headers['Last-Modified'])):
+            start, body = asyncio.run(send_request(self.app, '/api/search', b'q=Book', headers=[validator]))
+            assert start['status'] == 304
+            assert body['body'] == b''
+
+        insert_book("Newer Book", "Test Author", "1234567890125", 1, 1)
+        start, _ = asyncio.run(send_request(self.app, '/api/search', b'q=Book',
+                                            headers=[('If-None-Match', flask_response.headers['ETag'])]))
+        assert start['status'] == 200
+
+    def test_late_fee_matches_flask_endpoint(self):
+        """Test /api/late_fee returns the same body as the Flask blueprint"""
+        status, body = asyncio.run(call(self.app, '/api/late_fee/123456/1'))
+        flask_body = create_app().test_client().get('/api/late_fee/123456/1').get_json()
+
+        assert status == 200
+        assert body == flask_body
+        assert body['fee_amount'] == 6.50
+
+    def test_errors(self):
+        """Test missing search terms, unknown paths and writes are rejected"""
+        assert asyncio.run(call(self.app, '/api/search'))[0] == 400
+        assert asyncio.run(call(self.app, '/api/late_fee/123456/abc'))[0] == 404
+        assert asyncio.run(call(self.app, '/api/search', b'q=Book', method='POST'))[0] == 405
+
+    def test_head_has_no_body(self):
+        """Test HEAD gets the GET status and headers without the body"""
+        head = asyncio.run(send_request(self.app, '/api/late_fee/123456/1', method='HEAD'))
+        get = asyncio.run(send_request(self.app, '/api/late_fee/123456/1'))
+
+        assert head[0] == get[0]
+        assert head[1]['body'] == b''
+        assert dict(head[0]['headers'])[b'content-length'] == str(len(get[1]['body'])).encode()
+
+    def test_many_requests_in_flight_with_bounded_threads(self):
+        """Test 100 concurrent requests complete while at most db_threads run at once"""
+        active = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def slow_late_fee(patron_id, book_id):
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.02)
+            with lock:
+                active -= 1
+            return {'status': 'success', 'fee_amount': 0.00}
+
+        async def burst():
+            return await asyncio.gather(*(call(self.app, '/api/late_fee/123456/1') for _ in range(100)))
+
+        with patch('routes.async_api.get_late_fee', side_effect=slow_late_fee):
+            results = asyncio.run(burst())
+
+        assert all(status == 200 for status, _ in results)
+        assert peak == 4
+
+    def test_overload_is_rejected_with_503(self):
+        """Test requests beyond the running ones plus max_pending waiting are turned away"""
+        app = AsyncReadAPI(db_threads=1, max_pending=2)
+
+        def slow_search(*args):
+            time.sleep(0.05)
+            return []
+
+        async def burst():
+            return await asyncio.gather(*(call(app, '/api/search', b'q=Book') for _ in range(5)))
+
+        with patch('routes.async_api.search_books_in_catalog', side_effect=slow_search):
+            statuses = sorted(status for status, _ in asyncio.run(burst()))
+
+        # One running on the thread, two waiting for it
+        assert statuses == [200, 200, 200, 503, 503]
@@ -0,0 +1,123 @@
+import pytest
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from database import init_database, get_db_connection, insert_book, get_all_books, search_books
+
+class TestAvailabilityFiltering:
+    """Test cases for "available now" catalog filtering and sorting"""
+
+    def setup_method(self):
+        """Setup test database before each test"""
+        init_database()
+        # Clear existing data and reset auto-increment
+        conn = get_db_connection()
+        conn.execute('DELETE FROM borrow_records')
+        conn.execute('DELETE FROM books')
+        conn.execute('DELETE FROM sqlite_sequence WHERE name="books"')
+        conn.execute('DELETE FROM sqlite_sequence WHERE name="borrow_records"')
+        conn.commit()
+        conn.close()
+
+        insert_book("Beta Book", "Author One", "1000000000001", 2, 0)
+        insert_book("Alpha Book", "Author Two", "1000000000002", 3, 1)
+        insert_book("Gamma Book", "Author One", "1000000000003", 5, 4)
+
+    def test_get_all_books_default_lists_everything_by_title(self):
+        """Test the default listing is unchanged"""
+        books = get_all_books()
+
+        assert [book['title'] for book in books] == ["Alpha Book", "Beta Book", "Gamma Book"]
+
+    def test_get_all_books_available_only(self):
+        """Test unavailable books are filtered out"""
+        books = get_all_books(available_only=True)
+
+        assert [book['title'] for book in books] == ["Alpha Book", "Gamma Book"]
+
+    def test_get_all_books_sort_by_availability(self):
+        """Test books with the most available copies come first"""
+        books = get_all_books(sort='availability')
+
+        assert [book['available_copies'] for book in books] == [4, 1, 0]
+
+    def test_get_all_books_limit_and_offset(self):
+        """Test paging through the available listing"""
+        books = get_all_books(available_only=True, limit=1, offset=1)
+
+        assert [book['title'] for book in books] == ["Gamma Book"]
+
+    def test_available_listing_uses_partial_index(self):
+        """Test the available listing is served from the partial index"""
+        conn = get_db_connection()
+        plan = conn.execute('''
+            EXPLAIN QUERY PLAN
+            SELECT * FROM books WHERE available_copies > 0 ORDER BY title LIMIT 50
+        ''').fetchall()
+        conn.close()
+
+        assert any('idx_books_available_title' in row['detail'] for row in plan)
+
+    def test_search_books_available_only(self):
+        """Test search results can be restricted to available books"""
+        books = search_books("Author One", "author", available_only=True)
+
+        assert [book['title'] for book in books] == ["Gamma Book"]
+
+    def test_catalog_route_available_filter(self):
+        """Test the catalog page only lists available books when asked"""
+        client = create_app().test_client()
+        response = client.get('/catalog?available=1')
+
+        assert response.status_code == 200
+        assert b"Alpha Book" in response.data
+        assert b"Beta Book" not in response.data
+
+    def test_catalog_route_available_filter_is_paged_by_default(self):
+        """Test the available listing returns one page when no page is given"""
+        for i in range(60):
+            insert_book(f"Zeta Book {i:02d}", "Author Three", f"{2000000000000 + i}", 1, 1)
+        client = create_app().test_client()
+
+        response = client.get('/catalog?available=1')
+
+        assert response.status_code == 200
+        assert b"Zeta Book 47" in response.data
+        assert b"Zeta Book 48" not in response.data
+        assert b"page=2" in response.data
+
+    def test_catalog_route_empty_states(self):
+        """Test the empty catalog text is only shown when there are no books at all"""
+        client = create_app().test_client()
+
+        past_the_end = client.get('/catalog?page=5').data
+        assert b"No more books on this page" in past_the_end
+        assert b"The library catalog is empty" not in past_the_end
+
+        conn = get_db_connection()
+        conn.execute('UPDATE books SET available_copies = 0')
+        conn.commit()
+        conn.close()
+        no_match = client.get('/catalog?available=1').data
+        assert b"No books match this filter" in no_match
+        assert b"The library catalog is empty" not in no_match
+
+        conn = get_db_connection()
+        conn.execute('DELETE FROM books')
+        conn.commit()
+        conn.close()
+        assert b"The library catalog is empty" in client.get('/catalog?available=1').data
+
+    def test_api_search_available_filter_and_sort(self):
+        """Test the search API honours the availability filter and sort"""
+        client = create_app().test_client()
+        response = client.get('/api/search?q=Book&available=1&sort=availability')
+        data = response.get_json()
+
+        assert response.status_code == 200
+        assert data['available_only'] is True
+        assert [book['title'] for book in data['results']] == ["Gamma Book", "Alpha Book"]
@@ -0,0 +1,91 @@
+import pytest
+from unittest.mock import patch
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from services.library_service import calculate_late_fees_for_pairs, calculate_late_fee_for_book
+from database import init_database, get_db_connection, insert_book, insert_borrow_record
+
+class TestBatchLateFees:
+    """Test cases for batch late fee calculation"""
+
+    def setup_method(self):
+        """Setup test database before each test"""
+        init_database()
+        # Clear existing data and reset auto-increment
+        conn = get_db_connection()
+        conn.execute('DELETE FROM borrow_records')
+        conn.execute('DELETE FROM books')
+        conn.execute('DELETE FROM sqlite_sequence WHERE name="books"')
+        conn.execute('DELETE FROM sqlite_sequence WHERE name="borrow_records"')
+        conn.commit()
+        conn.close()
+
+        insert_book("Book One", "Test Author", "1234567890123", 3, 3)
+        insert_book("Book Two", "Test Author", "1234567890124", 3, 3)
+        now = datetime.now()
+        insert_borrow_record("123456", 1, now - timedelta(days=24), now - timedelta(days=10))
+        insert_borrow_record("123456", 2, now, now + timedelta(days=14))
+
+    def test_results_match_single_calculation(self):
+        """Test each batch result matches calculate_late_fee_for_book"""
+        items = [
+            {'patron_id': "123456", 'book_id': 1},
+            {'patron_id': "123456", 'book_id': 2},
+            {'patron_id': "654321", 'book_id': 1},
+        ]
+
+        results = calculate_late_fees_for_pairs(items)
+
+        for item, result in zip(items, results):
+            expected = calculate_late_fee_for_book(item['patron_id'], item['book_id'])
+            assert result == dict(expected, **item)
+
+    def test_records_resolved_in_one_query(self):
+        """Test the batch does not fall back to per-item lookups"""
+        items = [{'patron_id': "123456", 'book_id': book_id} for book_id in (1, 2)]
+
+        with patch('services.library_service.get_borrow_record') as mock_get_record:
+            results = calculate_late_fees_for_pairs(items)
+
+        mock_get_record.assert_not_called()
+        assert [result['fee_amount'] for result in results] == [6.50, 0.00]
+
+    def test_invalid_items_get_per_item_errors(self):
+        """Test bad items are reported without failing the batch"""
+        results = calculate_late_fees_for_pairs([
+            {'patron_id': "12345", 'book_id': 1},
+            {'patron_id': "123456", 'book_id': "1"},
+            "not an item",
+            {'patron_id': "123456", 'book_id': 1},
+        ])
+
+        assert [result['status'] for result in results] == ['error', 'error', 'error', 'success']
+        assert "invalid patron id" in results[0]['message'].lower()
+        assert "invalid book id" in results[1]['message'].lower()
+
+    def test_batch_endpoint(self):
+        """Test POST /api/late_fees returns per-item results in order"""
+        client = create_app().test_client()
+        response = client.post('/api/late_fees', json={'items': [
+            {'patron_id': "123456", 'book_id': 1},
+            {'patron_id': "123456", 'book_id': 3},
+        ]})
+        data = response.get_json()
+
+        assert response.status_code == 200
+        assert data['count'] == 2
+        assert data['results'][0]['days_overdue'] == 10
+        assert data['results'][1]['status'] == 'error'
+
+    def test_batch_endpoint_rejects_bad_body(self):
+        """Test the endpoint requires a bounded, non-empty items list"""
+        client = create_app().test_client()
+
+        assert client.post('/api/late_fees', json={}).status_code == 400
+        assert client.post('/api/late_fees', json={'items': [{}] * 201}).status_code == 400
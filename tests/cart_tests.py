@@ -0,0 +1,129 @@
+import pytest
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from services.library_service import borrow_book_by_patron, borrow_cart_by_patron, return_cart_by_patron
+from database import (
+    init_database, get_db_connection, insert_book, insert_borrow_record,
+    get_book_by_id, get_patron_borrow_count
+)
+
+class TestCartCheckout:
+    """Test cases for self-checkout cart borrowing and returning"""
+
+    def setup_method(self):
+        """Setup test database before each test"""
+        init_database()
+        # Clear existing data and reset auto-increment
+        conn = get_db_connection()
+        conn.execute('DELETE FROM borrow_records')
+        conn.execute('DELETE FROM books')
+        conn.execute('DELETE FROM sqlite_sequence WHERE name="books"')
+        conn.execute('DELETE FROM sqlite_sequence WHERE name="borrow_records"')
+        conn.commit()
+        conn.close()
+
+        for i in range(1, 8):
+            insert_book(f"Book {i}", "Test Author", f"{1234567890100 + i}", 2, 2)
+        insert_book("Unavailable Book", "Test Author", "1234567890199", 1, 0)
+
+    def test_borrow_cart_borrows_every_book(self):
+        """Test a valid cart creates one loan per book and decrements availability"""
+        result = borrow_cart_by_patron("123456", [1, 2, 3])
+
+        assert result['status'] == 'success'
+        assert result['processed'] == 3
+        assert [item['book_id'] for item in result['results']] == [1, 2, 3]
+        assert all(item['success'] for item in result['results'])
+        assert get_patron_borrow_count("123456") == 3
+        assert get_book_by_id(2)['available_copies'] == 1
+
+    def test_borrow_cart_reports_per_item_failures(self):
+        """Test missing, unavailable and duplicate books fail without blocking the rest"""
+        result = borrow_cart_by_patron("123456", [1, 99, 8, 1, "2"])
+
+        successes = [item['success'] for item in result['results']]
+        assert successes == [True, False, False, False, False]
+        assert "not found" in result['results'][1]['message'].lower()
+        assert "not available" in result['results'][2]['message'].lower()
+        assert "already in this cart" in result['results'][3]['message'].lower()
+        assert "invalid book id" in result['results'][4]['message'].lower()
+        assert get_patron_borrow_count("123456") == 1
+
+    def test_borrow_cart_limit_applies_to_whole_cart(self):
+        """Test a cart that would take the patron past 5 loans borrows nothing"""
+        now = datetime.now()
+        for book_id in (1, 2, 3):
+            insert_borrow_record("123456", book_id, now, now + timedelta(days=14))
+
+        result = borrow_cart_by_patron("123456", [4, 5, 6])
+
+        assert result['status'] == 'error'
+        assert all("maximum borrowing limit" in item['message'] for item in result['results'])
+        assert get_patron_borrow_count("123456") == 3
+        assert get_book_by_id(4)['available_copies'] == 2
+
+    def test_borrow_cart_up_to_limit_succeeds(self):
+        """Test a cart that brings the patron to exactly 5 loans is allowed"""
+        result = borrow_cart_by_patron("123456", [1, 2, 3, 4, 5])
+
+        assert result['processed'] == 5
+
+    def test_single_borrow_shares_cart_limit(self):
+        """Test a single borrow is refused once the patron holds the cart limit of 5 books"""
+        borrow_cart_by_patron("123456", [1, 2, 3, 4, 5])
+
+        success, message = borrow_book_by_patron("123456", 6)
+
+        assert success is False
+        assert "maximum borrowing limit of 5 books" in message
+        assert get_patron_borrow_count("123456") == 5
+
+    def test_borrow_cart_invalid_patron(self):
+        """Test the patron is validated once for the whole cart"""
+        result = borrow_cart_by_patron("12345", [1, 2])
+
+        assert result['status'] == 'error'
+        assert "invalid patron id" in result['message'].lower()
+        assert result['results'] == []
+
+    def test_return_cart_reports_late_fees(self):
+        """Test returning a cart closes each loan and reports its late fee"""
+        now = datetime.now()
+        insert_borrow_record("123456", 1, now - timedelta(days=24), now - timedelta(days=10))
+        insert_borrow_record("123456", 2, now, now + timedelta(days=14))
+
+        result = return_cart_by_patron("123456", [1, 2, 3])
+
+        assert result['processed'] == 2
+        assert "$6.50" in result['results'][0]['message']
+        assert "no late fees" in result['results'][1]['message'].lower()
+        assert "no active borrow record" in result['results'][2]['message'].lower()
+        assert get_patron_borrow_count("123456") == 0
+        assert get_book_by_id(1)['available_copies'] == 3
+
+    def test_cart_endpoints(self):
+        """Test the cart API borrows and returns through JSON"""
+        client = create_app().test_client()
+
+        borrowed = client.post('/api/cart/borrow', json={'patron_id': "123456", 'book_ids': [1, 2]})
+        returned = client.post('/api/cart/return', json={'patron_id': "123456", 'book_ids': [1, 2]})
+
+        assert borrowed.status_code == 200
+        assert borrowed.get_json()['processed'] == 2
+        assert returned.status_code == 200
+        assert returned.get_json()['processed'] == 2
+
+    def test_cart_endpoint_rejects_bad_body(self):
+        """Test the cart API requires a bounded, non-empty book_ids list"""
+        client = create_app().test_client()
+
+        assert client.post('/api/cart/borrow', json={'patron_id': "123456"}).status_code == 400
+        assert client.post('/api/cart/borrow',
+                           json={'patron_id': "123456", 'book_ids': list(range(21))}).status_code == 400
+        assert client.post('/api/cart/return', json={'patron_id': "12", 'book_ids': [1]}).status_code == 400
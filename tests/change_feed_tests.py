@@ -0,0 +1,131 @@
+import pytest
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from app import create_app
+from services.library_service import borrow_book_by_patron, return_book_by_patron, get_change_feed
+from database import (
+    init_database, get_db_connection, insert_book, update_book_availability,
+    archive_returned_loans, get_change_events, to_epoch
+)
+
+@pytest.mark.usefixtures('isolated_database')
+class TestChangeFeed:
+    """Test cases for the change event log and /api/changes"""
+
+    def event_types(self, after_id=0):
+        return [event['event_type'] for event in get_change_events(after_id, 1000)]
+
+    def test_mutations_are_logged_in_order(self):
+        """Test adding, borrowing and returning a book each log their events"""
+        insert_book("Test Book", "Test Author", "1234567890123", 2, 2)
+        borrow_book_by_patron("123456", 1)
+        return_book_by_patron("123456", 1)
+
+        events = get_change_events(0, 1000)
+
+        assert [event['event_type'] for event in events] == [
+            'book_added', 'borrowed', 'availability_changed', 'availability_changed', 'returned'
+        ]
+        assert events[0]['data']['isbn'] == "1234567890123"
+        assert events[1]['patron_id'] == "123456"
+        assert events[2]['data'] == {'old_available_copies': 2, 'available_copies': 1}
+
+    def test_rolled_back_changes_are_not_logged(self):
+        """Test events share their change's transaction"""
+        conn = get_db_connection()
+        conn.execute('''
+            INSERT INTO books (title, author, isbn, total_copies, available_copies)
+            VALUES ('Test Book', 'Test Author', '1234567890123', 1, 1)
+        ''')
+        conn.rollback()
+        conn.close()
+
+        assert self.event_types() == []
+
+    def test_refused_and_archival_writes_are_not_logged(self):
+        """Test a refused decrement and archiving a returned loan log nothing"""
+        insert_book("Test Book", "Test Author", "1234567890123", 1, 0)
+        assert update_book_availability(1, -1) is False
+
+        conn = get_db_connection()
+        long_ago = datetime.now() - timedelta(days=500)
+        conn.execute('''
+            INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date, return_date,
+                                        borrow_ts, due_ts, return_ts)
+            VALUES ('123456', 1, ?, ?, ?, 0, 0, ?)
+        ''', (long_ago.isoformat(), long_ago.isoformat(), long_ago.isoformat(), to_epoch(long_ago)))
+        conn.commit()
+        conn.close()
+        assert archive_returned_loans(to_epoch(datetime.now())) == 1
+
+        assert self.event_types() == ['book_added', 'borrowed']
+
+    def test_cancelled_borrow_is_logged(self):
+        """Test undoing a borrow record logs borrow_cancelled"""
+        insert_book("Test Book", "Test Author", "1234567890123", 1, 1)
+        database.insert_borrow_record("123456", 1, datetime.now(), datetime.now() + timedelta(days=14))
+        database.cancel_borrow_record("123456", 1)
+
+        assert self.event_types() == ['book_added', 'borrowed', 'borrow_cancelled']
+
+    def test_feed_cursor_reads_incrementally(self):
+        """Test following next_cursor reads every event once, then waits for new ones"""
+        for i in range(5):
+            insert_book(f"Book {i}", "Test Author", f"{1234567890120 + i}", 1, 1)
+
+        first = get_change_feed(limit=3)
+        second = get_change_feed(first['next_cursor'], limit=3)
+        idle = get_change_feed(second['next_cursor'], limit=3)
+        insert_book("Book 5", "Test Author", "1234567890130", 1, 1)
+        resumed = get_change_feed(idle['next_cursor'], limit=3)
+
+        assert (first['count'], first['has_more']) == (3, True)
+        assert (second['count'], second['has_more']) == (2, False)
+        assert idle['count'] == 0
+        assert idle['next_cursor'] == second['next_cursor']
+        assert resumed['changes'][0]['data']['title'] == "Book 5"
+
+    def test_invalid_feed_parameters(self):
+        """Test malformed cursors and limits are rejected"""
+        assert get_change_feed("abc")['status'] == 'error'
+        assert get_change_feed("-1")['status'] == 'error'
+        assert get_change_feed(limit=0)['status'] == 'error'
+
+    def test_sharded_loan_events_are_merged_into_feed(self, monkeypatch):
+        """Test loan events logged on the shards are paged with the catalog's events"""
+        monkeypatch.setattr(database, 'BORROW_SHARDS', 2)
+        init_database()
+        insert_book("Test Book", "Test Author", "1234567890123", 5, 5)
+        for patron_id in ("100000", "100001", "100002"):
+            borrow_book_by_patron(patron_id, 1)
+
+        first = get_change_feed(limit=4)
+        rest = get_change_feed(first['next_cursor'], limit=100)
+        changes = first['changes'] + rest['changes']
+
+        assert len(first['next_cursor'].split('.')) == 3
+        assert sorted(change['patron_id'] for change in changes if change['event_type'] == 'borrowed') == [
+            "100000", "100001", "100002"
+        ]
+        assert [change['event_type'] for change in changes].count('availability_changed') == 3
+        assert len({change['id'] for change in changes}) == len(changes) == 7
+        assert get_change_feed("5")['status'] == 'error'
+
+    def test_changes_endpoint(self):
+        """Test /api/changes pages through the log"""
+        insert_book("Test Book", "Test Author", "1234567890123", 1, 1)
+        client = create_app().test_client()
+
+        response = client.get('/api/changes?limit=10')
+        data = response.get_json()
+
+        assert response.status_code == 200
+        assert data['changes'][0]['event_type'] == 'book_added'
+        assert client.get('/api/changes', query_string={'cursor': data['next_cursor']}).get_json()['count'] == 0
+        assert client.get('/api/changes?cursor=x').status_code == 400
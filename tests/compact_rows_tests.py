@@ -0,0 +1,72 @@
+import pytest
+import json
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from database import (
+    init_database, get_db_connection, insert_book, insert_borrow_record,
+    get_all_books, search_books, get_patron_borrowed_books, BookRecord, LoanRecord
+)
+
+class TestCompactRows:
+    """Test cases for compact BookRecord / LoanRecord listings"""
+
+    def setup_method(self):
+        """Setup test database before each test"""
+        init_database()
+        # Clear existing data and reset auto-increment
+        conn = get_db_connection()
+        conn.execute('DELETE FROM borrow_records')
+        conn.execute('DELETE FROM books')
+        conn.execute('DELETE FROM sqlite_sequence WHERE name="books"')
+        conn.execute('DELETE FROM sqlite_sequence WHERE name="borrow_records"')
+        conn.commit()
+        conn.close()
+
+        insert_book("Test Book", "Test Author", "1234567890123", 3, 2)
+        insert_book("Other Book", "Other Author", "1234567890124", 1, 1)
+
+    def test_compact_listing_matches_dict_listing(self):
+        """Test compact records convert back to the regular dict rows"""
+        books = get_all_books(compact=True)
+
+        assert all(isinstance(book, BookRecord) for book in books)
+        assert [book.as_dict() for book in books] == get_all_books()
+
+    def test_compact_record_supports_key_and_attribute_access(self):
+        """Test records work with code written for dicts and for attributes"""
+        book = search_books("Test", "title", compact=True)[0]
+
+        assert book['title'] == book.title == "Test Book"
+        assert book[0] == book.id
+        assert not hasattr(book, '__dict__')
+
+    def test_compact_record_as_dict_is_json_serializable(self):
+        """Test the dict adapter produces JSON-ready rows"""
+        book = get_all_books(compact=True)[0]
+
+        assert json.loads(json.dumps(book.as_dict()))['isbn'] == book.isbn
+
+    def test_compact_loans_match_dict_loans(self):
+        """Test compact loans keep ISO dates and adapt to the dict shape"""
+        insert_borrow_record("123456", 1, datetime.now() - timedelta(days=20), datetime.now() - timedelta(days=6))
+        insert_borrow_record("123456", 2, datetime.now(), datetime.now() + timedelta(days=14))
+
+        loans = get_patron_borrowed_books("123456", compact=True)
+
+        assert all(isinstance(loan, LoanRecord) for loan in loans)
+        assert isinstance(loans[0].due_date, str)
+        assert [loan.is_overdue for loan in loans] == [True, False]
+        assert [loan.as_dict() for loan in loans] == get_patron_borrowed_books("123456")
+
+    def test_catalog_renders_compact_rows(self):
+        """Test the catalog page renders from compact records"""
+        response = create_app().test_client().get('/catalog')
+
+        assert b"Test Book" in response.data
+        assert b"2/3 Available" in response.data
@@ -0,0 +1,90 @@
+import pytest
+import gzip
+import json
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Response
+from app import create_app
+from routes.compression import compress_stream
+from database import init_database, get_db_connection, insert_book
+
+class TestResponseCompression:
+    """Test cases for negotiated response compression"""
+
+    def setup_method(self):
+        """Setup test database and client before each test"""
+        init_database()
+        # Clear existing data and reset auto-increment
+        conn = get_db_connection()
+        conn.execute('DELETE FROM borrow_records')
+        conn.execute('DELETE FROM books')
+        conn.execute('DELETE FROM sqlite_sequence WHERE name="books"')
+        conn.execute('DELETE FROM sqlite_sequence WHERE name="borrow_records"')
+        conn.commit()
+        conn.close()
+
+        for i in range(50):
+            insert_book(f"Test Book {i}", "Test Author", f"{1000000000000 + i}", 2, 2)
+        self.app = create_app()
+        self.client = self.app.test_client()
+
+    def test_large_json_is_gzipped(self):
+        """Test a large search response is gzip encoded and decodes intact"""
+        response = self.client.get('/api/search?q=Test', headers={'Accept-Encoding': 'gzip'})
+
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        data = json.loads(gzip.decompress(response.data))
+        assert data['count'] == 50
+
+    def test_compressed_response_has_weak_etag(self):
+        """Test the ETag of an encoded body is marked weak and still validates"""
+        response = self.client.get('/api/search?q=Test', headers={'Accept-Encoding': 'gzip'})
+        etag = response.headers['ETag']
+
+        assert etag.startswith('W/')
+        revalidated = self.client.get('/api/search?q=Test',
+                                      headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        assert revalidated.status_code == 304
+
+    def test_no_accept_encoding_is_not_compressed(self):
+        """Test clients that do not ask for compression get identity"""
+        response = self.client.get('/api/search?q=Test')
+
+        assert 'Content-Encoding' not in response.headers
+
+    def test_small_payload_is_not_compressed(self):
+        """Test responses under COMPRESS_MIN_SIZE skip compression"""
+        response = self.client.get('/api/search?q=Test Book 7', headers={'Accept-Encoding': 'gzip'})
+
+        assert len(response.data) < self.app.config['COMPRESS_MIN_SIZE']
+        assert 'Content-Encoding' not in response.headers
+
+    def test_compression_can_be_disabled(self):
+        """Test COMPRESS_ENABLED=False turns the hook off"""
+        client = create_app({'COMPRESS_ENABLED': False}).test_client()
+        response = client.get('/api/search?q=Test', headers={'Accept-Encoding': 'gzip'})
+
+        assert 'Content-Encoding' not in response.headers
+
+    def test_streamed_response_is_compressed_incrementally(self):
+        """Test streamed responses are encoded chunk by chunk"""
+        @self.app.route('/stream-test')
+        def stream_test():
+            return Response((f"line {i}\n" * 100 for i in range(5)), mimetype='text/plain')
+
+        response = self.client.get('/stream-test', headers={'Accept-Encoding': 'gzip'})
+
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert gzip.decompress(response.data).decode().count("line 4") == 100
+
+    def test_compress_stream_yields_per_chunk(self):
+        """Test each input chunk produces output before the stream ends"""
+        chunks = list(compress_stream(iter([b"a" * 100, b"b" * 100]), 'gzip', 6))
+
+        assert len(chunks) == 3
+        assert gzip.decompress(b"".join(chunks)) == b"a" * 100 + b"b" * 100
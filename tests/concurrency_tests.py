@@ -0,0 +1,95 @@
+import pytest
+import threading
+import time
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from services.library_service import borrow_book_by_patron
+from database import get_db_connection, insert_book, get_book_by_id, update_book_availability
+
+class TestConcurrentBorrowing:
+    """Stress tests for concurrent borrows of scarce copies"""
+
+    @pytest.fixture(autouse=True)
+    def keep_monkeypatch(self, isolated_database, monkeypatch):
+        """Let tests shorten the database timeouts"""
+        self.monkeypatch = monkeypatch
+
+    def open_loans(self, book_id):
+        conn = get_db_connection()
+        count = conn.execute('''
+            SELECT COUNT(*) FROM borrow_records WHERE book_id = ? AND return_date IS NULL
+        ''', (book_id,)).fetchone()[0]
+        conn.close()
+        return count
+
+    def race(self, book_id, patrons):
+        """Borrow the book once per patron, all threads starting together."""
+        barrier = threading.Barrier(len(patrons))
+
+        def borrow(patron_id):
+            barrier.wait()
+            return borrow_book_by_patron(patron_id, book_id)
+
+        with ThreadPoolExecutor(max_workers=len(patrons)) as executor:
+            return list(executor.map(borrow, patrons))
+
+    def test_no_oversell_under_contention(self):
+        """Test 40 simultaneous borrows of 5 copies lend exactly 5"""
+        insert_book("Scarce Book", "Test Author", "1234567890123", 5, 5)
+
+        results = self.race(1, [f"{200000 + i}" for i in range(40)])
+
+        successes = [message for success, message in results if success]
+        failures = [message for success, message in results if not success]
+        assert len(successes) == 5
+        assert all("not available" in message.lower() for message in failures)
+        assert get_book_by_id(1)['available_copies'] == 0
+        assert self.open_loans(1) == 5
+
+    def test_last_copy_goes_to_exactly_one_patron(self):
+        """Test repeated races for a single copy never lend it twice"""
+        for round_number in range(10):
+            insert_book(f"Last Copy {round_number}", "Test Author", f"{1234567890200 + round_number}", 1, 1)
+            book_id = round_number + 1
+
+            results = self.race(book_id, [f"{300000 + round_number * 10 + i}" for i in range(8)])
+
+            assert sum(success for success, _ in results) == 1
+            assert get_book_by_id(book_id)['available_copies'] == 0
+            assert self.open_loans(book_id) == 1
+
+    def test_decrement_never_goes_negative(self):
+        """Test the conditional update refuses to take availability below zero"""
+        insert_book("Test Book", "Test Author", "1234567890123", 1, 1)
+
+        assert update_book_availability(1, -1) is True
+        assert update_book_availability(1, -1) is False
+        assert get_book_by_id(1)['available_copies'] == 0
+
+    def test_locked_database_is_retried(self):
+        """Test an update that finds the database locked retries instead of failing"""
+        insert_book("Test Book", "Test Author", "1234567890123", 2, 2)
+        self.monkeypatch.setattr(database, 'DATABASE_TIMEOUT', 0.01)
+        locked = threading.Event()
+
+        def hold_write_lock():
+            conn = get_db_connection()
+            conn.execute('BEGIN IMMEDIATE')
+            locked.set()
+            time.sleep(0.05)
+            conn.commit()
+            conn.close()
+
+        holder = threading.Thread(target=hold_write_lock)
+        holder.start()
+        locked.wait()
+
+        assert update_book_availability(1, -1) is True
+        holder.join()
+        assert get_book_by_id(1)['available_copies'] == 1
@@ -0,0 +1,81 @@
+import pytest
+from unittest.mock import patch
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from database import init_database, get_db_connection, insert_book, get_catalog_version
+
+class TestConditionalResponses:
+    """Test cases for ETag / Last-Modified handling on catalog reads"""
+
+    def setup_method(self):
+        """Setup test database and client before each test"""
+        init_database()
+        # Clear existing data and reset auto-increment
+        conn = get_db_connection()
+        conn.execute('DELETE FROM borrow_records')
+        conn.execute('DELETE FROM books')
+        conn.execute('DELETE FROM sqlite_sequence WHERE name="books"')
+        conn.execute('DELETE FROM sqlite_sequence WHERE name="borrow_records"')
+        conn.commit()
+        conn.close()
+
+        insert_book("Test Book", "Test Author", "1234567890123", 3, 3)
+        self.client = create_app().test_client()
+
+    def test_books_write_bumps_catalog_version(self):
+        """Test every books write increases the catalog version"""
+        version, _ = get_catalog_version()
+        insert_book("Another Book", "Test Author", "1234567890124", 1, 1)
+
+        assert get_catalog_version()[0] > version
+
+    def test_catalog_sends_validators(self):
+        """Test the catalog page carries ETag and Last-Modified headers"""
+        response = self.client.get('/catalog')
+
+        assert response.status_code == 200
+        assert response.headers.get('ETag')
+        assert response.headers.get('Last-Modified')
+
+    def test_catalog_if_none_match_returns_304_without_querying(self):
+        """Test a matching ETag short-circuits before the books query"""
+        etag = self.client.get('/catalog').headers['ETag']
+
+        with patch('routes.catalog_routes.get_all_books') as mock_get_all_books:
+            response = self.client.get('/catalog', headers={'If-None-Match': etag})
+
+        assert response.status_code == 304
+        assert response.data == b''
+        mock_get_all_books.assert_not_called()
+
+    def test_catalog_change_invalidates_etag(self):
+        """Test a books write makes the old ETag stale"""
+        etag = self.client.get('/catalog').headers['ETag']
+        insert_book("Another Book", "Test Author", "1234567890124", 1, 1)
+
+        response = self.client.get('/catalog', headers={'If-None-Match': etag})
+
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+
+    def test_api_search_if_none_match_returns_304(self):
+        """Test the search API honours If-None-Match"""
+        etag = self.client.get('/api/search?q=Test').headers['ETag']
+
+        with patch('routes.api_routes.search_books_in_catalog') as mock_search:
+            response = self.client.get('/api/search?q=Test', headers={'If-None-Match': etag})
+
+        assert response.status_code == 304
+        mock_search.assert_not_called()
+
+    def test_api_search_error_has_no_validators(self):
+        """Test error responses are not cacheable"""
+        response = self.client.get('/api/search?q=')
+
+        assert response.status_code == 400
+        assert 'ETag' not in response.headers
@@ -0,0 +1,23 @@
+import pytest
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from database import init_database
+
+
+@pytest.fixture
+def database_file(tmp_path, monkeypatch):
+    """Point the database module at an empty database file of this test's own"""
+    monkeypatch.setattr(database, 'DATABASE', str(tmp_path / 'library.db'))
+    return database.DATABASE
+
+
+@pytest.fixture
+def isolated_database(database_file):
+    """Run the test against its own database file, migrated to the current schema"""
+    init_database()
+    return database_file
@@ -0,0 +1,180 @@
+import pytest
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import manage
+from app import create_app
+from services.analytics import get_daily_rollup_report
+from services.library_service import (
+    borrow_book_by_patron, return_book_by_patron, roll_up_circulation,
+    rebuild_circulation, check_circulation
+)
+from database import (
+    get_db_connection, insert_book, insert_borrow_record, cancel_borrow_record,
+    update_borrow_record_return_date, archive_returned_loans, to_epoch
+)
+
+class TestDailyRollups:
+    """Test cases for the daily circulation rollups"""
+
+    @pytest.fixture(autouse=True)
+    def books(self, isolated_database):
+        """Seed two books"""
+        insert_book("Book One", "Test Author", "1234567890121", 5, 5)
+        insert_book("Book Two", "Test Author", "1234567890122", 5, 5)
+        self.now = datetime.now()
+        self.today = self.now.strftime('%Y-%m-%d')
+
+    def loan(self, patron_id, book_id, borrowed_days_ago, returned_days_ago=None):
+        borrow_date = self.now - timedelta(days=borrowed_days_ago)
+        insert_borrow_record(patron_id, book_id, borrow_date, borrow_date + timedelta(days=14))
+        if returned_days_ago is not None:
+            update_borrow_record_return_date(patron_id, book_id, self.now - timedelta(days=returned_days_ago))
+
+    def totals(self, start=None, book_id=None):
+        days = get_daily_rollup_report(start, None, book_id)['days']
+        return {column: sum(day[column] for day in days) for column in ('loans', 'returns', 'overdue', 'fees_accrued')}
+
+    def test_borrow_and_return_update_counts(self):
+        """Test the borrow and return paths count loans and returns on today's row"""
+        borrow_book_by_patron("123456", 1)
+        borrow_book_by_patron("123456", 2)
+        return_book_by_patron("123456", 1)
+
+        today = get_daily_rollup_report(self.today, self.today)['days']
+        book_one = get_daily_rollup_report(self.today, self.today, book_id=1)['days']
+
+        assert (today[0]['loans'], today[0]['returns']) == (2, 1)
+        assert (book_one[0]['loans'], book_one[0]['returns']) == (1, 1)
+
+    def test_cancelled_borrow_is_uncounted_and_archival_keeps_history(self):
+        """Test cancelling an open loan removes it, archiving a returned one does not"""
+        self.loan("123456", 1, 20, returned_days_ago=10)
+        self.loan("654321", 2, 0)
+        cancel_borrow_record("654321", 2)
+        archive_returned_loans(to_epoch(self.now))
+
+        assert self.totals()['loans'] == 1
+        assert self.totals()['returns'] == 1
+
+    def test_overdue_and_fee_accruals(self):
+        """Test each overdue day is counted and the day accruals add up to the late fee"""
+        self.loan("123456", 1, 17, returned_days_ago=None)
+        self.loan("654321", 2, 40, returned_days_ago=16)
+
+        roll_up_circulation(self.now)
+        open_loan, returned_loan = self.totals(book_id=1), self.totals(book_id=2)
+
+        # Open loan: 3 days overdue ($1.50), overdue at the end of the due day and each day since
+        assert open_loan['fees_accrued'] == 1.50
+        assert open_loan['overdue'] == 4
+        # Returned 10 days late: 7 days at $0.50 + 3 at $1.00
+        assert returned_loan['fees_accrued'] == 6.50
+        assert returned_loan['overdue'] == 10
+
+    def test_incremental_runs_match_a_rebuild(self):
+        """Test daily job runs give the same rollups as recomputing from scratch"""
+        self.loan("123456", 1, 20)
+        self.loan("654321", 2, 18, returned_days_ago=1)
+
+        for days_ago in (3, 2, 1, 0):
+            roll_up_circulation(self.now - timedelta(days=days_ago))
+        incremental = get_daily_rollup_report()['days']
+        rebuild_circulation(self.now)
+
+        assert check_circulation()['consistent'] is True
+        assert get_daily_rollup_report()['days'] == incremental
+
+    def test_checker_finds_and_rebuild_fixes_drift(self):
+        """Test a tampered rollup is reported and repaired"""
+        self.loan("123456", 1, 20)
+        roll_up_circulation(self.now)
+        assert check_circulation() == {'status': 'success', 'consistent': True, 'mismatches': []}
+
+        conn = get_db_connection()
+        conn.execute('UPDATE daily_circulation SET loans = loans + 5')
+        conn.commit()
+        conn.close()
+        result = check_circulation()
+
+        assert result['consistent'] is False
+        assert result['mismatches'][0]['column'] == 'loans'
+        assert result['mismatches'][0]['expected'] == 1
+
+        rebuild_circulation(self.now)
+        assert check_circulation()['consistent'] is True
+
+    def test_manage_rollups_commands(self, capsys):
+        """Test `manage.py rollups` updates, checks and rebuilds"""
+        self.loan("123456", 1, 20)
+
+        assert manage.main(['rollups', 'update']) == 0
+        assert manage.main(['rollups', 'check']) == 0
+        conn = get_db_connection()
+        conn.execute('DELETE FROM daily_circulation')
+        conn.commit()
+        conn.close()
+        assert manage.main(['rollups', 'check']) == 1
+        assert manage.main(['rollups', 'rebuild']) == 0
+        assert "consistent" in capsys.readouterr().out
+
+    def test_daily_stats_endpoint(self):
+        """Test /api/stats/daily serves a day range from the rollups"""
+        borrow_book_by_patron("123456", 1)
+        client = create_app().test_client()
+
+        response = client.get('/api/stats/daily', query_string={'start': self.today, 'end': self.today})
+
+        assert response.status_code == 200
+        assert response.get_json()['days'] == [
+            {'date': self.today, 'loans': 1, 'returns': 0, 'overdue': 0, 'fees_accrued': 0.0}
+        ]
+        assert len(client.get('/api/stats/daily').get_json()['days']) == 30
+        assert client.get('/api/stats/daily?start=yesterday').status_code == 400
+        assert client.get('/api/stats/daily?start=2020-01-01&end=2024-01-01').status_code == 400
+
+    def test_text_dated_loans_are_counted(self):
+        """Test loans written with only the TEXT dates (like add_sample_data) are counted"""
+        conn = get_db_connection()
+        conn.execute('''
+            INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date)
+            VALUES ('123456', 1, ?, ?)
+        ''', (self.now.isoformat(), (self.now + timedelta(days=14)).isoformat()))
+        conn.execute('''
+            UPDATE borrow_records SET return_date = ? WHERE patron_id = '123456'
+        ''', (self.now.isoformat(),))
+        conn.commit()
+        conn.close()
+
+        assert self.totals()['loans'] == 1
+        assert self.totals()['returns'] == 1
+        assert check_circulation()['consistent'] is True
+
+    def test_first_run_is_written_in_batches(self, monkeypatch):
+        """Test the first run commits one batch of days at a time and matches a rebuild"""
+        monkeypatch.setattr(database, 'ROLLUP_BATCH_DAYS', 7)
+        self.loan("123456", 1, 60)
+        self.loan("654321", 2, 45, returned_days_ago=5)
+        commits = []
+        connect = database.get_db_connection
+
+        def counting_connection(*args, **kwargs):
+            conn = connect(*args, **kwargs)
+            conn.set_trace_callback(lambda sql: commits.append(sql) if sql.strip() == 'COMMIT' else None)
+            return conn
+        monkeypatch.setattr(database, 'get_db_connection', counting_connection)
+
+        roll_up_circulation(self.now)
+        batched = get_daily_rollup_report()['days']
+        monkeypatch.setattr(database, 'get_db_connection', connect)
+        rebuild_circulation(self.now)
+
+        # Days from the first due date (46 days ago) through today, 7 per batch
+        assert len(commits) == 7
+        assert check_circulation()['consistent'] is True
+        assert get_daily_rollup_report()['days'] == batched
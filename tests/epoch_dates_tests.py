@@ -0,0 +1,112 @@
+import pytest
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from services.library_service import calculate_late_fee_for_book
+from database import (
+    init_database, get_db_connection, run_migrations, insert_book, insert_borrow_record,
+    update_borrow_record_return_date, get_borrow_record, to_epoch
+)
+
+class TestEpochDates:
+    """Test cases for the integer epoch timestamp columns on borrow_records"""
+
+    def setup_method(self):
+        """Setup test database before each test"""
+        init_database()
+        # Clear existing data and reset auto-increment
+        conn = get_db_connection()
+        conn.execute('DELETE FROM borrow_records')
+        conn.execute('DELETE FROM books')
+        conn.execute('DELETE FROM sqlite_sequence WHERE name="books"')
+        conn.execute('DELETE FROM sqlite_sequence WHERE name="borrow_records"')
+        conn.commit()
+        conn.close()
+
+        insert_book("Test Book", "Test Author", "1234567890123", 3, 3)
+
+    def test_to_epoch_matches_sqlite_strftime(self):
+        """Test Python and SQLite agree on the epoch of an ISO date"""
+        moment = datetime(2024, 3, 10, 14, 30, 15, 250000)
+        conn = get_db_connection()
+        sqlite_epoch = conn.execute("SELECT CAST(strftime('%s', ?) AS INTEGER)", (moment.isoformat(),)).fetchone()[0]
+        conn.close()
+
+        assert to_epoch(moment) == sqlite_epoch
+
+    def test_insert_and_return_populate_epoch_columns(self):
+        """Test the write helpers fill the *_ts columns alongside the ISO dates"""
+        borrow_date = datetime.now() - timedelta(days=3)
+        due_date = borrow_date + timedelta(days=14)
+        insert_borrow_record("123456", 1, borrow_date, due_date)
+
+        record = get_borrow_record("123456", 1)
+        assert record['borrow_ts'] == to_epoch(borrow_date)
+        assert record['due_ts'] == to_epoch(due_date)
+        assert record['return_ts'] is None
+
+        return_date = datetime.now()
+        update_borrow_record_return_date("123456", 1, return_date)
+        conn = get_db_connection()
+        return_ts = conn.execute('SELECT return_ts FROM borrow_records WHERE id = 1').fetchone()[0]
+        conn.close()
+        assert return_ts == to_epoch(return_date)
+
+    def test_triggers_fill_epoch_columns_for_raw_writes(self):
+        """Test rows written with only ISO dates still get epoch columns"""
+        conn = get_db_connection()
+        conn.execute('''
+            INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date)
+            VALUES ('123456', 1, '2024-01-01T10:00:00', '2024-01-15T10:00:00')
+        ''')
+        conn.execute("UPDATE borrow_records SET return_date = '2024-01-20T09:00:00' WHERE id = 1")
+        conn.commit()
+        row = conn.execute('SELECT borrow_ts, due_ts, return_ts FROM borrow_records WHERE id = 1').fetchone()
+        conn.close()
+
+        assert row['due_ts'] - row['borrow_ts'] == 14 * 86400
+        assert row['return_ts'] == to_epoch(datetime(2024, 1, 20, 9))
+
+    def test_migration_backfills_existing_rows(self, database_file, monkeypatch):
+        """Test upgrading a pre-epoch database backfills every row in batches"""
+        monkeypatch.setattr(database, 'MIGRATION_BATCH_SIZE', 3)
+        run_migrations(target=3)
+        conn = get_db_connection()
+        conn.executemany('''
+            INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date, return_date)
+            VALUES ('123456', 1, ?, ?, NULL)
+        ''', [(f'2024-02-{day:02d}T08:00:00', f'2024-02-{day + 14:02d}T08:00:00') for day in range(1, 11)])
+        conn.commit()
+        conn.close()
+
+        run_migrations()
+
+        conn = get_db_connection()
+        missing = conn.execute('SELECT COUNT(*) FROM borrow_records WHERE due_ts IS NULL').fetchone()[0]
+        conn.close()
+        assert missing == 0
+
+    def test_overdue_query_uses_open_due_index(self):
+        """Test overdue lookups are range scans on the partial due_ts index"""
+        conn = get_db_connection()
+        plan = conn.execute('''
+            EXPLAIN QUERY PLAN
+            SELECT id FROM borrow_records WHERE return_ts IS NULL AND due_ts < ?
+        ''', (to_epoch(datetime.now()),)).fetchall()
+        conn.close()
+
+        assert any('idx_borrow_records_open_due' in row['detail'] for row in plan)
+
+    def test_late_fee_uses_epoch_due_date(self):
+        """Test fee calculation agrees with the ISO-based result"""
+        insert_borrow_record("123456", 1, datetime.now() - timedelta(days=24), datetime.now() - timedelta(days=10))
+
+        result = calculate_late_fee_for_book("123456", 1)
+
+        assert result['days_overdue'] == 10
+        assert result['fee_amount'] == 6.50
@@ -239,8 +239,8 @@ class TestR3BookBorrowing:
             
             success, message = borrow_book_by_patron("123456", 1)
             
-            assert success == True  # Based on the code: current_borrowed > 5
-            # Note: The code has a bug - it should be >= 5, not > 5
+            assert success == False
+            assert "maximum borrowing limit" in message.lower()
 
     def test_tc4_2_patron_exceeds_maximum_limit(self):
         """TC4.2: Verify error when patron has more than 5 books."""
@@ -264,8 +264,7 @@ class TestR3BookBorrowing:
             
             success, message = borrow_book_by_patron("123456", 1)
             
-            # Current implementation allows 5, should reject at 5
-            # This test documents the current behavior
+            assert success == False
 
     def test_tc4_4_patron_with_one_book_borrowed(self):
         """TC4.4: Verify successful borrowing when patron has 1 book."""
@@ -44,7 +44,7 @@ class TestR4BookReturn:
                  'patron_id': '123456', 'book_id': 1, 
                  'due_date': due_date.isoformat(), 'return_date': None
              }), \
-             patch('services.library_service.update_book_availability', return_value=True), \
+             patch('services.library_service.return_book_copy', return_value=(True, None)), \
              patch('services.library_service.update_borrow_record_return_date', return_value=True), \
              patch('services.library_service.calculate_late_fee_for_book', return_value=0):
             
@@ -65,7 +65,7 @@ class TestR4BookReturn:
                  'patron_id': '123456', 'book_id': 1,
                  'due_date': due_date.isoformat(), 'return_date': None
              }), \
-             patch('services.library_service.update_book_availability', return_value=True), \
+             patch('services.library_service.return_book_copy', return_value=(True, None)), \
              patch('services.library_service.update_borrow_record_return_date', return_value=True), \
              patch('services.library_service.calculate_late_fee_for_book', return_value=0):
             
@@ -86,7 +86,7 @@ class TestR4BookReturn:
                  'patron_id': '999999', 'book_id': 1,
                  'due_date': due_date.isoformat(), 'return_date': None
              }), \
-             patch('services.library_service.update_book_availability', return_value=True), \
+             patch('services.library_service.return_book_copy', return_value=(True, None)), \
              patch('services.library_service.update_borrow_record_return_date', return_value=True), \
              patch('services.library_service.calculate_late_fee_for_book', return_value=0):
             
@@ -106,7 +106,7 @@ class TestR4BookReturn:
                  'patron_id': '123456', 'book_id': 1,
                  'due_date': due_date.isoformat(), 'return_date': None
              }), \
-             patch('services.library_service.update_book_availability', return_value=True), \
+             patch('services.library_service.return_book_copy', return_value=(True, None)), \
              patch('services.library_service.update_borrow_record_return_date', return_value=True), \
              patch('services.library_service.calculate_late_fee_for_book', return_value=0):
             
@@ -128,7 +128,7 @@ class TestR4BookReturn:
                  'patron_id': '123456', 'book_id': 1,
                  'due_date': due_date.isoformat(), 'return_date': None
              }), \
-             patch('services.library_service.update_book_availability', return_value=True), \
+             patch('services.library_service.return_book_copy', return_value=(True, None)), \
              patch('services.library_service.update_borrow_record_return_date', return_value=True), \
              patch('services.library_service.calculate_late_fee_for_book', return_value=0.50):
             
@@ -150,7 +150,7 @@ class TestR4BookReturn:
                  'patron_id': '123456', 'book_id': 1,
                  'due_date': due_date.isoformat(), 'return_date': None
              }), \
-             patch('services.library_service.update_book_availability', return_value=True), \
+             patch('services.library_service.return_book_copy', return_value=(True, None)), \
              patch('services.library_service.update_borrow_record_return_date', return_value=True), \
              patch('services.library_service.calculate_late_fee_for_book', return_value=3.50):
             
@@ -171,7 +171,7 @@ class TestR4BookReturn:
                  'patron_id': '123456', 'book_id': 1,
                  'due_date': due_date.isoformat(), 'return_date': None
              }), \
-             patch('services.library_service.update_book_availability', return_value=True), \
+             patch('services.library_service.return_book_copy', return_value=(True, None)), \
              patch('services.library_service.update_borrow_record_return_date', return_value=True), \
              patch('services.library_service.calculate_late_fee_for_book', return_value=4.50):
             
@@ -192,7 +192,7 @@ class TestR4BookReturn:
                  'patron_id': '123456', 'book_id': 1,
                  'due_date': due_date.isoformat(), 'return_date': None
              }), \
-             patch('services.library_service.update_book_availability', return_value=True), \
+             patch('services.library_service.return_book_copy', return_value=(True, None)), \
              patch('services.library_service.update_borrow_record_return_date', return_value=True), \
              patch('services.library_service.calculate_late_fee_for_book', return_value=11.50):
             
@@ -213,7 +213,7 @@ class TestR4BookReturn:
                  'patron_id': '123456', 'book_id': 1,
                  'due_date': due_date.isoformat(), 'return_date': None
              }), \
-             patch('services.library_service.update_book_availability', return_value=True), \
+             patch('services.library_service.return_book_copy', return_value=(True, None)), \
              patch('services.library_service.update_borrow_record_return_date', return_value=True), \
              patch('services.library_service.calculate_late_fee_for_book', return_value=15.00):
             
@@ -234,7 +234,7 @@ class TestR4BookReturn:
                  'patron_id': '123456', 'book_id': 1,
                  'due_date': due_date.isoformat(), 'return_date': None
              }), \
-             patch('services.library_service.update_book_availability', return_value=True), \
+             patch('services.library_service.return_book_copy', return_value=(True, None)), \
              patch('services.library_service.update_borrow_record_return_date', return_value=True), \
              patch('services.library_service.calculate_late_fee_for_book', return_value=15.00):
             
@@ -254,7 +254,7 @@ class TestR4BookReturn:
                  'patron_id': '123456', 'book_id': 1,
                  'due_date': due_date.isoformat(), 'return_date': None
              }), \
-             patch('services.library_service.update_book_availability', return_value=True), \
+             patch('services.library_service.return_book_copy', return_value=(True, None)), \
              patch('services.library_service.update_borrow_record_return_date', return_value=True), \
              patch('services.library_service.calculate_late_fee_for_book', return_value=15.00):
             
@@ -275,7 +275,7 @@ class TestR4BookReturn:
                  'patron_id': '123456', 'book_id': 1,
                  'due_date': due_date.isoformat(), 'return_date': None
              }), \
-             patch('services.library_service.update_book_availability', return_value=True), \
+             patch('services.library_service.return_book_copy', return_value=(True, None)), \
              patch('services.library_service.update_borrow_record_return_date', return_value=True), \
              patch('services.library_service.calculate_late_fee_for_book', return_value=1.50):
             
@@ -296,7 +296,7 @@ class TestR4BookReturn:
                  'patron_id': '123456', 'book_id': 1,
                  'due_date': due_date.isoformat(), 'return_date': None
              }), \
-             patch('services.library_service.update_book_availability', return_value=True), \
+             patch('services.library_service.return_book_copy', return_value=(True, None)), \
              patch('services.library_service.update_borrow_record_return_date', return_value=True), \
              patch('services.library_service.calculate_late_fee_for_book', return_value=6.50):
             
@@ -438,7 +438,7 @@ class TestR4BookReturn:
                  'patron_id': '123456', 'book_id': 1,
                  'due_date': due_date.isoformat(), 'return_date': None
              }), \
-             patch('services.library_service.update_book_availability', return_value=False):
+             patch('services.library_service.return_book_copy', return_value=(False, None)):
             
             success, message = return_book_by_patron("123456", 1)
             
@@ -457,7 +457,7 @@ class TestR4BookReturn:
                  'patron_id': '123456', 'book_id': 1,
                  'due_date': due_date.isoformat(), 'return_date': None
              }), \
-             patch('services.library_service.update_book_availability', return_value=True), \
+             patch('services.library_service.return_book_copy', return_value=(True, None)), \
              patch('services.library_service.update_borrow_record_return_date', return_value=False):
             
             success, message = return_book_by_patron("123456", 1)
@@ -479,7 +479,7 @@ class TestR4BookReturn:
                  'patron_id': '123456', 'book_id': 1,
                  'due_date': due_date.isoformat(), 'return_date': None
              }), \
-             patch('services.library_service.update_book_availability', return_value=True), \
+             patch('services.library_service.return_book_copy', return_value=(True, None)), \
              patch('services.library_service.update_borrow_record_return_date', return_value=True), \
              patch('services.library_service.calculate_late_fee_for_book', return_value=0):
             
@@ -499,7 +499,7 @@ class TestR4BookReturn:
                  'patron_id': '123456', 'book_id': 1,
                  'due_date': due_date.isoformat(), 'return_date': None
              }), \
-             patch('services.library_service.update_book_availability', return_value=True), \
+             patch('services.library_service.return_book_copy', return_value=(True, None)), \
              patch('services.library_service.update_borrow_record_return_date', return_value=True), \
              patch('services.library_service.calculate_late_fee_for_book', return_value=0):
             
@@ -519,7 +519,7 @@ class TestR4BookReturn:
                  'patron_id': '000123', 'book_id': 1,
                  'due_date': due_date.isoformat(), 'return_date': None
              }), \
-             patch('services.library_service.update_book_availability', return_value=True), \
+             patch('services.library_service.return_book_copy', return_value=(True, None)), \
              patch('services.library_service.update_borrow_record_return_date', return_value=True), \
              patch('services.library_service.calculate_late_fee_for_book', return_value=0):
             
@@ -539,7 +539,7 @@ class TestR4BookReturn:
                  'patron_id': '123456', 'book_id': 999999999,
                  'due_date': due_date.isoformat(), 'return_date': None
              }), \
-             patch('services.library_service.update_book_availability', return_value=True), \
+             patch('services.library_service.return_book_copy', return_value=(True, None)), \
              patch('services.library_service.update_borrow_record_return_date', return_value=True), \
              patch('services.library_service.calculate_late_fee_for_book', return_value=0):
             
@@ -561,7 +561,7 @@ class TestR4BookReturn:
                  'patron_id': '123456', 'book_id': 1,
                  'due_date': due_date.isoformat(), 'return_date': None
              }), \
-             patch('services.library_service.update_book_availability', return_value=True), \
+             patch('services.library_service.return_book_copy', return_value=(True, None)), \
              patch('services.library_service.update_borrow_record_return_date', return_value=True), \
              patch('services.library_service.calculate_late_fee_for_book', return_value=0.50):
             
@@ -584,7 +584,7 @@ class TestR4BookReturn:
                  'patron_id': '123456', 'book_id': 1,
                  'due_date': due_date.isoformat(), 'return_date': None
              }), \
-             patch('services.library_service.update_book_availability', return_value=True), \
+             patch('services.library_service.return_book_copy', return_value=(True, None)), \
              patch('services.library_service.update_borrow_record_return_date', return_value=True), \
              patch('services.library_service.calculate_late_fee_for_book', return_value=2.50):
             
@@ -605,7 +605,7 @@ class TestR4BookReturn:
                  'patron_id': '123456', 'book_id': 1,
                  'due_date': due_date_7.isoformat(), 'return_date': None
              }), \
-             patch('services.library_service.update_book_availability', return_value=True), \
+             patch('services.library_service.return_book_copy', return_value=(True, None)), \
              patch('services.library_service.update_borrow_record_return_date', return_value=True), \
              patch('services.library_service.calculate_late_fee_for_book', return_value=3.50):
             
@@ -623,7 +623,7 @@ class TestR4BookReturn:
                  'patron_id': '123456', 'book_id': 1,
                  'due_date': due_date_8.isoformat(), 'return_date': None
              }), \
-             patch('services.library_service.update_book_availability', return_value=True), \
+             patch('services.library_service.return_book_copy', return_value=(True, None)), \
              patch('services.library_service.update_borrow_record_return_date', return_value=True), \
              patch('services.library_service.calculate_late_fee_for_book', return_value=4.50):
             
@@ -645,7 +645,7 @@ class TestR4BookReturn:
                  'patron_id': '111111', 'book_id': 1,
                  'due_date': due_date.isoformat(), 'return_date': None
              }), \
-             patch('services.library_service.update_book_availability', return_value=True), \
+             patch('services.library_service.return_book_copy', return_value=(True, None)), \
              patch('services.library_service.update_borrow_record_return_date', return_value=True), \
              patch('services.library_service.calculate_late_fee_for_book', return_value=0):
             
@@ -660,7 +660,7 @@ class TestR4BookReturn:
                  'patron_id': '222222', 'book_id': 2,
                  'due_date': due_date.isoformat(), 'return_date': None
              }), \
-             patch('services.library_service.update_book_availability', return_value=True), \
+             patch('services.library_service.return_book_copy', return_value=(True, None)), \
              patch('services.library_service.update_borrow_record_return_date', return_value=True), \
              patch('services.library_service.calculate_late_fee_for_book', return_value=0):
             
@@ -679,7 +679,7 @@ class TestR4BookReturn:
                  'patron_id': '123456', 'book_id': 1,
                  'due_date': due_date.isoformat(), 'return_date': None
              }), \
-             patch('services.library_service.update_book_availability', return_value=True), \
+             patch('services.library_service.return_book_copy', return_value=(True, None)), \
              patch('services.library_service.update_borrow_record_return_date', return_value=True), \
              patch('services.library_service.calculate_late_fee_for_book', return_value=0):
             
@@ -694,7 +694,7 @@ class TestR4BookReturn:
                  'patron_id': '123456', 'book_id': 2,
                  'due_date': due_date.isoformat(), 'return_date': None
              }), \
-             patch('services.library_service.update_book_availability', return_value=True), \
+             patch('services.library_service.return_book_copy', return_value=(True, None)), \
              patch('services.library_service.update_borrow_record_return_date', return_value=True), \
              patch('services.library_service.calculate_late_fee_for_book', return_value=0):
             
@@ -713,7 +713,7 @@ class TestR4BookReturn:
                  'patron_id': '123456', 'book_id': 1,
                  'due_date': due_date_future.isoformat(), 'return_date': None
              }), \
-             patch('services.library_service.update_book_availability', return_value=True), \
+             patch('services.library_service.return_book_copy', return_value=(True, None)), \
              patch('services.library_service.update_borrow_record_return_date', return_value=True), \
              patch('services.library_service.calculate_late_fee_for_book', return_value=0):
             
@@ -731,7 +731,7 @@ class TestR4BookReturn:
                  'patron_id': '123456', 'book_id': 2,
                  'due_date': due_date_past.isoformat(), 'return_date': None
              }), \
-             patch('services.library_service.update_book_availability', return_value=True), \
+             patch('services.library_service.return_book_copy', return_value=(True, None)), \
              patch('services.library_service.update_borrow_record_return_date', return_value=True), \
              patch('services.library_service.calculate_late_fee_for_book', return_value=2.50):
             
@@ -752,16 +752,16 @@ class TestR4BookReturn:
                  'patron_id': '123456', 'book_id': 1,
                  'due_date': due_date.isoformat(), 'return_date': None
              }), \
-             patch('services.library_service.update_book_availability') as mock_update, \
+             patch('services.library_service.return_book_copy') as mock_update, \
              patch('services.library_service.update_borrow_record_return_date', return_value=True), \
              patch('services.library_service.calculate_late_fee_for_book', return_value=0):
             
-            mock_update.return_value = True
+            mock_update.return_value = (True, None)
             success, message = return_book_by_patron("123456", 1)
             
             assert success == True
-            # Verify update_book_availability was called with increment of 1
-            mock_update.assert_called_once_with(1, 1)
+            # Verify exactly one copy of the book was put back
+            mock_update.assert_called_once_with(1)
 
     def test_tc10_2_return_increases_availability_from_zero(self):
         """TC10.2: Verify book with 0 available copies increases to 1 after return."""
@@ -774,7 +774,7 @@ class TestR4BookReturn:
                  'patron_id': '123456', 'book_id': 1,
                  'due_date': due_date.isoformat(), 'return_date': None
              }), \
-             patch('services.library_service.update_book_availability', return_value=True), \
+             patch('services.library_service.return_book_copy', return_value=(True, None)), \
              patch('services.library_service.update_borrow_record_return_date', return_value=True), \
              patch('services.library_service.calculate_late_fee_for_book', return_value=0):
             
@@ -796,7 +796,7 @@ class TestR4BookReturn:
                  'patron_id': '123456', 'book_id': 1,
                  'due_date': due_date.isoformat(), 'return_date': None
              }), \
-             patch('services.library_service.update_book_availability', return_value=True), \
+             patch('services.library_service.return_book_copy', return_value=(True, None)), \
              patch('services.library_service.update_borrow_record_return_date') as mock_return_date, \
              patch('services.library_service.calculate_late_fee_for_book', return_value=0):
             
@@ -825,7 +825,7 @@ class TestR4BookReturn:
                  'patron_id': '000000', 'book_id': 1,
                  'due_date': due_date.isoformat(), 'return_date': None
              }), \
-             patch('services.library_service.update_book_availability', return_value=True), \
+             patch('services.library_service.return_book_copy', return_value=(True, None)), \
              patch('services.library_service.update_borrow_record_return_date', return_value=True), \
              patch('services.library_service.calculate_late_fee_for_book', return_value=0):
             
@@ -845,7 +845,7 @@ class TestR4BookReturn:
                  'patron_id': '999999', 'book_id': 1,
                  'due_date': due_date.isoformat(), 'return_date': None
              }), \
-             patch('services.library_service.update_book_availability', return_value=True), \
+             patch('services.library_service.return_book_copy', return_value=(True, None)), \
              patch('services.library_service.update_borrow_record_return_date', return_value=True), \
              patch('services.library_service.calculate_late_fee_for_book', return_value=0):
             
@@ -866,7 +866,7 @@ class TestR4BookReturn:
                  'patron_id': '123456', 'book_id': 1,
                  'due_date': due_date.isoformat(), 'return_date': None
              }), \
-             patch('services.library_service.update_book_availability', return_value=True), \
+             patch('services.library_service.return_book_copy', return_value=(True, None)), \
              patch('services.library_service.update_borrow_record_return_date', return_value=True), \
              patch('services.library_service.calculate_late_fee_for_book', return_value=0):
             
@@ -886,7 +886,7 @@ class TestR4BookReturn:
                  'patron_id': '123456', 'book_id': 1,
                  'due_date': due_date.isoformat(), 'return_date': None
              }), \
-             patch('services.library_service.update_book_availability', return_value=True), \
+             patch('services.library_service.return_book_copy', return_value=(True, None)), \
              patch('services.library_service.update_borrow_record_return_date', return_value=True), \
              patch('services.library_service.calculate_late_fee_for_book', return_value=1.00):
             
@@ -0,0 +1,172 @@
+import pytest
+from unittest.mock import Mock, patch
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from services.payment_services import PaymentGateway
+from services.library_service import accrue_late_fees, get_late_fee, pay_late_fees, get_patron_status_report
+from database import (
+    init_database, get_db_connection, insert_book, insert_borrow_record,
+    update_borrow_record_return_date, get_fee_ledger_entry
+)
+
+class TestFeeLedger:
+    """Test cases for the incremental late fee ledger"""
+
+    def setup_method(self):
+        """Setup test database before each test"""
+        init_database()
+        # Clear existing data and reset auto-increment
+        conn = get_db_connection()
+        conn.execute('DELETE FROM borrow_records')
+        conn.execute('DELETE FROM books')
+        conn.execute('DELETE FROM fee_ledger')
+        conn.execute('DELETE FROM fee_payments')
+        conn.execute('UPDATE fee_ledger_state SET last_run_ts = NULL')
+        conn.execute('DELETE FROM sqlite_sequence WHERE name="books"')
+        conn.execute('DELETE FROM sqlite_sequence WHERE name="borrow_records"')
+        conn.commit()
+        conn.close()
+
+        insert_book("Test Book", "Test Author", "1234567890123", 5, 5)
+        self.now = datetime.now()
+
+    def borrow(self, patron_id, days_overdue):
+        due_date = self.now - timedelta(days=days_overdue)
+        insert_borrow_record(patron_id, 1, due_date - timedelta(days=14), due_date)
+
+    def test_first_run_accrues_all_overdue_loans(self):
+        """Test the first run creates entries for every overdue loan"""
+        self.borrow("111111", 5)
+        self.borrow("222222", -3)
+
+        result = accrue_late_fees(self.now)
+
+        assert result['status'] == 'success'
+        assert result['updated'] == 1
+        entry = get_fee_ledger_entry("111111", 1)
+        assert entry['days_overdue'] == 5
+        assert entry['accrued_fee'] == 2.50
+
+    def test_later_run_only_touches_changed_loans(self):
+        """Test a same-day rerun has nothing to do and a next-day run advances fees"""
+        self.borrow("111111", 5)
+        self.borrow("222222", 30)
+        accrue_late_fees(self.now)
+
+        assert accrue_late_fees(self.now + timedelta(minutes=5))['updated'] == 0
+
+        # The capped loan is outside the accrual window; only the 5-day loan moves
+        result = accrue_late_fees(self.now + timedelta(days=1, minutes=5))
+        assert result['updated'] == 1
+        assert get_fee_ledger_entry("111111", 1)['accrued_fee'] == 3.00
+
+    def test_return_closes_ledger_entry(self):
+        """Test loans returned since the last run get their final fee"""
+        self.borrow("111111", 5)
+        accrue_late_fees(self.now)
+        update_borrow_record_return_date("111111", 1, self.now + timedelta(minutes=1))
+
+        result = accrue_late_fees(self.now + timedelta(minutes=2))
+
+        conn = get_db_connection()
+        closed = conn.execute('SELECT closed FROM fee_ledger WHERE borrow_record_id = 1').fetchone()[0]
+        conn.close()
+        assert result['updated'] == 1
+        assert closed == 1
+
+    def test_get_late_fee_reads_current_ledger_entry(self):
+        """Test the ledger read matches the computed fee"""
+        self.borrow("111111", 10)
+        accrue_late_fees()
+
+        result = get_late_fee("111111", 1)
+
+        assert result['status'] == 'success'
+        assert result['fee_amount'] == 6.50
+        assert result['days_overdue'] == 10
+        assert result['balance_due'] == 6.50
+
+    def test_get_late_fee_falls_back_without_ledger(self):
+        """Test loans the job has not reached are computed directly"""
+        self.borrow("111111", 3)
+
+        result = get_late_fee("111111", 1)
+
+        assert result['fee_amount'] == 1.50
+        assert result['amount_paid'] == 0.00
+
+    def test_late_fee_endpoint_reads_ledger(self):
+        """Test /api/late_fee serves the ledger-backed result"""
+        self.borrow("111111", 10)
+        accrue_late_fees()
+
+        response = create_app().test_client().get('/api/late_fee/111111/1')
+
+        assert response.status_code == 200
+        assert response.get_json()['balance_due'] == 6.50
+
+    def test_payment_is_recorded_and_reconciled(self):
+        """Test a payment is logged in the ledger and not charged twice"""
+        self.borrow("111111", 10)
+        accrue_late_fees()
+        gateway = Mock(spec=PaymentGateway)
+        gateway.process_payment.return_value = (True, "txn_111111_1", "Payment processed")
+
+        success, _, _ = pay_late_fees("111111", 1, gateway)
+        assert success == True
+        assert get_fee_ledger_entry("111111", 1)['paid_amount'] == 6.50
+        assert get_late_fee("111111", 1)['balance_due'] == 0.00
+
+        success, message, _ = pay_late_fees("111111", 1, gateway)
+        assert success == False
+        assert "no late fees" in message.lower()
+        gateway.process_payment.assert_called_once()
+
+    def test_unrecorded_payment_is_refunded(self):
+        """Test a charge the ledger cannot record is refunded instead of kept"""
+        self.borrow("111111", 10)
+        gateway = Mock(spec=PaymentGateway)
+        gateway.process_payment.return_value = (True, "txn_111111_1", "Payment processed")
+        gateway.refund_payment.return_value = (True, "Refunded")
+
+        with patch('services.library_service.record_fee_payment', return_value=False):
+            success, message, transaction_id = pay_late_fees("111111", 1, gateway)
+
+        assert success == False
+        assert "refunded" in message
+        assert transaction_id is None
+        gateway.refund_payment.assert_called_once_with("txn_111111_1", 6.50)
+
+    def test_unrecorded_payment_that_cannot_be_refunded_is_flagged(self):
+        """Test the transaction is reported for reconciliation when the refund fails too"""
+        self.borrow("111111", 10)
+        gateway = Mock(spec=PaymentGateway)
+        gateway.process_payment.return_value = (True, "txn_111111_1", "Payment processed")
+        gateway.refund_payment.side_effect = Exception("Network timeout")
+
+        with patch('services.library_service.record_fee_payment', return_value=False):
+            success, message, transaction_id = pay_late_fees("111111", 1, gateway)
+
+        assert success == False
+        assert "reconcile" in message
+        assert transaction_id == "txn_111111_1"
+
+    def test_status_report_reads_fees_in_one_query(self):
+        """Test the report totals fees from the ledger read, not one lookup per loan"""
+        insert_book("Second Book", "Test Author", "1234567890124", 5, 5)
+        self.borrow("111111", 10)
+        due_date = self.now - timedelta(days=3)
+        insert_borrow_record("111111", 2, due_date - timedelta(days=14), due_date)
+        accrue_late_fees(self.now)
+
+        with patch('services.library_service.calculate_late_fee_for_book') as per_loan:
+            report = get_patron_status_report("111111")
+
+        per_loan.assert_not_called()
+        assert report['total_late_fees'] == 8.00
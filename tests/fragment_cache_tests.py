@@ -0,0 +1,79 @@
+import pytest
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from routes.fragment_cache import BookRowCache
+from database import init_database, get_db_connection, insert_book, update_book_availability
+
+class TestBookRowFragmentCache:
+    """Test cases for cached catalog/search row rendering"""
+
+    def setup_method(self):
+        """Setup test database and app before each test"""
+        init_database()
+        # Clear existing data and reset auto-increment
+        conn = get_db_connection()
+        conn.execute('DELETE FROM borrow_records')
+        conn.execute('DELETE FROM books')
+        conn.execute('DELETE FROM sqlite_sequence WHERE name="books"')
+        conn.execute('DELETE FROM sqlite_sequence WHERE name="borrow_records"')
+        conn.commit()
+        conn.close()
+
+        insert_book("Cached Book", "Test Author", "1234567890123", 2, 2)
+        self.app = create_app()
+        self.client = self.app.test_client()
+        self.cache = self.app.extensions['book_row_cache']
+
+    def test_repeat_render_is_served_from_cache(self):
+        """Test the second catalog view reuses the rendered row"""
+        first = self.client.get('/catalog').data
+        second = self.client.get('/catalog').data
+
+        assert first == second
+        assert b"2/2 Available" in second
+        assert self.cache.hits == 1
+        assert self.cache.misses == 1
+
+    def test_availability_change_rerenders_row(self):
+        """Test a row rendered before an availability change is not reused"""
+        self.client.get('/catalog')
+        update_book_availability(1, -2)
+        response = self.client.get('/catalog')
+
+        assert b"Not Available" in response.data
+        assert b"2/2 Available" not in response.data
+
+    def test_borrow_route_invalidates_row(self):
+        """Test borrowing through the web route evicts the book's cached rows"""
+        self.client.get('/catalog')
+        self.client.get('/search?q=Cached&type=title')
+        assert len(self.cache) == 2
+
+        self.client.post('/borrow', data={'patron_id': '123456', 'book_id': '1'})
+
+        assert len(self.cache) == 0
+
+    def test_cache_evicts_least_recently_used(self):
+        """Test the cache stays within its size bound"""
+        cache = BookRowCache(max_entries=2)
+        cache.set(1, 'catalog', 1, "row 1")
+        cache.set(2, 'catalog', 1, "row 2")
+        cache.get(1, 'catalog', 1)
+        cache.set(3, 'catalog', 1, "row 3")
+
+        assert cache.get(1, 'catalog', 1) == "row 1"
+        assert cache.get(2, 'catalog', 1) is None
+        assert len(cache) == 2
+
+    def test_zero_size_disables_caching(self):
+        """Test BOOK_ROW_CACHE_SIZE=0 renders every row fresh"""
+        client = create_app({'BOOK_ROW_CACHE_SIZE': 0}).test_client()
+        client.get('/catalog')
+        response = client.get('/catalog')
+
+        assert b"Cached Book" in response.data
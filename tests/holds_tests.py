@@ -0,0 +1,171 @@
+import pytest
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from app import create_app
+from services.library_service import (
+    borrow_book_by_patron, return_book_by_patron, place_hold_for_patron,
+    cancel_hold_for_patron, get_patron_holds_report, borrow_cart_by_patron, return_cart_by_patron
+)
+from database import init_database, get_db_connection, insert_book, get_book_by_id, get_hold
+
+class TestHoldQueue:
+    """Test cases for the book hold queue"""
+
+    @pytest.fixture(autouse=True)
+    def books(self, isolated_database):
+        """Seed two books, with the only copy of the first lent out"""
+        insert_book("Popular Book", "Test Author", "1234567890123", 1, 1)
+        insert_book("Shelf Book", "Test Author", "1234567890124", 2, 2)
+        borrow_book_by_patron("100000", 1)
+
+    def test_holds_queue_in_order(self):
+        """Test each new hold joins the end of the queue"""
+        assert place_hold_for_patron("200000", 1) == (True, "Hold placed. You are number 1 in line.")
+        assert place_hold_for_patron("300000", 1) == (True, "Hold placed. You are number 2 in line.")
+        assert get_hold("300000", 1)['position'] == 2
+
+    def test_invalid_holds_are_rejected(self):
+        """Test holds on available, missing, duplicate or borrowed books are refused"""
+        place_hold_for_patron("200000", 1)
+
+        assert place_hold_for_patron("200000", 1) == (False, "You already have a hold on this book.")
+        assert place_hold_for_patron("100000", 1) == (False, "You already have this book on loan.")
+        assert "available" in place_hold_for_patron("200000", 2)[1]
+        assert place_hold_for_patron("200000", 99) == (False, "Book not found.")
+        assert place_hold_for_patron("2000", 1)[0] is False
+
+    def test_return_sets_copy_aside_for_next_in_line(self):
+        """Test a returned copy goes to the first waiting patron, not the shelf"""
+        place_hold_for_patron("200000", 1)
+        place_hold_for_patron("300000", 1)
+
+        success, message = return_book_by_patron("100000", 1)
+
+        assert success is True
+        assert "patron 200000" in message
+        assert get_hold("200000", 1)['status'] == 'ready'
+        assert get_hold("300000", 1)['status'] == 'waiting'
+        assert get_book_by_id(1)['available_copies'] == 0
+        assert borrow_book_by_patron("300000", 1)[0] is False
+
+    def test_ready_hold_is_borrowed(self):
+        """Test the patron with a ready hold can borrow the copy set aside for them"""
+        place_hold_for_patron("200000", 1)
+        return_book_by_patron("100000", 1)
+
+        success, message = borrow_book_by_patron("200000", 1)
+
+        assert success is True
+        assert "Successfully borrowed" in message
+        assert get_hold("200000", 1) is None
+        assert get_book_by_id(1)['available_copies'] == 0
+
+    def test_return_assigns_hold_in_the_same_transaction(self):
+        """Test the returned copy never shows up on the shelf while someone is waiting"""
+        place_hold_for_patron("200000", 1)
+
+        success, hold = database.return_book_copy(1)
+
+        assert success is True
+        assert hold['patron_id'] == "200000"
+        assert get_book_by_id(1)['available_copies'] == 0
+
+    def test_cart_return_sets_copy_aside_and_cart_borrows_it(self):
+        """Test cart returns assign holds and the ready hold can be borrowed through a cart"""
+        place_hold_for_patron("200000", 1)
+
+        returned = return_cart_by_patron("100000", [1])
+        blocked = borrow_cart_by_patron("300000", [1])
+        borrowed = borrow_cart_by_patron("200000", [1, 2])
+
+        assert "patron 200000" in returned['results'][0]['message']
+        assert blocked['processed'] == 0
+        assert borrowed['processed'] == 2
+        assert get_hold("200000", 1) is None
+        assert get_book_by_id(1)['available_copies'] == 0
+        assert get_book_by_id(2)['available_copies'] == 1
+
+    def test_sharded_cart_return_uses_catalog_holds(self, monkeypatch):
+        """Test cart returns on a shard hand the copy to the catalog's hold queue"""
+        # Sharding refuses to start over open loans in the primary
+        return_book_by_patron("100000", 1)
+        monkeypatch.setattr(database, 'BORROW_SHARDS', 2)
+        init_database()
+        borrow_book_by_patron("110000", 2)
+        borrow_book_by_patron("120000", 2)
+        place_hold_for_patron("200000", 2)
+
+        return_cart_by_patron("110000", [2])
+
+        assert get_hold("200000", 2)['status'] == 'ready'
+        assert borrow_cart_by_patron("200000", [2])['processed'] == 1
+        assert get_book_by_id(2)['available_copies'] == 0
+
+    def test_return_without_holds_restocks_shelf(self):
+        """Test a return with an empty queue makes the copy available"""
+        success, message = return_book_by_patron("100000", 1)
+
+        assert success is True
+        assert "set this copy aside" not in message
+        assert get_book_by_id(1)['available_copies'] == 1
+
+    def test_cancelling_ready_hold_passes_copy_on(self):
+        """Test cancelling a ready hold hands the copy to the next patron, then the shelf"""
+        place_hold_for_patron("200000", 1)
+        place_hold_for_patron("300000", 1)
+        return_book_by_patron("100000", 1)
+
+        assert cancel_hold_for_patron("200000", 1) == (True, "Hold cancelled.")
+        assert get_hold("300000", 1)['status'] == 'ready'
+        assert get_book_by_id(1)['available_copies'] == 0
+
+        cancel_hold_for_patron("300000", 1)
+        assert get_book_by_id(1)['available_copies'] == 1
+        assert cancel_hold_for_patron("300000", 1) == (False, "No hold found for this patron and book.")
+
+    def test_next_in_line_uses_position_index(self):
+        """Test the next waiting hold is found with an index search, not a scan"""
+        conn = get_db_connection()
+        plan = ' '.join(row['detail'] for row in conn.execute('''
+            EXPLAIN QUERY PLAN
+            SELECT id FROM holds WHERE book_id = 1 AND status = 'waiting' ORDER BY position LIMIT 1
+        '''))
+        conn.close()
+
+        assert 'idx_holds_book_position' in plan
+        assert 'TEMP B-TREE' not in plan
+
+    def test_patron_holds_report(self):
+        """Test a patron's holds list shows each queue position"""
+        place_hold_for_patron("200000", 1)
+        place_hold_for_patron("300000", 1)
+
+        report = get_patron_holds_report("300000")
+
+        assert report['status'] == 'success'
+        assert [(h['title'], h['status'], h['queue_position']) for h in report['holds']] == [
+            ("Popular Book", 'waiting', 2)
+        ]
+        assert get_patron_holds_report("abc")['status'] == 'error'
+
+    def test_hold_endpoints(self):
+        """Test placing, listing and cancelling holds through the JSON API"""
+        client = create_app().test_client()
+
+        placed = client.post('/api/holds', json={'patron_id': '200000', 'book_id': 1})
+        duplicate = client.post('/api/holds', json={'patron_id': '200000', 'book_id': 1})
+        bad_body = client.post('/api/holds', json={'patron_id': '200000', 'book_id': '1'})
+        listed = client.get('/api/patron/200000/holds').get_json()
+        cancelled = client.delete('/api/holds/200000/1')
+
+        assert placed.status_code == 201
+        assert duplicate.status_code == 400
+        assert bad_body.status_code == 400
+        assert listed['holds'][0]['queue_position'] == 1
+        assert cancelled.status_code == 200
+        assert client.delete('/api/holds/200000/1').status_code == 400
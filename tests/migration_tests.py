@@ -0,0 +1,80 @@
+import pytest
+import sys
+import os
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from database import (
+    get_db_connection, get_schema_version, run_migrations, run_in_batches,
+    MIGRATIONS, SCHEMA_VERSION
+)
+
+@pytest.mark.usefixtures('database_file')
+class TestSchemaMigrations:
+    """Test cases for the versioned schema migration runner"""
+
+    def schema_version(self):
+        conn = get_db_connection()
+        version = get_schema_version(conn)
+        conn.close()
+        return version
+
+    def test_migrations_are_ordered_and_unique(self):
+        """Test migration versions strictly increase"""
+        versions = [version for version, _, _ in MIGRATIONS]
+
+        assert versions == sorted(set(versions))
+        assert SCHEMA_VERSION == versions[-1]
+
+    def test_run_migrations_applies_all_with_timings(self):
+        """Test a fresh database is migrated to the latest version"""
+        results = run_migrations()
+
+        assert [result['version'] for result in results] == [version for version, _, _ in MIGRATIONS]
+        assert all(result['seconds'] >= 0 for result in results)
+        assert self.schema_version() == SCHEMA_VERSION
+
+    def test_dry_run_does_not_apply(self):
+        """Test a dry run lists pending migrations without touching the schema"""
+        results = run_migrations(dry_run=True)
+
+        assert len(results) == len(MIGRATIONS)
+        assert all(result['seconds'] is None for result in results)
+        assert self.schema_version() == 0
+
+    def test_target_version_stops_early(self):
+        """Test migrating to an intermediate version, then to the latest"""
+        run_migrations(target=1)
+        assert self.schema_version() == 1
+
+        results = run_migrations()
+        assert results[0]['version'] == 2
+        assert self.schema_version() == SCHEMA_VERSION
+
+    def test_rerun_is_noop(self):
+        """Test an up-to-date database has nothing pending"""
+        run_migrations()
+
+        assert run_migrations() == []
+
+    def test_run_in_batches_covers_every_row(self):
+        """Test batched updates walk the whole rowid range"""
+        run_migrations()
+        conn = get_db_connection()
+        for i in range(25):
+            conn.execute('''
+                INSERT INTO books (title, author, isbn, total_copies, available_copies)
+                VALUES (?, ?, ?, 1, 1)
+            ''', (f"Book {i}", "Author", f"{i:013d}"))
+        conn.commit()
+
+        changed = run_in_batches(conn, 'books', '''
+            UPDATE books SET available_copies = 0 WHERE rowid BETWEEN ? AND ?
+        ''', batch_size=4)
+        remaining = conn.execute('SELECT COUNT(*) FROM books WHERE available_copies > 0').fetchone()[0]
+        conn.close()
+
+        assert changed == 25
+        assert remaining == 0
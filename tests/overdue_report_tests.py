@@ -0,0 +1,83 @@
+import pytest
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from services.library_service import get_overdue_report
+from database import (
+    init_database, get_db_connection, insert_book, insert_borrow_record,
+    update_borrow_record_return_date
+)
+
+class TestOverdueReport:
+    """Test cases for the SQL-side overdue loan report"""
+
+    def setup_method(self):
+        """Setup test database before each test"""
+        init_database()
+        # Clear existing data and reset auto-increment
+        conn = get_db_connection()
+        conn.execute('DELETE FROM borrow_records')
+        conn.execute('DELETE FROM books')
+        conn.execute('DELETE FROM sqlite_sequence WHERE name="books"')
+        conn.execute('DELETE FROM sqlite_sequence WHERE name="borrow_records"')
+        conn.commit()
+        conn.close()
+
+        insert_book("Test Book", "Test Author", "1234567890123", 10, 10)
+        now = datetime.now()
+        # Overdue by 20, 10 and 3 days, plus one loan that is not yet due
+        for patron_id, days_overdue in (("111111", 20), ("222222", 10), ("333333", 3), ("444444", -5)):
+            due_date = now - timedelta(days=days_overdue)
+            insert_borrow_record(patron_id, 1, due_date - timedelta(days=14), due_date)
+
+    def test_report_lists_overdue_loans_oldest_first(self):
+        """Test only past-due loans are listed, most overdue first"""
+        result = get_overdue_report()
+
+        assert result['status'] == 'success'
+        assert [loan['patron_id'] for loan in result['loans']] == ["111111", "222222", "333333"]
+        assert result['next_cursor'] is None
+
+    def test_report_includes_bulk_computed_fees(self):
+        """Test each loan carries the same fee calculate_late_fee_for_book would give"""
+        loans = get_overdue_report()['loans']
+
+        assert [loan['days_overdue'] for loan in loans] == [20, 10, 3]
+        assert [loan['fee_amount'] for loan in loans] == [15.00, 6.50, 1.50]
+
+    def test_returned_loans_are_excluded(self):
+        """Test returned loans drop out of the report"""
+        update_borrow_record_return_date("111111", 1, datetime.now())
+
+        loans = get_overdue_report()['loans']
+
+        assert "111111" not in [loan['patron_id'] for loan in loans]
+
+    def test_keyset_pagination_walks_all_pages(self):
+        """Test following next_cursor visits every loan exactly once"""
+        first = get_overdue_report(limit=2)
+        second = get_overdue_report(cursor=first['next_cursor'], limit=2)
+
+        assert first['count'] == 2
+        assert [loan['patron_id'] for loan in second['loans']] == ["333333"]
+        assert second['next_cursor'] is None
+
+    def test_invalid_limit_and_cursor(self):
+        """Test bad paging parameters are rejected"""
+        assert get_overdue_report(limit=0)['status'] == 'error'
+        assert get_overdue_report(cursor="not-a-cursor")['status'] == 'error'
+
+    def test_overdue_endpoint(self):
+        """Test the /api/overdue endpoint returns a page of loans"""
+        client = create_app().test_client()
+
+        response = client.get('/api/overdue?limit=2')
+        assert response.status_code == 200
+        assert response.get_json()['count'] == 2
+
+        assert client.get('/api/overdue?limit=1000').status_code == 400
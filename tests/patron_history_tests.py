@@ -0,0 +1,111 @@
+import pytest
+import json
+from unittest.mock import patch
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from app import create_app
+from services.library_service import get_patron_status_report, iter_patron_history
+from database import (
+    init_database, get_db_connection, insert_book, insert_borrow_record,
+    update_borrow_record_return_date, get_borrowing_history, iter_borrowing_history
+)
+
+class TestPatronHistoryPaging:
+    """Test cases for paginated and streamed borrowing history"""
+
+    def setup_method(self):
+        """Setup test database with 25 returned loans before each test"""
+        init_database()
+        # Clear existing data and reset auto-increment
+        conn = get_db_connection()
+        conn.execute('DELETE FROM borrow_records')
+        conn.execute('DELETE FROM books')
+        conn.execute('DELETE FROM sqlite_sequence WHERE name="books"')
+        conn.execute('DELETE FROM sqlite_sequence WHERE name="borrow_records"')
+        conn.commit()
+        conn.close()
+
+        insert_book("Test Book", "Test Author", "1234567890123", 3, 3)
+        now = datetime.now()
+        for days_ago in range(25, 0, -1):
+            borrow_date = now - timedelta(days=days_ago)
+            insert_borrow_record("123456", 1, borrow_date, borrow_date + timedelta(days=14))
+            update_borrow_record_return_date("123456", 1, borrow_date + timedelta(hours=1))
+
+    def test_history_query_uses_index(self):
+        """Test history pages are read from the returned loan index instead of sorted"""
+        conn = get_db_connection()
+        plan = ' '.join(row['detail'] for row in conn.execute(
+            'EXPLAIN QUERY PLAN ' + database._HISTORY_QUERY + ' LIMIT 10',
+            database._history_params("123456", None)))
+        conn.close()
+
+        assert 'idx_borrow_records_returned_patron' in plan
+        assert 'SCAN borrow_records' not in plan
+        assert 'TEMP B-TREE' not in plan
+
+    def test_status_report_loads_most_recent_page(self):
+        """Test the report holds one page of history, newest first, and a cursor"""
+        with patch('services.library_service.get_borrowing_history',
+                   wraps=get_borrowing_history) as mock_history:
+            report = get_patron_status_report("123456")
+
+        assert mock_history.call_args.kwargs['limit'] == 21
+        assert len(report['borrowing_history']) == 20
+        assert report['borrowing_history'][0]['id'] == 25
+        assert report['history_next_cursor'] is not None
+
+    def test_history_cursor_walks_every_page(self):
+        """Test following history_next_cursor visits every loan exactly once"""
+        ids = []
+        cursor = None
+        while True:
+            report = get_patron_status_report("123456", cursor, history_limit=7)
+            ids += [loan['id'] for loan in report['borrowing_history']]
+            cursor = report['history_next_cursor']
+            if cursor is None:
+                break
+
+        assert ids == list(range(25, 0, -1))
+
+    def test_invalid_history_cursor(self):
+        """Test malformed cursors and limits are rejected"""
+        assert get_patron_status_report("123456", "garbage")['status'] == 'error'
+        assert get_patron_status_report("123456", history_limit=0)['status'] == 'error'
+
+    def test_streaming_history_yields_everything(self):
+        """Test the generator streams the full history in small batches"""
+        history = iter_borrowing_history("123456", batch_size=4)
+
+        assert next(history)['id'] == 25
+        assert len(list(history)) == 24
+        assert iter_patron_history("12345") is None
+
+    def test_status_endpoint_pages_history(self):
+        """Test /api/patron/<id>/status returns a page and its cursor"""
+        client = create_app().test_client()
+
+        first = client.get('/api/patron/123456/status?history_limit=20').get_json()
+        second = client.get('/api/patron/123456/status',
+                            query_string={'history_cursor': first['history_next_cursor']}).get_json()
+
+        assert len(first['borrowing_history']) == 20
+        assert len(second['borrowing_history']) == 5
+        assert second['history_next_cursor'] is None
+        assert client.get('/api/patron/12345/status').status_code == 400
+
+    def test_history_endpoint_streams_ndjson(self):
+        """Test /api/patron/<id>/history streams one JSON line per loan"""
+        response = create_app().test_client().get('/api/patron/123456/history', buffered=False)
+        assert response.is_streamed
+        lines = response.get_data(as_text=True).splitlines()
+
+        assert response.mimetype == 'application/x-ndjson'
+        assert len(lines) == 25
+        assert json.loads(lines[0])['title'] == "Test Book"
@@ -27,7 +27,10 @@ class TestPayLateFees:
         }
         mocker.patch('services.library_service.get_book_by_id',
                      return_value=mock_book_info)
-        
+
+        # stub record_fee_payment so the payment is recorded in the ledger
+        mocker.patch('services.library_service.record_fee_payment', return_value=True)
+
         # mock the paymentGateway
         mock_gateway = Mock(spec=PaymentGateway)
         mock_gateway.process_payment.return_value = (True, 'txn_123', 'Payment successful')
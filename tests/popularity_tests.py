@@ -0,0 +1,163 @@
+import pytest
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from app import create_app
+from services.library_service import (
+    borrow_book_by_patron, return_book_by_patron, borrow_cart_by_patron,
+    search_books_in_catalog, get_popular_books
+)
+from database import (
+    init_database, get_db_connection, insert_book, insert_borrow_record, cancel_borrow_record,
+    get_book_by_id, run_migrations, migrate_databases
+)
+
+class TestBorrowCountPopularity:
+    """Test cases for the maintained borrow counts and popularity ordering"""
+
+    @pytest.fixture(autouse=True)
+    def keep_monkeypatch(self, database_file, monkeypatch):
+        """Tests choose when (and to which version) to migrate their empty database"""
+        self.monkeypatch = monkeypatch
+
+    def add_books(self, *titles):
+        for i, title in enumerate(titles):
+            insert_book(title, "Test Author", f"{1234567890120 + i}", 10, 10)
+
+    def borrow(self, book_id, times):
+        for i in range(times):
+            borrow_book_by_patron(f"{200000 + i}", book_id)
+
+    def test_borrows_are_counted(self):
+        """Test single and cart borrows count, returns and cancellations do not add"""
+        init_database()
+        self.add_books("Book One", "Book Two")
+
+        borrow_book_by_patron("123456", 1)
+        return_book_by_patron("123456", 1)
+        borrow_cart_by_patron("123456", [1, 2])
+        insert_borrow_record("654321", 2, datetime.now(), datetime.now() + timedelta(days=14))
+        cancel_borrow_record("654321", 2)
+
+        assert get_book_by_id(1)['borrow_count'] == 2
+        assert get_book_by_id(2)['borrow_count'] == 1
+
+    def test_migration_backfills_existing_loans(self):
+        """Test upgrading counts the loans already recorded, archived ones included"""
+        run_migrations(target=11)
+        self.add_books("Book One", "Book Two")
+        conn = get_db_connection()
+        conn.executemany('''
+            INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date)
+            VALUES ('123456', ?, '2025-01-01T00:00:00', '2025-01-15T00:00:00')
+        ''', [(1,), (1,), (2,)])
+        conn.execute('''
+            INSERT INTO borrow_records_archive (id, patron_id, book_id, borrow_date, due_date, return_date, archived_ts)
+            VALUES (100, '123456', 2, '2024-01-01', '2024-01-15', '2024-01-10', 0)
+        ''')
+        conn.commit()
+        conn.close()
+
+        run_migrations()
+
+        assert get_book_by_id(1)['borrow_count'] == 2
+        assert get_book_by_id(2)['borrow_count'] == 2
+
+    def test_popular_listing_uses_index(self):
+        """Test the ranked listing reads the borrow_count index instead of sorting"""
+        init_database()
+        conn = get_db_connection()
+        plan = ' '.join(row['detail'] for row in conn.execute(
+            f"EXPLAIN QUERY PLAN SELECT * FROM books ORDER BY {database.BOOK_SORT_ORDERS['popularity']} LIMIT 10"))
+        conn.close()
+
+        assert 'idx_books_popularity' in plan
+        assert 'TEMP B-TREE' not in plan
+
+    def test_popular_books_are_ranked(self):
+        """Test books are ranked by borrow count, ties by title"""
+        init_database()
+        self.add_books("Charlie", "Alpha", "Bravo")
+        self.borrow(3, 3)
+        self.borrow(1, 1)
+        self.borrow(2, 1)
+
+        result = get_popular_books(limit=2, offset=1)
+
+        assert [(book['rank'], book['title'], book['borrow_count']) for book in result['books']] == [
+            (2, "Alpha", 1), (3, "Charlie", 1)
+        ]
+        assert get_popular_books(limit=0)['status'] == 'error'
+        assert get_popular_books(offset=-1)['status'] == 'error'
+
+    def test_relevance_search_order(self):
+        """Test relevance puts exact, prefix and word matches first, then popular books"""
+        init_database()
+        self.add_books("Learning Python", "Cpython Internals", "Python Cookbook", "Python", "Fluent Python")
+        self.borrow(5, 2)
+        self.borrow(1, 1)
+
+        results = search_books_in_catalog("python", "title", sort='relevance')
+        by_title = search_books_in_catalog("python", "title")
+        popular = search_books_in_catalog("python", "title", sort='popularity')
+
+        assert [book['title'] for book in results] == [
+            "Python", "Python Cookbook", "Fluent Python", "Learning Python", "Cpython Internals"
+        ]
+        assert by_title[0]['title'] == "Cpython Internals"
+        assert popular[0]['title'] == "Fluent Python"
+
+    def test_sharded_borrows_count_in_catalog(self):
+        """Test borrows recorded on shards still count against the catalog's books"""
+        self.monkeypatch.setattr(database, 'BORROW_SHARDS', 2)
+        init_database()
+        self.add_books("Book One")
+
+        self.borrow(1, 4)
+        insert_borrow_record("999999", 1, datetime.now(), datetime.now() + timedelta(days=14))
+        cancel_borrow_record("999999", 1)
+
+        assert get_book_by_id(1)['borrow_count'] == 4
+
+    def test_migration_backfills_sharded_loans(self):
+        """Test upgrading a sharded deployment counts the loans recorded on the shards"""
+        self.monkeypatch.setattr(database, 'BORROW_SHARDS', 2)
+        migrate_databases(target=11)
+        self.add_books("Book One", "Book Two")
+        for shard in range(2):
+            conn = get_db_connection(database.get_shard_path(shard))
+            conn.executemany('''
+                INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date)
+                VALUES ('123456', ?, '2025-01-01T00:00:00', '2025-01-15T00:00:00')
+            ''', [(1,), (2,)])
+            conn.execute('''
+                INSERT INTO borrow_records_archive (id, patron_id, book_id, borrow_date, due_date, return_date, archived_ts)
+                VALUES (?, '123456', 1, '2024-01-01', '2024-01-15', '2024-01-10', 0)
+            ''', (shard * database.SHARD_ID_SPACE + 100,))
+            conn.commit()
+            conn.close()
+
+        migrate_databases()
+        migrate_databases()
+
+        assert get_book_by_id(1)['borrow_count'] == 4
+        assert get_book_by_id(2)['borrow_count'] == 2
+
+    def test_popular_endpoint(self):
+        """Test /api/popular serves the ranking with catalog validators"""
+        init_database()
+        self.add_books("Book One", "Book Two")
+        self.borrow(2, 2)
+        client = create_app().test_client()
+
+        response = client.get('/api/popular?limit=1')
+        revalidated = client.get('/api/popular?limit=1', headers={'If-None-Match': response.headers['ETag']})
+
+        assert response.get_json()['books'][0]['title'] == "Book Two"
+        assert revalidated.status_code == 304
+        assert client.get('/api/popular?limit=500').status_code == 400
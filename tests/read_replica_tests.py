@@ -0,0 +1,112 @@
+import pytest
+import sqlite3
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from database import (
+    get_read_connection, refresh_replica, get_all_books, search_books,
+    get_borrowing_history, insert_book, insert_borrow_record, update_borrow_record_return_date,
+    get_patron_borrow_count
+)
+from services.library_service import borrow_book_by_patron
+
+class TestReadConnectionRouting:
+    """Test cases for routing read-only helpers to read-only or replica connections"""
+
+    @pytest.fixture(autouse=True)
+    def book(self, isolated_database, monkeypatch):
+        """Seed one book, with the replica next to this test's database"""
+        monkeypatch.setattr(database, 'DATABASE_REPLICA', None)
+        insert_book("Test Book", "Test Author", "1234567890123", 3, 3)
+        self.monkeypatch = monkeypatch
+
+    def use_mode(self, mode, max_age=60):
+        self.monkeypatch.setattr(database, 'DATABASE_READ_MODE', mode)
+        self.monkeypatch.setattr(database, 'REPLICA_MAX_AGE', max_age)
+
+    def test_readonly_connection_rejects_writes(self):
+        """Test mode=ro connections can read but never write"""
+        self.use_mode('readonly')
+        conn = get_read_connection()
+
+        assert conn.execute('SELECT COUNT(*) FROM books').fetchone()[0] == 1
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("DELETE FROM books")
+        conn.close()
+
+    def test_readonly_mode_sees_committed_writes(self):
+        """Test read helpers on the read-only connection see writes immediately"""
+        self.use_mode('readonly')
+        insert_book("Second Book", "Test Author", "1234567890124", 1, 1)
+
+        assert len(get_all_books()) == 2
+        assert len(search_books("Second", "title")) == 1
+
+    def test_snapshot_mode_is_stale_within_max_age(self):
+        """Test snapshot reads come from the replica until it is older than the bound"""
+        self.use_mode('snapshot')
+        assert len(get_all_books()) == 1
+        assert os.path.exists(database.get_replica_path())
+
+        insert_book("Second Book", "Test Author", "1234567890124", 1, 1)
+        assert len(get_all_books()) == 1
+
+        os.utime(database.get_replica_path(), (0, 0))
+        # The stale replica is still served while a new one is copied in the background
+        assert len(get_all_books()) == 1
+        database._replica_refresher.join()
+        assert len(get_all_books()) == 2
+
+    def test_reads_do_not_wait_for_a_refresh_in_progress(self):
+        """Test reads keep using the current replica while another thread holds the refresh lock"""
+        self.use_mode('snapshot')
+        get_all_books()
+        insert_book("Second Book", "Test Author", "1234567890124", 1, 1)
+        os.utime(database.get_replica_path(), (0, 0))
+
+        with database._replica_lock:
+            assert len(get_all_books()) == 1
+
+    def test_forced_refresh_updates_replica(self):
+        """Test refresh_replica(force=True) copies new writes regardless of age"""
+        self.use_mode('snapshot')
+        get_all_books()
+        insert_book("Second Book", "Test Author", "1234567890124", 1, 1)
+
+        assert refresh_replica() is False
+        assert refresh_replica(force=True) is True
+        assert len(search_books("Second", "title")) == 1
+
+    def test_borrowing_history_reads_replica(self):
+        """Test patron history is served from the replica"""
+        self.use_mode('snapshot')
+        now = datetime.now()
+        insert_borrow_record("123456", 1, now - timedelta(days=5), now + timedelta(days=9))
+        update_borrow_record_return_date("123456", 1, now)
+        refresh_replica(force=True)
+
+        assert len(get_borrowing_history("123456")) == 1
+
+    def test_borrowing_limit_reads_primary_in_snapshot_mode(self):
+        """Test a stale replica cannot let a patron borrow past the limit"""
+        for i in range(7):
+            insert_book(f"Book {i}", "Test Author", f"{1234567890130 + i}", 1, 1)
+        self.use_mode('snapshot')
+        refresh_replica(force=True)
+
+        results = [borrow_book_by_patron("123456", book_id)[0] for book_id in range(2, 10)]
+
+        assert results == [True] * 5 + [False] * 3
+        assert get_patron_borrow_count("123456") == 5
+
+    def test_unknown_mode_is_rejected(self):
+        """Test a misconfigured read mode fails loudly"""
+        self.use_mode('replica')
+
+        with pytest.raises(ValueError):
+            get_read_connection()
@@ -0,0 +1,155 @@
+import pytest
+from unittest.mock import patch
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import services.library_service as library_service
+from app import create_app
+from services.report_cache import PatronReportCache
+from services.library_service import (
+    get_cached_patron_status_report, borrow_book_by_patron, return_book_by_patron
+)
+from database import init_database, get_db_connection, insert_book, insert_borrow_record, record_fee_payment
+
+# Fixed "now" for the time-dependent tests
+NOW = datetime(2025, 3, 10, 12, 0, 0)
+
+class FrozenDatetime(datetime):
+    """datetime whose now() can be moved by the test"""
+    offset = timedelta()
+
+    @classmethod
+    def now(cls, tz=None):
+        return NOW + cls.offset
+
+class TestPatronReportCache:
+    """Test cases for the cached patron status report"""
+
+    def setup_method(self):
+        """Setup test database and an empty cache before each test"""
+        init_database()
+        # Clear existing data and reset auto-increment
+        conn = get_db_connection()
+        conn.execute('DELETE FROM borrow_records')
+        conn.execute('DELETE FROM books')
+        conn.execute('DELETE FROM sqlite_sequence WHERE name="books"')
+        conn.execute('DELETE FROM sqlite_sequence WHERE name="borrow_records"')
+        conn.commit()
+        conn.close()
+
+        insert_book("Book One", "Test Author", "1234567890123", 3, 3)
+        insert_book("Book Two", "Test Author", "1234567890124", 3, 3)
+        self.cache = PatronReportCache(100)
+
+    def view(self):
+        """Get the cached report, returning it and whether it was rebuilt."""
+        with patch('services.library_service.get_patron_status_report',
+                   wraps=library_service.get_patron_status_report) as mock_report:
+            report = get_cached_patron_status_report("123456", self.cache)
+        return report, mock_report.called
+
+    def test_repeat_views_are_served_from_cache(self):
+        """Test a second view does not rebuild the report"""
+        borrow_book_by_patron("123456", 1)
+
+        first, first_built = self.view()
+        second, second_built = self.view()
+
+        assert first_built is True
+        assert second_built is False
+        assert second == first
+        assert self.cache.hits == 1
+
+    def test_borrow_and_return_invalidate(self):
+        """Test borrowing and returning rebuild that patron's report"""
+        self.view()
+        borrow_book_by_patron("123456", 1)
+        after_borrow, built = self.view()
+        assert built is True
+        assert after_borrow['num_books_borrowed'] == 1
+
+        return_book_by_patron("123456", 1)
+        after_return, built = self.view()
+        assert built is True
+        assert after_return['num_books_borrowed'] == 0
+        assert len(after_return['borrowing_history']) == 1
+
+    def test_other_patrons_activity_keeps_cache(self):
+        """Test another patron's borrow does not invalidate this patron's report"""
+        self.view()
+        borrow_book_by_patron("654321", 1)
+
+        _, built = self.view()
+
+        assert built is False
+
+    def test_payment_invalidates(self):
+        """Test a recorded late fee payment rebuilds the report"""
+        borrow_book_by_patron("123456", 1)
+        self.view()
+
+        record_fee_payment("123456", 1, 1.00, "txn_1")
+        _, built = self.view()
+
+        assert built is True
+
+    def test_fees_recomputed_lazily_at_day_boundary(self):
+        """Test fees advance with the clock without rebuilding the report"""
+        due_date = NOW - timedelta(days=3, hours=1)
+        insert_borrow_record("123456", 1, due_date - timedelta(days=14), due_date)
+        insert_borrow_record("123456", 2, NOW - timedelta(days=1), NOW + timedelta(hours=2))
+
+        with patch('services.library_service.datetime', FrozenDatetime):
+            FrozenDatetime.offset = timedelta()
+            first, _ = self.view()
+            FrozenDatetime.offset = timedelta(hours=12)
+            same_day, same_day_built = self.view()
+            FrozenDatetime.offset = timedelta(days=1)
+            next_day, next_day_built = self.view()
+
+        assert first['total_late_fees'] == 1.50
+        assert same_day_built is False
+        assert same_day['total_late_fees'] == 1.50
+        assert [book['is_overdue'] for book in same_day['currently_borrowed_books']] == [True, True]
+        assert next_day_built is False
+        assert next_day['total_late_fees'] == 2.00
+
+    def test_status_endpoint_uses_cache(self):
+        """Test /api/patron/<id>/status reuses the app's report cache"""
+        app = create_app()
+        client = app.test_client()
+
+        client.get('/api/patron/123456/status')
+        client.get('/api/patron/123456/status')
+
+        assert app.extensions['patron_report_cache'].hits == 1
+
+    def test_snapshot_mode_builds_cached_report_from_primary(self, monkeypatch, tmp_path):
+        """Test a lagging replica is not cached under the primary's newer version"""
+        monkeypatch.setattr(database, 'DATABASE_REPLICA', str(tmp_path / 'replica.db'))
+        monkeypatch.setattr(database, 'DATABASE_READ_MODE', 'snapshot')
+        monkeypatch.setattr(database, 'REPLICA_MAX_AGE', 60)
+        database.refresh_replica(force=True)
+
+        borrow_book_by_patron("123456", 1)
+        report, _ = self.view()
+
+        assert report['num_books_borrowed'] == 1
+
+    def test_sharded_payment_invalidates(self, monkeypatch, database_file):
+        """Test a payment recorded on the patron's shard rebuilds the report"""
+        monkeypatch.setattr(database, 'BORROW_SHARDS', 2)
+        init_database()
+        insert_book("Book One", "Test Author", "1234567890123", 3, 3)
+        borrow_book_by_patron("123456", 1)
+        self.view()
+
+        record_fee_payment("123456", 1, 1.00, "txn_1")
+        _, built = self.view()
+
+        assert built is True
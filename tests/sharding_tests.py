@@ -0,0 +1,190 @@
+import pytest
+import sys
+import os
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from manage import migrate
+from services.payment_services import PaymentGateway
+from services.library_service import (
+    borrow_book_by_patron, return_book_by_patron, get_overdue_report, borrow_cart_by_patron,
+    return_cart_by_patron, pay_late_fees, accrue_late_fees
+)
+from database import (
+    init_database, get_db_connection, get_shard_connection, shard_for_patron, insert_book,
+    insert_borrow_record, get_patron_borrow_count, get_patron_borrowed_books,
+    get_borrowing_history, get_overdue_loans, get_fee_ledger_entry, get_book_by_id, to_epoch,
+    add_sample_data
+)
+
+# Patron IDs chosen to land on different shards
+PATRONS = [f"{100000 + i}" for i in range(12)]
+
+class TestBorrowRecordSharding:
+    """Test cases for partitioning borrow_records across shard databases"""
+
+    @pytest.fixture(autouse=True)
+    def sharded_database(self, database_file, monkeypatch):
+        """Run each test against its own catalog database and 4 shards"""
+        monkeypatch.setattr(database, 'BORROW_SHARDS', 4)
+        init_database()
+        for i in range(1, 4):
+            insert_book(f"Book {i}", "Test Author", f"{1234567890120 + i}", 5, 5)
+
+    def shard_count(self, shard):
+        conn = get_shard_connection(shard)
+        count = conn.execute('SELECT COUNT(*) FROM borrow_records').fetchone()[0]
+        conn.close()
+        return count
+
+    def test_shards_are_created_with_schema(self):
+        """Test init_database creates every shard at the current schema version"""
+        for shard in range(4):
+            assert os.path.exists(database.get_shard_path(shard))
+            conn = get_db_connection(database.get_shard_path(shard))
+            assert database.get_schema_version(conn) == database.SCHEMA_VERSION
+            conn.close()
+
+    def test_patron_records_land_on_one_shard(self):
+        """Test a patron's loans are written to and read from their shard only"""
+        patron_id = PATRONS[0]
+        success, _ = borrow_book_by_patron(patron_id, 1)
+        borrow_book_by_patron(patron_id, 2)
+
+        assert success is True
+        shard = shard_for_patron(patron_id)
+        assert [self.shard_count(s) for s in range(4)] == [2 if s == shard else 0 for s in range(4)]
+        assert get_patron_borrow_count(patron_id) == 2
+        assert [book['title'] for book in get_patron_borrowed_books(patron_id)] == ["Book 1", "Book 2"]
+
+        conn = get_db_connection()
+        assert conn.execute('SELECT COUNT(*) FROM borrow_records').fetchone()[0] == 0
+        assert conn.execute('SELECT available_copies FROM books WHERE id = 1').fetchone()[0] == 4
+        conn.close()
+
+    def test_return_and_history_use_shard(self):
+        """Test returns close the shard record and show up in history"""
+        patron_id = PATRONS[1]
+        borrow_book_by_patron(patron_id, 3)
+
+        success, _ = return_book_by_patron(patron_id, 3)
+
+        assert success is True
+        assert get_patron_borrow_count(patron_id) == 0
+        assert [record['title'] for record in get_borrowing_history(patron_id)] == ["Book 3"]
+
+    def test_shard_record_ids_are_globally_unique(self):
+        """Test each shard allocates ids from its own range"""
+        now = datetime.now()
+        for patron_id in PATRONS:
+            insert_borrow_record(patron_id, 1, now, now + timedelta(days=14))
+
+        ids = []
+        for shard in range(4):
+            conn = get_shard_connection(shard)
+            ids += [row[0] for row in conn.execute('SELECT id FROM borrow_records')]
+            conn.close()
+        assert len(ids) == len(set(ids)) == len(PATRONS)
+
+    def test_overdue_report_fans_out_across_shards(self):
+        """Test the overdue report merges every shard in (due_ts, id) order and pages"""
+        now = datetime.now()
+        for days, patron_id in enumerate(PATRONS, start=1):
+            insert_borrow_record(patron_id, 1, now - timedelta(days=14 + days), now - timedelta(days=days))
+
+        loans = get_overdue_loans(to_epoch(now), limit=100)
+        assert [loan['patron_id'] for loan in loans] == PATRONS[::-1]
+        assert loans[0]['title'] == "Book 1"
+
+        first = get_overdue_report(limit=5)
+        second = get_overdue_report(cursor=first['next_cursor'], limit=5)
+        assert [loan['patron_id'] for loan in first['loans'] + second['loans']] == PATRONS[::-1][:10]
+
+    def test_cart_borrow_and_return_use_shard(self):
+        """Test cart checkouts and returns write the patron's shard and the catalog's copies"""
+        patron_id = PATRONS[2]
+        shard = shard_for_patron(patron_id)
+
+        borrowed = borrow_cart_by_patron(patron_id, [1, 2])
+
+        assert borrowed['processed'] == 2
+        assert [self.shard_count(s) for s in range(4)] == [2 if s == shard else 0 for s in range(4)]
+        assert get_book_by_id(1)['available_copies'] == 4
+        assert get_book_by_id(1)['borrow_count'] == 1
+
+        returned = return_cart_by_patron(patron_id, [1, 2])
+
+        assert returned['processed'] == 2
+        assert get_patron_borrow_count(patron_id) == 0
+        assert get_book_by_id(2)['available_copies'] == 5
+        assert sorted(record['title'] for record in get_borrowing_history(patron_id)) == ["Book 1", "Book 2"]
+
+    def test_fee_payment_and_accrual_use_shard(self):
+        """Test late fees accrue and are paid on the patron's shard"""
+        patron_id = PATRONS[3]
+        now = datetime.now()
+        insert_borrow_record(patron_id, 1, now - timedelta(days=24), now - timedelta(days=10))
+        gateway = Mock(spec=PaymentGateway)
+        gateway.process_payment.return_value = (True, 'txn_123', 'Payment successful')
+
+        assert accrue_late_fees(now)['updated'] == 1
+        success, _, txn_id = pay_late_fees(patron_id, 1, gateway)
+
+        assert success is True
+        assert txn_id == 'txn_123'
+        gateway.process_payment.assert_called_once()
+        assert get_fee_ledger_entry(patron_id, 1)['paid_amount'] == gateway.process_payment.call_args.kwargs['amount']
+        conn = get_shard_connection(shard_for_patron(patron_id))
+        assert conn.execute('SELECT COUNT(*) FROM fee_payments').fetchone()[0] == 1
+        conn.close()
+
+    def test_migrate_command_covers_every_shard(self, capsys):
+        """Test manage.py migrate upgrades the catalog and every shard"""
+        for path in [database.DATABASE] + [database.get_shard_path(s) for s in range(4)]:
+            conn = get_db_connection(path)
+            conn.execute(f'PRAGMA user_version = {database.SCHEMA_VERSION - 1}')
+            conn.close()
+
+        migrate(SimpleNamespace(dry_run=False, target=None))
+
+        output = capsys.readouterr().out
+        for shard in range(4):
+            assert database.get_shard_path(shard) in output
+            conn = get_db_connection(database.get_shard_path(shard))
+            assert database.get_schema_version(conn) == database.SCHEMA_VERSION
+            conn.close()
+
+    def test_sharding_refuses_open_loans_in_primary(self, tmp_path, monkeypatch, capsys):
+        """Test sharding is refused while the primary still holds open loans"""
+        monkeypatch.setattr(database, 'DATABASE', str(tmp_path / 'unsharded.db'))
+        monkeypatch.setattr(database, 'BORROW_SHARDS', 0)
+        init_database()
+        insert_book("Book 1", "Test Author", "1234567890121", 5, 5)
+        borrow_book_by_patron(PATRONS[0], 1)
+        monkeypatch.setattr(database, 'BORROW_SHARDS', 4)
+
+        with pytest.raises(ValueError, match="1 open loans"):
+            init_database()
+        assert migrate(SimpleNamespace(dry_run=True, target=None)) == 1
+        assert "DATABASE_BORROW_SHARDS" in capsys.readouterr().out
+
+        monkeypatch.setattr(database, 'BORROW_SHARDS', 0)
+        return_book_by_patron(PATRONS[0], 1)
+        monkeypatch.setattr(database, 'BORROW_SHARDS', 4)
+        init_database()
+        assert os.path.exists(database.get_shard_path(3))
+
+    def test_sample_loan_lands_on_patron_shard(self, tmp_path, monkeypatch):
+        """Test the sample data's loan is written to its patron's shard, so restarts still work"""
+        monkeypatch.setattr(database, 'DATABASE', str(tmp_path / 'sample.db'))
+        init_database()
+        add_sample_data()
+
+        init_database()
+        assert get_patron_borrow_count("123456") == 1
+        assert get_book_by_id(3)['available_copies'] == 0
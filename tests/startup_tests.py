@@ -0,0 +1,65 @@
+import importlib.util
+import pytest
+import sys
+import os
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from app import create_app
+from database import init_database, get_db_connection, get_schema_version, SCHEMA_VERSION
+
+@pytest.mark.usefixtures('database_file')
+class TestLazyStartup:
+    """Test cases for schema version stamping and opt-in sample data"""
+
+    def count_books(self):
+        conn = get_db_connection()
+        count = conn.execute('SELECT COUNT(*) FROM books').fetchone()[0]
+        conn.close()
+        return count
+
+    def test_cold_start_creates_schema_and_stamps_version(self):
+        """Test the first init_database call creates the schema"""
+        assert init_database() == True
+
+        conn = get_db_connection()
+        assert get_schema_version(conn) == SCHEMA_VERSION
+        conn.close()
+
+    def test_warm_start_skips_ddl(self):
+        """Test init_database is a no-op on an up-to-date database"""
+        init_database()
+
+        assert init_database() == False
+
+    def test_create_app_does_not_seed_by_default(self):
+        """Test sample data is not added unless configured"""
+        create_app()
+
+        assert self.count_books() == 0
+
+    def test_create_app_seeds_when_configured(self):
+        """Test SEED_SAMPLE_DATA adds the sample books once"""
+        create_app({'SEED_SAMPLE_DATA': True})
+        create_app({'SEED_SAMPLE_DATA': True})
+
+        assert self.count_books() == 3
+
+    def test_post_fork_gives_workers_fresh_caches(self):
+        """Test gunicorn's post_fork replaces every per-process cache of a preloaded app"""
+        spec = importlib.util.spec_from_file_location(
+            'gunicorn_conf', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'gunicorn.conf.py'))
+        gunicorn_conf = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(gunicorn_conf)
+        app = create_app()
+        inherited = dict(app.extensions)
+        server = SimpleNamespace(app=SimpleNamespace(callable=app), log=Mock())
+
+        gunicorn_conf.post_fork(server, SimpleNamespace(pid=1))
+
+        for name in ('book_row_cache', 'patron_report_cache', 'circulation_stats'):
+            assert app.extensions[name] is not inherited[name]
@@ -0,0 +1,11 @@
+"""
+WSGI entry point for production servers.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+See gunicorn.conf.py for worker sizing and reload behaviour.
+"""
+
+from app import create_app
+
+app = create_app()